@@ -1,8 +1,78 @@
-from django.contrib import admin
+import io
+
+from django import forms
+from django.contrib import admin, messages
+from django.http import StreamingHttpResponse
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
 from .models import Charm, DiscountedItem, GiftSetOrBundleMonthlySpecial, JNTLocation, JNTOrder, OrderItem, OrderItemCharm, Product, Order, Review, NewsletterSubscriber, Cart, CartItem, CartItemCharm, ProductImage, ReviewToken, VideoContent, PageBanner, PhotoGallery, DiscountCampaign
+from .services.catalog_io_service import CatalogImportError, detect_format, export_catalog, import_catalog
+
+
+class CatalogImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV atau JSONL; format sama dengan hasil export.")
+    dry_run = forms.BooleanField(required=False, help_text="Validasi saja, tidak disimpan.")
+
+
+class CatalogImportExportMixin:
+    """Tombol import/export katalog (api/services/catalog_io_service.py) di changelist."""
+    change_list_template = 'admin/api/catalog_change_list.html'
+    catalog_type = None
+
+    def get_urls(self):
+        info = self.model._meta.app_label, self.model._meta.model_name
+        return [
+            path('import-catalog/', self.admin_site.admin_view(self.import_catalog_view), name='%s_%s_import_catalog' % info),
+            path('export-catalog/', self.admin_site.admin_view(self.export_catalog_view), name='%s_%s_export_catalog' % info),
+        ] + super().get_urls()
+
+    def import_catalog_view(self, request):
+        if not self.has_add_permission(request) or not self.has_change_permission(request):
+            return redirect('admin:index')
+        form = CatalogImportForm(request.POST or None, request.FILES or None)
+        errors = []
+        if request.method == 'POST' and form.is_valid():
+            upload = form.cleaned_data['file']
+            stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+            try:
+                summary = import_catalog(stream, detect_format(upload.name), dry_run=form.cleaned_data['dry_run'])
+            except CatalogImportError as exc:
+                errors = exc.errors
+            else:
+                result = ', '.join(
+                    f"{kind}: {summary['created'][kind]} dibuat, {summary['updated'][kind]} diupdate"
+                    for kind in summary['created']
+                )
+                if form.cleaned_data['dry_run']:
+                    self.message_user(request, f"Dry run valid ({result}); tidak ada yang disimpan.", messages.WARNING)
+                    return redirect(request.path)
+                self.message_user(request, f"Import selesai: {result}.", messages.SUCCESS)
+                return redirect('admin:%s_%s_changelist' % (self.model._meta.app_label, self.model._meta.model_name))
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': "Import katalog",
+            'form': form,
+            'errors': errors,
+        }
+        return TemplateResponse(request, 'admin/api/catalog_import.html', context)
+
+    def export_catalog_view(self, request):
+        if not self.has_view_permission(request):
+            return redirect('admin:index')
+        fmt = 'jsonl' if request.GET.get('format') == 'jsonl' else 'csv'
+        response = StreamingHttpResponse(
+            export_catalog(fmt, (self.catalog_type,)),
+            content_type='application/x-ndjson' if fmt == 'jsonl' else 'text/csv',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{self.catalog_type}s.{fmt}"'
+        return response
+
 
 @admin.register(Charm)
-class CharmAdmin(admin.ModelAdmin):
+class CharmAdmin(CatalogImportExportMixin, admin.ModelAdmin):
+    catalog_type = 'charm'
     list_display = ('name', 'category', 'price')
     list_filter = ('category',)
     search_fields = ['name']
@@ -16,7 +86,8 @@ class ProductImageAdmin(admin.ModelAdmin):
     list_display = ('product', 'alt_text')
 
 @admin.register(Product)
-class ProductAdmin(admin.ModelAdmin):
+class ProductAdmin(CatalogImportExportMixin, admin.ModelAdmin):
+    catalog_type = 'product'
     list_display = ('name', 'category', 'price', 'label', 'stock', 'details', 'rating', 'discount', 'charms', 'is_charm_spreadable', 'is_charm_max3','is_charm_max5')
     list_filter = ('category', 'label', 'charms', 'is_charm_spreadable')
     filter_horizontal = ('jewel_set_products',) 
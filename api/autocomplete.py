@@ -0,0 +1,136 @@
+"""
+Autocomplete katalog di memori: prefix + trigram, toleran salah ketik.
+
+Index dibangun dari nama Product, Charm dan GiftSetOrBundleMonthlySpecial
+(3 query) saat pertama dipakai, lalu dibangun ulang hanya kalau versi cache
+`autocomplete` berubah (diganti oleh signal model, lihat api/cache.py). Per
+ketikan tidak ada query database, hanya satu `cache.get` untuk cek versi.
+"""
+import heapq
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+
+from .cache import get_version_info
+from .models import Charm, GiftSetOrBundleMonthlySpecial, Product
+
+CACHE_NAMESPACE = 'autocomplete'
+MIN_SIMILARITY = 0.3
+MIN_SCORE = 0.35
+
+SOURCES = (
+    ('product', Product),
+    ('charm', Charm),
+    ('gift_set', GiftSetOrBundleMonthlySpecial),
+)
+
+
+def normalize(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return re.findall(r'\w+', text.lower())
+
+
+def trigrams(word):
+    # padding seperti pg_trgm: dua spasi di depan, satu di belakang
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class AutocompleteIndex:
+    def __init__(self, entries):
+        # entries: list of (type, id, name)
+        self.entries = entries
+        self.word_entries = defaultdict(set)
+        for position, (_, _, name) in enumerate(entries):
+            for word in normalize(name):
+                self.word_entries[word].add(position)
+        self.words = sorted(self.word_entries)
+        self.word_trigrams = {word: trigrams(word) for word in self.words}
+        self.trigram_words = defaultdict(set)
+        for word, grams in self.word_trigrams.items():
+            for gram in grams:
+                self.trigram_words[gram].add(word)
+
+    @classmethod
+    def build(cls):
+        entries = []
+        for kind, model in SOURCES:
+            entries.extend((kind, pk, name) for pk, name in model.objects.values_list('pk', 'name'))
+        return cls(entries)
+
+    def _prefix_matches(self, token):
+        start = bisect_left(self.words, token)
+        for word in self.words[start:]:
+            if not word.startswith(token):
+                break
+            yield word
+
+    def _word_matches(self, token):
+        """Kata di vocabulary yang cocok dengan token, beserta skor 0..1."""
+        matches = {}
+        for word in self._prefix_matches(token):
+            matches[word] = 1.0 if word == token else 0.9
+        query_grams = trigrams(token)
+        shared = defaultdict(int)
+        for gram in query_grams:
+            for word in self.trigram_words.get(gram, ()):
+                shared[word] += 1
+        for word, count in shared.items():
+            similarity = count / (len(query_grams) + len(self.word_trigrams[word]) - count)
+            if similarity >= MIN_SIMILARITY and similarity > matches.get(word, 0):
+                matches[word] = similarity
+        return matches
+
+    def suggest(self, query, limit=8, types=None):
+        tokens = normalize(query)
+        if not tokens:
+            return []
+
+        scores = defaultdict(float)
+        for token in tokens:
+            best = {}
+            for word, similarity in self._word_matches(token).items():
+                for position in self.word_entries[word]:
+                    if similarity > best.get(position, 0):
+                        best[position] = similarity
+            for position, similarity in best.items():
+                scores[position] += similarity / len(tokens)
+
+        candidates = (
+            (score, position) for position, score in scores.items()
+            if score >= MIN_SCORE and (not types or self.entries[position][0] in types)
+        )
+        # skor tertinggi dulu; kalau seri, nama yang lebih pendek lebih relevan
+        top = heapq.nsmallest(
+            limit, candidates,
+            key=lambda item: (-item[0], len(self.entries[item[1]][2]), item[1]),
+        )
+        return [
+            {
+                'type': self.entries[position][0],
+                'id': self.entries[position][1],
+                'name': self.entries[position][2],
+                'score': round(score, 3),
+            }
+            for score, position in top
+        ]
+
+
+_index = None
+_index_version = None
+_lock = threading.Lock()
+
+
+def get_index():
+    global _index, _index_version
+    version = get_version_info(CACHE_NAMESPACE)['token']
+    if _index is not None and _index_version == version:
+        return _index
+    with _lock:
+        if _index is None or _index_version != version:
+            _index = AutocompleteIndex.build()
+            _index_version = version
+    return _index
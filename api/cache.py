@@ -0,0 +1,162 @@
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.cache import get_conditional_response, patch_vary_headers, quote_etag
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+# Model mana yang memengaruhi payload endpoint mana. Setiap save/delete pada
+# model di kiri mengganti versi namespace di kanan (lihat api/signals.py).
+CACHE_DEPENDENCIES = {
+    'api.Product': ('products', 'gift-sets', 'discount-campaigns', 'autocomplete'),
+    'api.ProductImage': ('products', 'discount-campaigns'),
+    'api.Product_jewel_set_products': ('products', 'discount-campaigns'),
+    'api.Charm': ('charms', 'autocomplete'),
+    'api.GiftSetOrBundleMonthlySpecial': ('gift-sets', 'autocomplete'),
+    'api.GiftSetOrBundleMonthlySpecial_products': ('gift-sets',),
+    'api.PageBanner': ('page-banners',),
+    'api.PhotoGallery': ('photo-gallery',),
+    'api.VideoContent': ('videos',),
+    # hanya dipakai endpoint homepage (api/services/homepage_service.py)
+    'api.Review': ('reviews',),
+    'api.Review_products': ('reviews',),
+    'api.Review_charms': ('reviews',),
+    'api.Review_gift_sets': ('reviews',),
+    # diubah lewat UPDATE oleh api/services/rating_service.py, yang bump sendiri
+    'api.RatingAggregate': ('products', 'charms', 'gift-sets'),
+    'api.DiscountCampaign': ('discount-campaigns', 'pricing'),
+    'api.DiscountedItem': ('discount-campaigns', 'pricing'),
+}
+
+# Kolom yang berubah di setiap transaksi (checkout, bulk adjust). Kalau hanya
+# kolom ini yang berubah cukup namespace yang menampilkannya; index pencarian,
+# autocomplete, harga dan rebuild homepage tidak disentuh.
+INVENTORY_FIELDS = frozenset({'stock', 'sold_stok'})
+INVENTORY_DEPENDENCIES = {
+    'api.Product': ('products', 'discount-campaigns'),
+    'api.Charm': ('charms',),
+    'api.GiftSetOrBundleMonthlySpecial': ('gift-sets',),
+}
+
+
+def get_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def _version_key(namespace):
+    return f'catalog:version:{namespace}'
+
+
+def _new_version():
+    # token acak, bukan counter: kalau key versi ter-evict, token baru tidak
+    # mungkin sama dengan token lama yang mungkin masih dipegang client (ETag)
+    return {'token': uuid.uuid4().hex[:16], 'changed_at': int(time.time())}
+
+
+def get_version_info(namespace):
+    cache = get_cache()
+    info = cache.get(_version_key(namespace))
+    if info is None:
+        cache.add(_version_key(namespace), _new_version(), timeout=None)
+        info = cache.get(_version_key(namespace)) or _new_version()
+    return info
+
+
+def bump_version(*namespaces):
+    cache = get_cache()
+    cache.set_many({_version_key(namespace): _new_version() for namespace in namespaces}, timeout=None)
+
+
+def response_cache_key(request, namespace, token):
+    # host ikut di key karena serializer membangun URL absolut dari request
+    raw = f'{request.scheme}://{request.get_host()}{request.get_full_path()}'
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f'catalog:response:{namespace}:{token}:{digest}'
+
+
+def response_etag(request, token):
+    raw = '|'.join([
+        token,
+        request.get_host(),
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+    ])
+    return quote_etag(hashlib.md5(raw.encode('utf-8')).hexdigest())
+
+
+def cache_validity(namespaces, pricing_dependent=False):
+    """
+    (token, last_modified, timeout) gabungan beberapa namespace. Dengan
+    `pricing_dependent` token juga terikat ke tabel harga dan timeout dibatasi
+    sampai batas kampanye berikutnya.
+    """
+    versions = [get_version_info(namespace) for namespace in namespaces]
+    token = ':'.join(version['token'] for version in versions)
+    last_modified = max(version['changed_at'] for version in versions)
+    timeout = settings.CATALOG_CACHE_TIMEOUT
+    if pricing_dependent:
+        from .pricing import get_price_table
+
+        now = time.time()
+        table = get_price_table(now)
+        token = f"{token}:{get_version_info('pricing')['token']}:{table.built_at:.0f}"
+        last_modified = max(last_modified, int(table.built_at))
+        remaining = table.seconds_valid(now)
+        if remaining is not None:
+            timeout = min(timeout, remaining)
+    return token, last_modified, timeout
+
+
+class CachedResponseMixin:
+    """
+    Cache hasil `list`/`retrieve` per path + query string, plus conditional GET.
+
+    Yang disimpan adalah `response.data`, bukan bytes hasil render, supaya
+    content negotiation tetap jalan. Invalidasi lewat versi namespace yang
+    diganti oleh signal model, jadi tidak perlu menghapus key satu per satu.
+    Versi yang sama dipakai sebagai ETag / Last-Modified: request dengan
+    `If-None-Match` yang cocok langsung dijawab 304 tanpa query dan tanpa
+    serialisasi.
+
+    Payload yang memuat harga efektif (`cache_pricing_dependent = True`) juga
+    terikat ke tabel harga (api/pricing.py): key dan ETag ikut berganti, dan
+    cache kedaluwarsa, tepat di batas kampanye berikutnya.
+    """
+    cache_namespace = None
+    cache_pricing_dependent = False
+
+    def _cache_validity(self):
+        """(token, last_modified, timeout) untuk namespace view ini."""
+        return cache_validity((self.cache_namespace,), pricing_dependent=self.cache_pricing_dependent)
+
+    def _cached(self, handler, request, *args, **kwargs):
+        token, last_modified, timeout = self._cache_validity()
+        etag = response_etag(request, token)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        cache = get_cache()
+        key = response_cache_key(request, self.cache_namespace, token)
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data)
+        else:
+            response = handler(request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, timeout=timeout)
+
+        if response.status_code == 200:
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(last_modified)
+            patch_vary_headers(response, ['Accept'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self._cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._cached(super().retrieve, request, *args, **kwargs)
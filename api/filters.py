@@ -0,0 +1,196 @@
+import django_filters
+from django.db.models import Count, Q
+from rest_framework import filters
+
+from .models import Charm, GiftSetOrBundleMonthlySpecial, Product
+from .search import search_expressions
+
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """
+    `?search=` lewat index full-text (api/search.py), hasil diurutkan
+    berdasarkan rank. Match dan rank dihitung di SQL, jadi semua hasil bisa
+    dipaginasi dan facet menghitung seluruh hasil, tanpa batas jumlah. Untuk
+    model yang tidak diindex, atau database tanpa index, perilakunya sama
+    dengan `SearchFilter` biasa.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+
+        expressions = search_expressions(queryset.model, ' '.join(terms))
+        if expressions is None:
+            return super().filter_queryset(request, queryset, view)
+        match, rank = expressions
+        return queryset.filter(match).annotate(search_rank=rank).order_by('search_rank', 'pk')
+
+
+class CatalogOrderingFilter(filters.OrderingFilter):
+    """
+    OrderingFilter dengan alias ranking (api/services/ranking_service.py):
+    `best_selling` dan `trending` urut dari tertinggi, `-best_selling` /
+    `-trending` kebalikannya.
+    """
+    aliases = {
+        'best_selling': '-sold_stok',
+        'trending': '-trending_score',
+    }
+
+    def remove_invalid_fields(self, queryset, fields, view, request):
+        translated = []
+        for term in fields:
+            target = self.aliases.get(term.lstrip('-'))
+            if target is None:
+                translated.append(term)
+            elif term.startswith('-'):
+                translated.append(target[1:] if target.startswith('-') else f'-{target}')
+            else:
+                translated.append(target)
+        return super().remove_invalid_fields(queryset, translated, view, request)
+
+
+class ValueFacet:
+    """Jumlah item per nilai kolom, satu query GROUP BY."""
+
+    def __init__(self, field, choices=()):
+        self.field = field
+        self.params = (field,)
+        self.choices = [value for value, _ in choices]
+
+    def count(self, queryset):
+        counts = {value: 0 for value in self.choices}
+        rows = queryset.order_by().values(self.field).annotate(total=Count('pk'))
+        for row in rows:
+            counts[row[self.field]] = row['total']
+        return counts
+
+
+class RangeFacet:
+    """Jumlah item per rentang, satu query aggregate dengan COUNT FILTER per bucket."""
+
+    def __init__(self, field, bounds, params):
+        self.field = field
+        self.bounds = bounds
+        self.params = params
+
+    def buckets(self):
+        edges = [None, *self.bounds, None]
+        return list(zip(edges[:-1], edges[1:]))
+
+    def count(self, queryset):
+        aggregates = {}
+        for index, (low, high) in enumerate(self.buckets()):
+            condition = Q()
+            if low is not None:
+                condition &= Q(**{f'{self.field}__gte': low})
+            if high is not None:
+                condition &= Q(**{f'{self.field}__lt': high})
+            aggregates[f'bucket_{index}'] = Count('pk', filter=condition)
+        totals = queryset.order_by().aggregate(**aggregates)
+        return [
+            {'min': low, 'max': high, 'count': totals[f'bucket_{index}']}
+            for index, (low, high) in enumerate(self.buckets())
+        ]
+
+
+IN_STOCK = Q(stock__gt=0)
+# set (jewel set / gift set) memakai ketersediaan turunan dari komponennya
+SET_AVAILABLE = Q(available_stock__gt=0) | Q(available_stock__isnull=True, stock__gt=0)
+
+
+class StockFacet:
+    params = ('in_stock',)
+
+    def __init__(self, condition=IN_STOCK):
+        self.condition = condition
+
+    def count(self, queryset):
+        return queryset.order_by().aggregate(
+            true=Count('pk', filter=self.condition),
+            false=Count('pk', filter=~self.condition),
+        )
+
+
+PRICE_BUCKETS = (100000, 250000, 500000, 1000000)
+
+
+class CatalogFilterSet(django_filters.FilterSet):
+    price_min = django_filters.NumberFilter(field_name='price', lookup_expr='gte')
+    price_max = django_filters.NumberFilter(field_name='price', lookup_expr='lte')
+    in_stock = django_filters.BooleanFilter(method='filter_in_stock')
+
+    facets = {}
+    in_stock_condition = IN_STOCK
+
+    def filter_in_stock(self, queryset, name, value):
+        if value:
+            return queryset.filter(self.in_stock_condition)
+        return queryset.exclude(self.in_stock_condition)
+
+
+class ProductFilterSet(CatalogFilterSet):
+    category = django_filters.MultipleChoiceFilter(choices=Product.CATEGORY_CHOICES)
+    label = django_filters.MultipleChoiceFilter(choices=Product.LABEL_CHOICES)
+
+    in_stock_condition = SET_AVAILABLE
+    facets = {
+        'category': ValueFacet('category', Product.CATEGORY_CHOICES),
+        'label': ValueFacet('label', Product.LABEL_CHOICES),
+        'price': RangeFacet('price', PRICE_BUCKETS, params=('price_min', 'price_max')),
+        'in_stock': StockFacet(SET_AVAILABLE),
+    }
+
+    class Meta:
+        model = Product
+        fields = ['category', 'label', 'charms']
+
+
+class CharmFilterSet(CatalogFilterSet):
+    category = django_filters.MultipleChoiceFilter(choices=Charm.CHARM_CATEGORY_CHOICES)
+    label = django_filters.MultipleChoiceFilter(choices=Charm.LABEL_CHOICES)
+
+    facets = {
+        'category': ValueFacet('category', Charm.CHARM_CATEGORY_CHOICES),
+        'label': ValueFacet('label', Charm.LABEL_CHOICES),
+        'price': RangeFacet('price', PRICE_BUCKETS, params=('price_min', 'price_max')),
+        'in_stock': StockFacet(),
+    }
+
+    class Meta:
+        model = Charm
+        fields = ['category', 'label']
+
+
+class GiftSetFilterSet(CatalogFilterSet):
+    label = django_filters.MultipleChoiceFilter(choices=GiftSetOrBundleMonthlySpecial.LABEL_CHOICES)
+
+    in_stock_condition = SET_AVAILABLE
+    facets = {
+        'label': ValueFacet('label', GiftSetOrBundleMonthlySpecial.LABEL_CHOICES),
+        'price': RangeFacet('price', PRICE_BUCKETS, params=('price_min', 'price_max')),
+        'in_stock': StockFacet(SET_AVAILABLE),
+    }
+
+    class Meta:
+        model = GiftSetOrBundleMonthlySpecial
+        fields = ['label', 'is_monthly_special']
+
+
+def compute_facets(filterset_class, params, queryset, request=None):
+    """
+    Hitung semua facet dari `filterset_class.facets`. Facet X dihitung dengan
+    semua filter aktif kecuali filter X sendiri, supaya pilihan lain di facet
+    yang sama tetap kelihatan jumlahnya.
+    """
+    result = {}
+    for name, facet in filterset_class.facets.items():
+        facet_params = params.copy()
+        for param in facet.params:
+            facet_params.pop(param, None)
+        filterset = filterset_class(facet_params, queryset=queryset, request=request)
+        if not filterset.is_valid():
+            return None, filterset.errors
+        result[name] = facet.count(filterset.qs)
+    return result, None
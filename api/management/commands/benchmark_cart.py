@@ -0,0 +1,66 @@
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.models import CartItem, Charm, Product
+from api.views import CartViewSet
+
+
+class Command(BaseCommand):
+    help = "Ukur throughput mutasi cart (add dan update_item dengan charms) serta jumlah query per request."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200, help="Jumlah request per operasi")
+        parser.add_argument('--charms', type=int, default=5, help="Jumlah charms per item (maks 5)")
+
+    def handle(self, *args, **options):
+        # semua data benchmark di-rollback
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(email='cart-benchmark@example.invalid', password=None)
+            product = Product.objects.create(
+                name='Benchmark Bracelet', category='bracelet', price=Decimal('150000'), label='gold', stock=10**6,
+            )
+            charms = Charm.objects.bulk_create(
+                Charm(name=f'Benchmark Charm {i}', category='zodiac', price=Decimal('25000'), image='charms/c.png', stock=100)
+                for i in range(5)
+            )
+            charm_ids = [charm.pk for charm in charms][:options['charms']]
+
+            factory = APIRequestFactory()
+            add = CartViewSet.as_view({'post': 'add'})
+            update_item = CartViewSet.as_view({'patch': 'update_item'})
+
+            def do_add():
+                request = factory.post('/api/cart/add/', {'product': product.pk, 'charms': charm_ids}, format='json')
+                force_authenticate(request, user=user)
+                return add(request)
+
+            item_id = do_add().data['items'][0]['id']
+
+            def do_update():
+                request = factory.patch(f'/api/cart/{item_id}/update_item/', {'charms': charm_ids[::-1]}, format='json')
+                force_authenticate(request, user=user)
+                return update_item(request, pk=item_id)
+
+            for label, operation in (('add', do_add), ('update_item', do_update)):
+                timings, queries = [], []
+                for _ in range(options['repeat']):
+                    with CaptureQueriesContext(connection) as captured:
+                        start = time.perf_counter()
+                        operation()
+                        timings.append(time.perf_counter() - start)
+                    queries.append(len(captured))
+                    # cart tetap satu item supaya ukuran respons sama di setiap putaran
+                    CartItem.objects.filter(cart__user=user).exclude(pk=item_id).delete()
+                self.stdout.write(
+                    f"{label:<12} {len(timings) / sum(timings):8.1f} req/s  "
+                    f"median {statistics.median(timings) * 1000:6.2f} ms  "
+                    f"{statistics.median(queries):.0f} query/request"
+                )
+            transaction.set_rollback(True)
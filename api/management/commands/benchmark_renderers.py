@@ -0,0 +1,82 @@
+import statistics
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api.models import Order, OrderItem, Product, ProductImage
+from api.renderers import MessagePackRenderer, ORJSONRenderer
+from api.serializers import OrderTableSerializer, ProductSerializer
+from api.views import order_queryset
+
+RENDERERS = (
+    ('json (stdlib)', JSONRenderer),
+    ('json (orjson)', ORJSONRenderer),
+    ('msgpack', MessagePackRenderer),
+)
+
+
+class Command(BaseCommand):
+    help = "Bandingkan waktu render dan ukuran payload product list & admin order table per renderer."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0,
+                            help="Buat N produk dan N order sementara (di-rollback setelah benchmark)")
+        parser.add_argument('--repeat', type=int, default=20, help="Jumlah render per renderer")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['seed']:
+                self.seed(options['seed'])
+            request = APIRequestFactory().get('/')
+            payloads = {
+                'product list': ProductSerializer(
+                    Product.objects.select_related('rating_summary').prefetch_related('images', 'jewel_set_products'),
+                    many=True, context={'request': request},
+                ).data,
+                'admin order table': OrderTableSerializer(order_queryset(), many=True, context={'request': request}).data,
+            }
+            for name, data in payloads.items():
+                self.stdout.write(self.style.MIGRATE_HEADING(f"{name}: {len(data)} baris"))
+                baseline = None
+                for label, renderer_class in RENDERERS:
+                    median, size = self.measure(renderer_class(), data, options['repeat'])
+                    baseline = baseline or median
+                    self.stdout.write(
+                        f"  {label:<14} {median * 1000:8.2f} ms  {size / 1024:9.1f} KiB  x{baseline / median:.1f}"
+                    )
+            transaction.set_rollback(True)
+
+    def measure(self, renderer, data, repeat):
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            body = renderer.render(data, renderer.media_type, {})
+            timings.append(time.perf_counter() - start)
+        return statistics.median(timings), len(body)
+
+    def seed(self, count):
+        user = get_user_model().objects.create_user(email='benchmark@example.invalid', password=None)
+        products = Product.objects.bulk_create(
+            Product(
+                name=f'Benchmark {i}', category='necklace', price=Decimal('150000') + i, label='gold',
+                description='Kalung perak lapis emas ' * 8, details='Panjang 45 cm', stock=10,
+            )
+            for i in range(count)
+        )
+        ProductImage.objects.bulk_create(
+            ProductImage(product=product, image=f'products/benchmark/{product.pk}_{n}.jpg', alt_text=product.name)
+            for product in products for n in range(2)
+        )
+        orders = Order.objects.bulk_create(
+            Order(user=user, shipping_address='Jl. Benchmark No. 1', total_price=Decimal('300000'))
+            for _ in range(count)
+        )
+        OrderItem.objects.bulk_create(
+            OrderItem(order=order, product=products[i % len(products)], quantity=2)
+            for i, order in enumerate(orders)
+        )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from api.services.catalog_io_service import FORMATS, MODELS, detect_format, export_catalog
+
+
+class Command(BaseCommand):
+    help = "Export produk/charms ke CSV atau JSONL dengan format yang sama seperti import_catalog."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?', default='-', help="File tujuan, default stdout")
+        parser.add_argument('--format', choices=FORMATS, help="Default: dari ekstensi file, csv untuk stdout")
+        parser.add_argument('--type', choices=tuple(MODELS), action='append', dest='kinds',
+                            help="Hanya type ini (boleh diulang)")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or detect_format(path)
+        kinds = tuple(options['kinds'] or MODELS)
+        if path == '-':
+            for chunk in export_catalog(fmt, kinds):
+                self.stdout.write(chunk, ending='')
+            return
+        with open(path, 'w', encoding='utf-8', newline='') as stream:
+            stream.writelines(export_catalog(fmt, kinds))
+        self.stdout.write(self.style.SUCCESS(f"Katalog diexport ke {path}."))
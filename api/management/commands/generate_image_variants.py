@@ -0,0 +1,30 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from api.services.image_variant_service import IMAGE_MODELS, generate_variants_for, needs_variants
+from api.tasks import enqueue, generate_image_variants
+
+
+class Command(BaseCommand):
+    help = "Buat turunan gambar (WebP/AVIF/JPEG per lebar) untuk gambar yang belum punya, atau semua dengan --force."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', choices=IMAGE_MODELS, help="Hanya proses satu model, mis. api.Charm")
+        parser.add_argument('--force', action='store_true', help="Buat ulang walaupun turunan sudah ada")
+        parser.add_argument('--async', action='store_true', dest='use_celery', help="Kirim ke Celery, jangan diproses di sini")
+
+    def handle(self, *args, **options):
+        labels = [options['model']] if options['model'] else IMAGE_MODELS
+        for label in labels:
+            model = apps.get_model(label)
+            done = 0
+            for instance in model.objects.exclude(image='').order_by('pk').iterator(chunk_size=200):
+                if not options['force'] and not needs_variants(instance):
+                    continue
+                if options['use_celery']:
+                    enqueue(generate_image_variants, label, instance.pk, force=options['force'])
+                else:
+                    generate_variants_for(label, instance.pk, force=options['force'])
+                done += 1
+            self.stdout.write(f"{label}: {done} gambar diproses")
+        self.stdout.write(self.style.SUCCESS("Selesai."))
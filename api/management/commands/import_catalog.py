@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.services.catalog_io_service import FORMATS, CatalogImportError, detect_format, import_catalog
+
+
+class Command(BaseCommand):
+    help = "Import produk/charms dari file CSV atau JSONL (lihat api/services/catalog_io_service.py)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File katalog, '-' untuk stdin")
+        parser.add_argument('--format', choices=FORMATS, help="Default: dari ekstensi file")
+        parser.add_argument('--dry-run', action='store_true', help="Validasi dan jalankan, lalu rollback")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or detect_format(path)
+        try:
+            if path == '-':
+                summary = import_catalog(self.stdin, fmt, dry_run=options['dry_run'])
+            else:
+                with open(path, encoding='utf-8-sig', newline='') as stream:
+                    summary = import_catalog(stream, fmt, dry_run=options['dry_run'])
+        except CatalogImportError as exc:
+            for line_no, message in exc.errors:
+                self.stderr.write(f"baris {line_no}: {message}")
+            raise CommandError(f"{exc}, tidak ada yang disimpan.")
+
+        for kind in summary['created']:
+            self.stdout.write(f"{kind}: {summary['created'][kind]} dibuat, {summary['updated'][kind]} diupdate")
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING("Dry run: semua perubahan di-rollback."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Selesai."))
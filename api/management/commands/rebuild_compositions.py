@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.services.composition_service import rebuild_compositions
+
+
+class Command(BaseCommand):
+    help = "Ratakan ulang komposisi jewel set / gift set dan hitung ulang ketersediaannya dari stok komponen."
+
+    def handle(self, *args, **options):
+        total = rebuild_compositions()
+        self.stdout.write(self.style.SUCCESS(f"Komposisi set dibangun ulang: {total} komponen."))
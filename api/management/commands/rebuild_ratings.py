@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from api.services.rating_service import rebuild_aggregates
+
+
+class Command(BaseCommand):
+    help = "Hitung ulang agregat rating (jumlah, rata-rata, histogram) dari semua review."
+
+    def handle(self, *args, **options):
+        total = rebuild_aggregates()
+        self.stdout.write(self.style.SUCCESS(f"Agregat rating dibangun ulang untuk {total} item."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from api.services.recommendation_service import MIN_SUPPORT, TOP_K, rebuild_recommendations
+
+
+class Command(BaseCommand):
+    help = "Bangun ulang rekomendasi 'sering dibeli bersama' dari co-occurrence order yang sudah dibayar."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int, default=TOP_K, help="Jumlah tetangga per item")
+        parser.add_argument('--min-support', type=int, default=MIN_SUPPORT, help="Minimal jumlah order bersama")
+
+    def handle(self, *args, **options):
+        total = rebuild_recommendations(top_k=options['top_k'], min_support=options['min_support'])
+        self.stdout.write(self.style.SUCCESS(f"{total} baris rekomendasi dibuat."))
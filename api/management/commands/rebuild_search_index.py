@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.search import INDEXED_MODELS, get_search_backend, rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Bangun ulang index full-text produk dan charms (api_catalogsearch)."
+
+    def handle(self, *args, **options):
+        if get_search_backend() is None:
+            self.stdout.write(self.style.WARNING("Database ini tidak punya backend full-text; tidak ada yang diindex."))
+            return
+        for model in INDEXED_MODELS:
+            total = rebuild_index(model)
+            self.stdout.write(f"{model.__name__}: {total} baris diindex")
+        self.stdout.write(self.style.SUCCESS("Index pencarian selesai dibangun ulang."))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from api.services.ranking_service import recompute_rankings
+
+
+class Command(BaseCommand):
+    help = "Hitung ulang counter penjualan (all-time, 7 dan 30 hari) dan skor trending dari order yang sudah dibayar."
+
+    def handle(self, *args, **options):
+        for label, changed in recompute_rankings().items():
+            self.stdout.write(f"{label}: {changed} baris berubah")
+        self.stdout.write(self.style.SUCCESS("Selesai."))
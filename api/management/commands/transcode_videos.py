@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from api.models import VideoContent
+from api.services.video_transcode_service import needs_transcode, transcode_video
+from api.tasks import enqueue, transcode_video_to_hls
+
+
+class Command(BaseCommand):
+    help = "Transcode VideoContent yang belum punya HLS (atau semua dengan --force)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help="Transcode ulang walaupun sudah ada")
+        parser.add_argument('--async', action='store_true', dest='use_celery', help="Kirim ke Celery, jangan diproses di sini")
+
+    def handle(self, *args, **options):
+        done = 0
+        for video in VideoContent.objects.exclude(video_file='').order_by('pk'):
+            if not options['force'] and not needs_transcode(video):
+                continue
+            if options['use_celery']:
+                enqueue(transcode_video_to_hls, video.pk)
+            else:
+                video = transcode_video(video)
+                self.stdout.write(f"#{video.pk} {video.title}: {video.transcode_status}")
+            done += 1
+        self.stdout.write(self.style.SUCCESS(f"{done} video diproses."))
@@ -6,10 +6,44 @@ from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from datetime import timedelta
+from decimal import Decimal
 
 User = get_user_model()
 
-class Charm(models.Model):
+
+class TrackedFieldsMixin:
+    """
+    Simpan nilai kolom saat dimuat dari database supaya signal bisa tahu
+    kolom mana yang benar-benar berubah (mis. checkout hanya mengubah stok).
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # field_names berisi attname kolom yang dimuat, urut sama dengan values
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def changed_fields(self, update_fields=None):
+        """attname kolom yang berbeda dari nilai saat dimuat; None kalau tidak diketahui (objek baru)."""
+        loaded = self.__dict__.get('_loaded_values')
+        if loaded is None:
+            return None
+        if update_fields is not None:
+            names = {self._meta.get_field(name).attname for name in update_fields}
+        else:
+            names = {field.attname for field in self._meta.concrete_fields if field.attname in self.__dict__}
+        return {name for name in names if name not in loaded or loaded[name] != self.__dict__.get(name)}
+
+    def remember_loaded_values(self):
+        loaded = self.__dict__.setdefault('_loaded_values', {})
+        loaded.update({
+            field.attname: self.__dict__[field.attname]
+            for field in self._meta.concrete_fields if field.attname in self.__dict__
+        })
+
+
+class Charm(TrackedFieldsMixin, models.Model):
     CHARM_CATEGORY_CHOICES = [
         ('alphabet', 'Alphabet'),
         ('birthstone', 'Birthstone'),
@@ -30,6 +64,7 @@ class Charm(models.Model):
     name = models.CharField(max_length=100)
     category = models.CharField(max_length=50, choices=CHARM_CATEGORY_CHOICES)
     image = models.ImageField(upload_to='charms/')
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     label = models.CharField(max_length=100, choices=LABEL_CHOICES, default='null')
     price = models.DecimalField(max_digits=10, decimal_places=2)
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=0)
@@ -38,6 +73,20 @@ class Charm(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, blank=True, null=True)
     sold_stok = models.IntegerField(default=0)
     discount = models.DecimalField(max_digits=5, decimal_places=2, default=0)
+    # diisi api/services/ranking_service.py dari order yang sudah dibayar
+    sales_7d = models.IntegerField(default=0, editable=False)
+    sales_30d = models.IntegerField(default=0, editable=False)
+    trending_score = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        # index keyset untuk CatalogCursorPagination
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['price', 'id']),
+            models.Index(fields=['rating', 'id']),
+            models.Index(fields=['sold_stok', 'id']),
+            models.Index(fields=['trending_score', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.category})"
@@ -46,7 +95,7 @@ class Charm(models.Model):
         if self.price is not None and self.price < 0:
             raise ValidationError("Harga charms tidak boleh negatif.")
 
-class Product(models.Model):
+class Product(TrackedFieldsMixin, models.Model):
     CATEGORY_CHOICES = [
         ('necklace', 'Necklace'),
         ('bracelet', 'Bracelet'),
@@ -82,10 +131,27 @@ class Product(models.Model):
     is_charm_max5 = models.BooleanField(default=False, help_text="Apakah produk ini bisa dipasangi maksimal 5 charms?")
     # Produk di dalam jewel set
     jewel_set_products = models.ManyToManyField('self', blank=True, symmetrical=False)
+    # min stok komponen kalau ini set (api/services/composition_service.py), None kalau bukan set
+    available_stock = models.IntegerField(null=True, blank=True, editable=False)
+    # diisi api/services/ranking_service.py dari order yang sudah dibayar
+    sales_7d = models.IntegerField(default=0, editable=False)
+    sales_30d = models.IntegerField(default=0, editable=False)
+    trending_score = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        # index keyset untuk CatalogCursorPagination
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['price', 'id']),
+            models.Index(fields=['rating', 'id']),
+            models.Index(fields=['sold_stok', 'id']),
+            models.Index(fields=['trending_score', 'id']),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.category})"
     
+
     def clean(self):
         if self.price < 0:
             raise ValidationError("Harga produk tidak boleh negatif.")
@@ -98,12 +164,13 @@ def product_image_upload_path(instance, filename):
 class ProductImage(models.Model):
     product = models.ForeignKey('Product', on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to=product_image_upload_path)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     alt_text = models.CharField(max_length=255, blank=True)
 
     def __str__(self):
         return f"Gambar untuk {self.product.name}"
 
-class GiftSetOrBundleMonthlySpecial(models.Model):
+class GiftSetOrBundleMonthlySpecial(TrackedFieldsMixin, models.Model):
     LABEL_CHOICES = [
         ('forUs', 'For Us'),
         ('forHer', 'For Her'),
@@ -118,11 +185,27 @@ class GiftSetOrBundleMonthlySpecial(models.Model):
     price = models.DecimalField(max_digits=10, decimal_places=2)
     products = models.ManyToManyField(Product, related_name='gift_sets')
     image = models.ImageField(upload_to='gift_sets/')
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     stock = models.IntegerField(default=0)
     sold_stok = models.IntegerField(default=0)
     discount = models.DecimalField(max_digits=5, decimal_places=2, default=0)
     is_monthly_special = models.BooleanField(default=True, help_text="Apakah ini adalah produk spesial bulanan?")
+    # min stok komponen kalau ini set (api/services/composition_service.py), None kalau bukan set
+    available_stock = models.IntegerField(null=True, blank=True, editable=False)
+    # diisi api/services/ranking_service.py dari order yang sudah dibayar
+    sales_7d = models.IntegerField(default=0, editable=False)
+    sales_30d = models.IntegerField(default=0, editable=False)
+    trending_score = models.IntegerField(default=0, editable=False)
+
+    class Meta:
+        # index keyset untuk CatalogCursorPagination
+        indexes = [
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['price', 'id']),
+            models.Index(fields=['sold_stok', 'id']),
+            models.Index(fields=['trending_score', 'id']),
+        ]
 
     def __str__(self):
         return self.name
@@ -131,6 +214,19 @@ class GiftSetOrBundleMonthlySpecial(models.Model):
         if self.price < 0:
             raise ValidationError("Harga gift set tidak boleh negatif.")
 
+class SetComponent(models.Model):
+    """
+    Komposisi jewel set / gift set yang sudah diratakan ke produk daun
+    (jewel set di dalam set ikut dibuka). Dibangun ulang oleh
+    api/services/composition_service.py setiap kali keanggotaan berubah.
+    """
+    jewel_set = models.ForeignKey(Product, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    gift_set = models.ForeignKey(GiftSetOrBundleMonthlySpecial, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='set_memberships')
+
+    def __str__(self):
+        return f"{self.jewel_set or self.gift_set} <- {self.product}"
+
 class Order(models.Model):
     class PaymentStatus(models.TextChoices):
         PENDING = 'pending', 'Pending'
@@ -166,15 +262,18 @@ class Order(models.Model):
         return f"Order #{self.id} - {self.user.email} ({self.payment_status})"
 
     def update_total_price(self):
+        from .pricing import get_price_table
+
+        prices = get_price_table()
         total = 0
         for item in self.items.all():
             if item.product:
-                total += (item.product.price or 0) * item.quantity
+                total += prices.effective_price(item.product) * item.quantity
             if item.gift_set:
-                total += (item.gift_set.price or 0) * item.quantity
+                total += prices.effective_price(item.gift_set) * item.quantity
             for charm in item.charms.all():
                 if charm.charm:
-                    total += charm.charm.price or 0
+                    total += prices.effective_price(charm.charm)
         self.total_price = total
         self.save()
 
@@ -228,6 +327,63 @@ class Review(models.Model):
 
     def __str__(self):
         return f"{self.user_name} - {self.rating}⭐"
+
+class RatingAggregate(models.Model):
+    """
+    Ringkasan review per item (jumlah, total bintang, histogram 1-5). Dijaga
+    inkremental oleh api/services/rating_service.py; tepat satu dari
+    product / charm / gift_set terisi.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, null=True, blank=True, related_name='rating_summary')
+    charm = models.OneToOneField(Charm, on_delete=models.CASCADE, null=True, blank=True, related_name='rating_summary')
+    gift_set = models.OneToOneField(GiftSetOrBundleMonthlySpecial, on_delete=models.CASCADE, null=True, blank=True, related_name='rating_summary')
+    review_count = models.PositiveIntegerField(default=0)
+    rating_total = models.PositiveIntegerField(default=0)
+    stars_1 = models.PositiveIntegerField(default=0)
+    stars_2 = models.PositiveIntegerField(default=0)
+    stars_3 = models.PositiveIntegerField(default=0)
+    stars_4 = models.PositiveIntegerField(default=0)
+    stars_5 = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        item = self.product or self.charm or self.gift_set
+        return f"{item} - {self.average} ({self.review_count} review)"
+
+    @property
+    def average(self):
+        if not self.review_count:
+            return Decimal('0.00')
+        return (Decimal(self.rating_total) / self.review_count).quantize(Decimal('0.01'))
+
+    @property
+    def histogram(self):
+        return {str(star): getattr(self, f'stars_{star}') for star in range(1, 6)}
+
+
+class ItemRecommendation(models.Model):
+    """
+    "Sering dibeli bersama": top-k tetangga per item dari co-occurrence order
+    paid, dibangun ulang tiap malam oleh api/services/recommendation_service.py.
+    Sengaja tanpa FK supaya satu tabel kecil bisa memuat tiga jenis item.
+    """
+    class ItemType(models.IntegerChoices):
+        PRODUCT = 1, 'Product'
+        CHARM = 2, 'Charm'
+        GIFT_SET = 3, 'Gift Set'
+
+    source_type = models.PositiveSmallIntegerField(choices=ItemType.choices)
+    source_id = models.PositiveIntegerField()
+    target_type = models.PositiveSmallIntegerField(choices=ItemType.choices)
+    target_id = models.PositiveIntegerField()
+    # jumlah order paid yang memuat kedua item
+    score = models.PositiveIntegerField()
+    rank = models.PositiveSmallIntegerField()
+
+    class Meta:
+        indexes = [models.Index(fields=['source_type', 'source_id', 'rank'])]
+
+    def __str__(self):
+        return f"{self.get_source_type_display()} #{self.source_id} -> {self.get_target_type_display()} #{self.target_id} ({self.score})"
     
 class Cart(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
@@ -273,10 +429,24 @@ class CartItemCharm(models.Model):
         return f"{self.charm.name}x{self.quantity} - {product_name} in {user_email}'s cart"
 
 class VideoContent(models.Model):
+    class TranscodeStatus(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        PROCESSING = 'processing', 'Processing'
+        READY = 'ready', 'Ready'
+        FAILED = 'failed', 'Failed'
+
     title = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     video_file = models.FileField(upload_to='videos/')
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    # hasil transcode HLS (lihat api/services/video_transcode_service.py)
+    hls_manifest = models.CharField(max_length=255, blank=True, editable=False)
+    poster = models.ImageField(upload_to='videos/posters/', blank=True, null=True, editable=False)
+    transcode_status = models.CharField(max_length=12, choices=TranscodeStatus.choices, default=TranscodeStatus.PENDING, editable=False)
+    transcoded_source = models.CharField(max_length=255, blank=True, editable=False)
+    # file yang sedang diproses worker dan kapan mulai (deteksi job macet / file diganti)
+    processing_source = models.CharField(max_length=255, blank=True, editable=False)
+    transcode_started_at = models.DateTimeField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return self.title
@@ -302,6 +472,7 @@ class PageBanner(models.Model):
 
     page = models.CharField(max_length=30, choices=PAGE_CHOICES, unique=True)
     image = models.ImageField(upload_to='banners/')
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -311,6 +482,7 @@ class PhotoGallery(models.Model):
     alt_text = models.CharField(max_length=255)
     description = models.TextField(blank=True)
     image = models.ImageField(upload_to='photo_gallery/')
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     uploaded_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
@@ -328,12 +500,21 @@ class DiscountCampaign(models.Model):
     start_time = models.DateTimeField()
     end_time = models.DateTimeField()
 
+    class Meta:
+        indexes = [
+            # kampanye aktif / belum berakhir: end_time > now [AND start_time <= now]
+            models.Index(fields=['end_time', 'start_time']),
+            # kampanye yang akan datang (start_time > now) dan keyset pagination
+            models.Index(fields=['start_time', 'id']),
+        ]
+
     def __str__(self):
         return self.name
 
     def is_active(self):
+        # [start_time, end_time), sama dengan api/pricing.py
         now = timezone.now()
-        return self.start_time <= now <= self.end_time
+        return self.start_time <= now < self.end_time
 
 class DiscountedItem(models.Model):
     DISCOUNT_TYPE_CHOICES = [
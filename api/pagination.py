@@ -0,0 +1,175 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+class CatalogCursorPagination(CursorPagination):
+    """
+    Keyset pagination untuk katalog (products, charms, gift-sets).
+
+    Posisi cursor menyimpan nilai semua kolom ordering + `id` sebagai
+    tie-breaker, jadi setiap halaman cukup satu `WHERE (kolom, id) > (...)`
+    di atas index, tanpa OFFSET. Mode ini opt-in: pagination hanya aktif
+    kalau client mengirim `?page_size=` atau `?cursor=`, supaya client lama
+    yang mengharapkan list penuh tetap jalan.
+    """
+    page_size = 24
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+    tie_breaker = 'id'
+
+    def is_requested(self, request, view):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.is_requested(request, view):
+            return None
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+
+        reverse = bool(self.cursor and self.cursor['reverse'])
+        position = self.cursor['position'] if self.cursor else None
+        if position is not None and len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        ordering = _reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*[_order_expression(o) for o in ordering])
+        if position is not None:
+            queryset = queryset.filter(_after_position(ordering, position))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+        if reverse:
+            self.page.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        ordering = list(super().get_ordering(request, queryset, view))
+        if 'search_rank' in queryset.query.annotations and not request.query_params.get('ordering'):
+            # hasil FullTextSearchFilter: pertahankan urutan relevansi
+            ordering = ['search_rank']
+        if not any(o.lstrip('-') in (self.tie_breaker, 'pk') for o in ordering):
+            direction = '-' if ordering[-1].startswith('-') else ''
+            ordering.append(direction + self.tie_breaker)
+        return tuple(ordering)
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        if not self.page:
+            return self.encode_cursor({'reverse': False, 'position': self.cursor['position']})
+        position = self._get_position_from_instance(self.page[-1], self.ordering)
+        return self.encode_cursor({'reverse': False, 'position': position})
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return self.encode_cursor({'reverse': True, 'position': self.cursor['position']})
+        position = self._get_position_from_instance(self.page[0], self.ordering)
+        return self.encode_cursor({'reverse': True, 'position': position})
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            tokens = json.loads(urlsafe_b64decode(padded.encode('ascii')).decode('utf-8'))
+            position = tokens.get('p')
+            if position is not None and not isinstance(position, list):
+                raise ValueError
+            return {'reverse': bool(tokens.get('r', 0)), 'position': position}
+        except (TypeError, ValueError, AttributeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, cursor):
+        tokens = {'p': cursor['position']}
+        if cursor['reverse']:
+            tokens['r'] = 1
+        encoded = urlsafe_b64encode(json.dumps(tokens, separators=(',', ':')).encode('utf-8'))
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded.decode('ascii').rstrip('='))
+
+    def _get_position_from_instance(self, instance, ordering):
+        position = []
+        for order in ordering:
+            field_name = order.lstrip('-')
+            if isinstance(instance, dict):
+                value = instance[field_name]
+            else:
+                value = getattr(instance, field_name)
+            if value is not None:
+                value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+            position.append(value)
+        return position
+
+
+def _reverse_ordering(ordering):
+    return tuple(o[1:] if o.startswith('-') else '-' + o for o in ordering)
+
+
+def _order_expression(order):
+    # NULL selalu dianggap nilai terkecil supaya urutan sama di SQLite dan Postgres.
+    if order.startswith('-'):
+        return F(order[1:]).desc(nulls_last=True)
+    return F(order).asc(nulls_first=True)
+
+
+def _after_position(ordering, position):
+    """
+    Bangun kondisi keyset `(a, b, c) > (x, y, z)` dengan arah per kolom:
+    a > x  OR  (a = x AND b > y)  OR  (a = x AND b = y AND c > z)
+    """
+    condition = Q(pk__in=[])
+    equal_so_far = Q()
+    for order, value in zip(ordering, position):
+        field_name = order.lstrip('-')
+        descending = order.startswith('-')
+        if value is None:
+            after = Q(pk__in=[]) if descending else Q(**{field_name + '__isnull': False})
+            equal = Q(**{field_name + '__isnull': True})
+        else:
+            lookup = '__lt' if descending else '__gt'
+            after = Q(**{field_name + lookup: value})
+            if descending:
+                after |= Q(**{field_name + '__isnull': True})
+            equal = Q(**{field_name: value})
+        condition |= equal_so_far & after
+        equal_so_far &= equal
+    return condition
+
+
+class CampaignCursorPagination(CatalogCursorPagination):
+    """
+    Kampanye diskon, urut `start_time`. `?status=ended` dan `?status=all`
+    bisa memuat seluruh riwayat kampanye, jadi selalu dipaginasi; mode lain
+    (dan request tanpa `status`) tetap opt-in seperti katalog.
+    """
+    ordering = ('start_time', 'id')
+    paginated_statuses = ('ended', 'all')
+
+    def is_requested(self, request, view):
+        return (
+            request.query_params.get('status') in self.paginated_statuses
+            or super().is_requested(request, view)
+        )
@@ -0,0 +1,130 @@
+"""
+Harga efektif katalog.
+
+Harga efektif = harga termurah dari kandidat berikut (tidak ditumpuk):
+
+* harga dasar dikurangi `discount` (persen) milik baris itu sendiri;
+* harga dari setiap DiscountedItem yang kampanyenya sedang aktif (hanya
+  Product).
+
+Semua kampanye yang belum berakhir beserta itemnya dimuat dalam satu query
+jadi tabel terindeks waktu (`PriceTable`). Barisnya disimpan di cache katalog sampai
+batas kampanye berikutnya (`start_time`/`end_time` terdekat) dan tabel hasil
+olahannya di memori proses dengan batas yang sama. Perubahan DiscountCampaign
+/ DiscountedItem mengganti versi namespace `pricing` (lihat api/cache.py)
+sehingga tabel langsung dibangun ulang.
+
+Kampanye dianggap aktif pada interval [start_time, end_time).
+"""
+import math
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from decimal import ROUND_HALF_UP, Decimal
+
+from .cache import get_cache, get_version_info
+from .models import DiscountCampaign, Product
+
+CACHE_NAMESPACE = 'pricing'
+CENT = Decimal('0.01')
+
+
+def apply_discount(price, discount_type, value):
+    price = Decimal(price or 0)
+    value = Decimal(value or 0)
+    if discount_type == 'percent':
+        discounted = price * (Decimal(100) - value) / Decimal(100)
+    else:
+        discounted = price - value
+    return max(discounted, Decimal(0)).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+class PriceTable:
+    def __init__(self, rows, built_at):
+        # rows: (start, end, product_id, discount_type, discount_value, campaign_id), epoch detik
+        self.rows = rows
+        self.built_at = built_at
+        self.rules = defaultdict(list)
+        boundaries = []
+        for start, end, product_id, discount_type, value, campaign_id in rows:
+            if product_id is not None and start <= built_at < end:
+                self.rules[product_id].append((discount_type, Decimal(value), campaign_id))
+            boundaries.extend(t for t in (start, end) if t > built_at)
+        self.next_boundary = min(boundaries, default=None)
+
+    def is_current(self, now):
+        return self.next_boundary is None or now < self.next_boundary
+
+    def seconds_valid(self, now):
+        """Detik sampai batas kampanye berikutnya, None kalau tidak ada."""
+        if self.next_boundary is None:
+            return None
+        return max(1, math.ceil(self.next_boundary - now))
+
+    def best_offer(self, obj):
+        """(harga efektif, campaign_id atau None)."""
+        best_price = apply_discount(obj.price, 'percent', getattr(obj, 'discount', 0))
+        best_campaign = None
+        if isinstance(obj, Product):
+            for discount_type, value, campaign_id in self.rules.get(obj.pk, ()):
+                price = apply_discount(obj.price, discount_type, value)
+                if price < best_price:
+                    best_price, best_campaign = price, campaign_id
+        return best_price, best_campaign
+
+    def effective_price(self, obj):
+        return self.best_offer(obj)[0]
+
+    def resolve(self, objects):
+        """{pk: harga efektif} untuk satu list objek (satu model), tanpa query."""
+        return {obj.pk: self.effective_price(obj) for obj in objects}
+
+
+def _load_rows(now):
+    # LEFT JOIN: kampanye tanpa item tetap ikut menentukan batas waktu
+    # (endpoint kampanye aktif/upcoming bergantung padanya)
+    rows = DiscountCampaign.objects.filter(
+        end_time__gt=datetime.fromtimestamp(now, tz=timezone.utc),
+    ).values_list(
+        'start_time', 'end_time', 'items__product_id',
+        'items__discount_type', 'items__discount_value', 'id',
+    )
+    return [
+        (start.timestamp(), end.timestamp(), product_id, discount_type,
+         None if value is None else str(value), campaign_id)
+        for start, end, product_id, discount_type, value, campaign_id in rows
+    ]
+
+
+_table = None
+_table_version = None
+_lock = threading.Lock()
+
+
+def get_price_table(now=None):
+    global _table, _table_version
+    now = time.time() if now is None else now
+    version = get_version_info(CACHE_NAMESPACE)['token']
+    table = _table
+    if table is not None and _table_version == version and table.built_at <= now and table.is_current(now):
+        return table
+
+    with _lock:
+        cache = get_cache()
+        key = f'pricing:table:{version}'
+        entry = cache.get(key)
+        table = PriceTable(entry['rows'], entry['built_at']) if entry is not None else None
+        if table is None or table.built_at > now or not table.is_current(now):
+            table = PriceTable(_load_rows(now), now)
+            # entry kedaluwarsa tepat di batas kampanye berikutnya
+            cache.set(key, {'rows': table.rows, 'built_at': now}, timeout=table.seconds_valid(now))
+        _table, _table_version = table, version
+    return table
+
+
+def price_table_for(context):
+    """Satu tabel per serialisasi: disimpan di context serializer root."""
+    if 'price_table' not in context:
+        context['price_table'] = get_price_table()
+    return context['price_table']
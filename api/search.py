@@ -0,0 +1,238 @@
+"""
+Index full-text untuk Product dan Charm.
+
+Index disimpan di tabel bayangan `api_catalogsearch` yang diisi lewat signal
+(lihat api/signals.py) dan bisa dibangun ulang dengan
+`python manage.py rebuild_search_index`.
+
+* PostgreSQL: kolom `tsvector` berbobot + GIN index.
+* SQLite (dev): virtual table FTS5, ranking dengan bm25().
+
+Pencarian tidak mengambil daftar id ke Python: `search_expressions`
+menghasilkan kondisi match (subquery ke index) dan ekspresi rank per baris
+(lookup index per primary key), jadi filter, urutan rank dan pagination
+semuanya terjadi di SQL tanpa batas jumlah hasil. Rank dinormalisasi supaya
+nilai lebih kecil = lebih relevan di semua backend.
+
+Backend lain tidak punya index; `FullTextSearchFilter` lalu jatuh kembali ke
+`SearchFilter` biasa.
+"""
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Charm, Product
+
+SEARCH_TABLE = 'api_catalogsearch'
+
+# kode model dipakai di kolom `model` dan untuk rowid FTS5
+INDEXED_MODELS = {
+    Product: 'product',
+    Charm: 'charm',
+}
+_ROWID_CODES = {'product': 1, 'charm': 2}
+
+
+def search_document(obj):
+    """Kolom teks yang diindex, urut dari bobot tertinggi ke terendah."""
+    return {
+        'name': obj.name or '',
+        'category': f'{obj.category} {obj.get_category_display()}',
+        'label': f'{obj.label} {obj.get_label_display()}' if obj.label != 'null' else '',
+        'description': obj.description or '',
+        'details': getattr(obj, 'details', None) or '',
+    }
+
+
+def tokenize_query(query):
+    return re.findall(r'\w+', query.lower())
+
+
+class PostgresSearchBackend:
+    weights = {'name': 'A', 'category': 'B', 'label': 'B', 'description': 'C', 'details': 'D'}
+
+    def ensure_table(self, cursor):
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} (
+                model varchar(20) NOT NULL,
+                object_id bigint NOT NULL,
+                document tsvector NOT NULL,
+                PRIMARY KEY (model, object_id)
+            )
+        """)
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {SEARCH_TABLE}_document_gin "
+            f"ON {SEARCH_TABLE} USING gin (document)"
+        )
+
+    def index(self, cursor, model_code, object_id, document):
+        vector = ' || '.join(
+            f"setweight(to_tsvector('simple', %s), '{weight}')" for weight in self.weights.values()
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {SEARCH_TABLE} (model, object_id, document)
+            VALUES (%s, %s, {vector})
+            ON CONFLICT (model, object_id) DO UPDATE SET document = EXCLUDED.document
+            """,
+            [model_code, object_id, *[document[column] for column in self.weights]],
+        )
+
+    def remove(self, cursor, model_code, object_id):
+        cursor.execute(
+            f"DELETE FROM {SEARCH_TABLE} WHERE model = %s AND object_id = %s",
+            [model_code, object_id],
+        )
+
+    def clear(self, cursor, model_code):
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE model = %s", [model_code])
+
+    def _tsquery(self, tokens):
+        return ' & '.join(f'{token}:*' for token in tokens)
+
+    def match_sql(self, model_code, tokens):
+        return (
+            f"SELECT object_id FROM {SEARCH_TABLE} "
+            f"WHERE model = %s AND document @@ to_tsquery('simple', %s)",
+            [model_code, self._tsquery(tokens)],
+        )
+
+    def rank_sql(self, model_code, tokens, outer_pk):
+        # float8: nilai rank ikut cursor pagination, harus sama persis saat dibandingkan lagi
+        return (
+            f"(SELECT -CAST(ts_rank(document, to_tsquery('simple', %s)) AS double precision) "
+            f"FROM {SEARCH_TABLE} WHERE model = %s AND object_id = {outer_pk})",
+            [self._tsquery(tokens), model_code],
+        )
+
+
+class SqliteFtsSearchBackend:
+    columns = ('name', 'category', 'label', 'description', 'details')
+    # bobot bm25 per kolom, urutannya sama dengan definisi tabel
+    bm25_weights = '0, 0, 10.0, 4.0, 4.0, 1.0, 0.5'
+
+    def ensure_table(self, cursor):
+        cursor.execute(f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5(
+                model UNINDEXED, object_id UNINDEXED, {', '.join(self.columns)},
+                tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+            )
+        """)
+
+    def _rowid(self, model_code, object_id):
+        return object_id * 10 + _ROWID_CODES[model_code]
+
+    def index(self, cursor, model_code, object_id, document):
+        cursor.execute(
+            f"INSERT OR REPLACE INTO {SEARCH_TABLE} (rowid, model, object_id, {', '.join(self.columns)}) "
+            f"VALUES (%s, %s, %s, {', '.join(['%s'] * len(self.columns))})",
+            [self._rowid(model_code, object_id), model_code, object_id, *[document[c] for c in self.columns]],
+        )
+
+    def remove(self, cursor, model_code, object_id):
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid = %s", [self._rowid(model_code, object_id)])
+
+    def clear(self, cursor, model_code):
+        cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE model = %s", [model_code])
+
+    def _match(self, tokens):
+        return ' '.join(f'"{token}"*' for token in tokens)
+
+    def match_sql(self, model_code, tokens):
+        return (
+            f"SELECT object_id FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s AND model = %s",
+            [self._match(tokens), model_code],
+        )
+
+    def rank_sql(self, model_code, tokens, outer_pk):
+        # bm25 makin kecil makin relevan; baris dicari lewat rowid (pk * 10 + kode model)
+        return (
+            f"(SELECT bm25({SEARCH_TABLE}, {self.bm25_weights}) FROM {SEARCH_TABLE} "
+            f"WHERE {SEARCH_TABLE} MATCH %s AND rowid = {outer_pk} * 10 + {_ROWID_CODES[model_code]:d})",
+            [self._match(tokens)],
+        )
+
+
+def get_search_backend():
+    vendor = connection.vendor
+    if vendor == 'postgresql':
+        return PostgresSearchBackend()
+    if vendor == 'sqlite':
+        return SqliteFtsSearchBackend()
+    return None
+
+
+def is_indexed(model):
+    return model in INDEXED_MODELS
+
+
+def ensure_search_table():
+    backend = get_search_backend()
+    if backend is None:
+        return
+    with connection.cursor() as cursor:
+        backend.ensure_table(cursor)
+
+
+def index_object(obj):
+    backend = get_search_backend()
+    if backend is None:
+        return
+    with connection.cursor() as cursor:
+        backend.index(cursor, INDEXED_MODELS[type(obj)], obj.pk, search_document(obj))
+
+
+def index_objects(objs):
+    """Index banyak objek (campuran Product/Charm) dengan satu cursor, mis. setelah bulk_create."""
+    backend = get_search_backend()
+    if backend is None:
+        return
+    with connection.cursor() as cursor:
+        for obj in objs:
+            backend.index(cursor, INDEXED_MODELS[type(obj)], obj.pk, search_document(obj))
+
+
+def remove_object(model, pk):
+    backend = get_search_backend()
+    if backend is None:
+        return
+    with connection.cursor() as cursor:
+        backend.remove(cursor, INDEXED_MODELS[model], pk)
+
+
+def rebuild_index(model, batch_size=500):
+    backend = get_search_backend()
+    if backend is None:
+        return 0
+    model_code = INDEXED_MODELS[model]
+    total = 0
+    with connection.cursor() as cursor:
+        backend.ensure_table(cursor)
+        backend.clear(cursor, model_code)
+        for obj in model.objects.order_by('pk').iterator(chunk_size=batch_size):
+            backend.index(cursor, model_code, obj.pk, search_document(obj))
+            total += 1
+    return total
+
+
+def search_expressions(model, query):
+    """
+    (kondisi match, ekspresi rank) untuk queryset `model`; rank kecil = lebih
+    relevan. None kalau index tidak tersedia.
+    """
+    backend = get_search_backend()
+    if backend is None or not is_indexed(model):
+        return None
+    tokens = tokenize_query(query)
+    if not tokens:
+        return None
+    model_code = INDEXED_MODELS[model]
+    outer_pk = f'{connection.ops.quote_name(model._meta.db_table)}.{connection.ops.quote_name(model._meta.pk.column)}'
+    match_sql, match_params = backend.match_sql(model_code, tokens)
+    rank_sql, rank_params = backend.rank_sql(model_code, tokens, outer_pk)
+    return (
+        Q(pk__in=RawSQL(match_sql, match_params)),
+        RawSQL(rank_sql, rank_params, output_field=FloatField()),
+    )
@@ -1,15 +1,20 @@
+from collections import Counter
 from django.utils import timezone
 from datetime import timedelta
 from django.contrib.auth import get_user_model
 from rest_framework import serializers
-from .models import Charm, GiftSetOrBundleMonthlySpecial, JNTLocation, JNTOrder, OrderItem, OrderItemCharm, Product, Order, Review, NewsletterSubscriber, CartItem, Cart, CartItemCharm, VideoContent, ProductImage, PageBanner, PhotoGallery, DiscountedItem, DiscountCampaign
+from .models import Charm, GiftSetOrBundleMonthlySpecial, JNTLocation, JNTOrder, OrderItem, OrderItemCharm, Product, Order, RatingAggregate, Review, NewsletterSubscriber, CartItem, Cart, CartItemCharm, VideoContent, ProductImage, PageBanner, PhotoGallery, DiscountedItem, DiscountCampaign
 from django.core.mail import send_mail
 from django.conf import settings
+from .services.cart_pricing_service import cart_pricing_for
+from .services.image_variant_service import build_srcset
+from .pricing import apply_discount, price_table_for
+from sparklore.fieldsets import SparseFieldsetMixin
 import textwrap
 
 User = get_user_model()
 
-class NewsletterSubscriberSerializer(serializers.ModelSerializer):
+class NewsletterSubscriberSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     email = serializers.EmailField(write_only=True)  
     user_email = serializers.SerializerMethodField() 
     subscribed_at = serializers.DateTimeField(read_only=True)
@@ -58,17 +63,51 @@ class NewsletterSubscriberSerializer(serializers.ModelSerializer):
 
         return subscriber
 
-class CharmSerializer(serializers.ModelSerializer):
+class ImageVariantsMixin(serializers.Serializer):
+    """`image_srcset`: {format: srcset} dari turunan gambar yang sudah dibuat."""
+    image_srcset = serializers.SerializerMethodField()
+
+    def get_image_srcset(self, obj):
+        return build_srcset(self.context.get('request'), obj.image_variants)
+
+class EffectivePriceField(serializers.DecimalField):
+    """Harga setelah diskon baris + kampanye aktif (lihat api/pricing.py)."""
+    def __init__(self, **kwargs):
+        super().__init__(max_digits=12, decimal_places=2, source='*', read_only=True, **kwargs)
+
+    def to_representation(self, obj):
+        return super().to_representation(price_table_for(self.context).effective_price(obj))
+
+class RatingSummaryField(serializers.Field):
+    """{count, average, histogram} dari RatingAggregate (select_related `rating_summary`)."""
+    def __init__(self, **kwargs):
+        super().__init__(source='*', read_only=True, **kwargs)
+
+    def to_representation(self, obj):
+        try:
+            summary = obj.rating_summary
+        except RatingAggregate.DoesNotExist:
+            summary = RatingAggregate()
+        return {
+            'count': summary.review_count,
+            'average': str(summary.average),
+            'histogram': summary.histogram,
+        }
+
+class CharmSerializer(SparseFieldsetMixin, ImageVariantsMixin, serializers.ModelSerializer):
+    effective_price = EffectivePriceField()
+    rating_summary = RatingSummaryField()
+
     class Meta:
         model = Charm
-        fields = '__all__'
+        exclude = ['image_variants']
 
-class ProductImageSerializer(serializers.ModelSerializer):
+class ProductImageSerializer(SparseFieldsetMixin, ImageVariantsMixin, serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
 
     class Meta:
         model = ProductImage
-        fields = ['id', 'image_url', 'alt_text']
+        fields = ['id', 'image_url', 'alt_text', 'image_srcset']
 
     def get_image_url(self, obj):
         request = self.context.get('request')
@@ -76,9 +115,11 @@ class ProductImageSerializer(serializers.ModelSerializer):
             return request.build_absolute_uri(obj.image.url)
         return None
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     jewel_set_products = serializers.PrimaryKeyRelatedField(many=True, queryset=Product.objects.all(), required=False)
     images = ProductImageSerializer(many=True, read_only=True)
+    effective_price = EffectivePriceField()
+    rating_summary = RatingSummaryField()
 
     class Meta:
         model = Product
@@ -101,18 +142,22 @@ class ProductSerializer(serializers.ModelSerializer):
             
         return data
 
-class ProductInGiftSetSerializer(serializers.ModelSerializer):
+class ProductInGiftSetSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    effective_price = EffectivePriceField()
+
     class Meta:
         model = Product
-        fields = ['id', 'name', 'category', 'price', 'label']
+        fields = ['id', 'name', 'category', 'price', 'effective_price', 'label']
 
-class GiftSetOrBundleMonthlySpecialProductSerializer(serializers.ModelSerializer):
+class GiftSetOrBundleMonthlySpecialProductSerializer(SparseFieldsetMixin, ImageVariantsMixin, serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
     products = ProductInGiftSetSerializer(many=True, read_only=True)
+    effective_price = EffectivePriceField()
+    rating_summary = RatingSummaryField()
 
     class Meta:
         model = GiftSetOrBundleMonthlySpecial
-        fields = '__all__'
+        exclude = ['image_variants']
 
     def get_image_url(self, obj):
         request = self.context.get('request')
@@ -120,10 +165,33 @@ class GiftSetOrBundleMonthlySpecialProductSerializer(serializers.ModelSerializer
             return request.build_absolute_uri(obj.image.url)
         return None
 
-class ReviewSerializer(serializers.ModelSerializer):
-    products = ProductSerializer(many=True, read_only=True)
-    charms = CharmSerializer(many=True, read_only=True)
-    gift_sets = GiftSetOrBundleMonthlySpecialProductSerializer(many=True, read_only=True)
+def requested_expansions(request, allowed):
+    """Nama relasi dari `?expand=a,b` yang dikenal; `?expand=all` untuk semua."""
+    if request is None:
+        return set()
+    requested = {name.strip() for name in request.query_params.get('expand', '').split(',') if name.strip()}
+    if 'all' in requested:
+        return set(allowed)
+    return requested & set(allowed)
+
+class ItemReferenceSerializer(SparseFieldsetMixin, serializers.Serializer):
+    id = serializers.IntegerField(read_only=True)
+    name = serializers.CharField(read_only=True)
+
+class ReviewSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """
+    Item yang direview tampil ringkas ({id, name}); `?expand=products,charms,
+    gift_sets` (atau `all`) mengganti relasi terkait dengan serializer penuh.
+    """
+    expandable_fields = {
+        'products': ProductSerializer,
+        'charms': CharmSerializer,
+        'gift_sets': GiftSetOrBundleMonthlySpecialProductSerializer,
+    }
+
+    products = ItemReferenceSerializer(many=True, read_only=True)
+    charms = ItemReferenceSerializer(many=True, read_only=True)
+    gift_sets = ItemReferenceSerializer(many=True, read_only=True)
 
     # supaya saat create tetap bisa pakai id
     product_ids = serializers.PrimaryKeyRelatedField(
@@ -147,6 +215,11 @@ class ReviewSerializer(serializers.ModelSerializer):
             'product_ids', 'charm_ids', 'gift_set_ids'
         ]
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        for name in requested_expansions(self.context.get('request'), self.expandable_fields):
+            self.fields[name] = self.expandable_fields[name](many=True, read_only=True)
+
     def create(self, validated_data):
         products = validated_data.pop('product_ids', [])
         charms = validated_data.pop('charm_ids', [])
@@ -175,17 +248,27 @@ class ReviewSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Rating harus antara 1 dan 5.")
         return value
 
-class VideoContentSerializer(serializers.ModelSerializer):
+class VideoContentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    hls_url = serializers.SerializerMethodField()
+
     class Meta:
         model = VideoContent
-        fields = '__all__'
+        exclude = ['hls_manifest', 'transcoded_source']
+        read_only_fields = ['poster', 'transcode_status']
 
-class PageBannerSerializer(serializers.ModelSerializer):
+    def get_hls_url(self, obj):
+        if obj.transcode_status != VideoContent.TranscodeStatus.READY or not obj.hls_manifest:
+            return None
+        url = obj.video_file.storage.url(obj.hls_manifest)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+class PageBannerSerializer(SparseFieldsetMixin, ImageVariantsMixin, serializers.ModelSerializer):
     image_url = serializers.SerializerMethodField()
 
     class Meta:
         model = PageBanner
-        fields = ['page', 'image_url']
+        fields = ['page', 'image_url', 'image_srcset']
 
     def get_image_url(self, obj):
         request = self.context.get('request')
@@ -194,33 +277,61 @@ class PageBannerSerializer(serializers.ModelSerializer):
         return None
 
 
-class PhotoGalerySerializer(serializers.ModelSerializer):
+class PhotoGalerySerializer(SparseFieldsetMixin, ImageVariantsMixin, serializers.ModelSerializer):
     class Meta:
         model = PhotoGallery
-        fields = ['id', 'image', 'alt_text']
+        fields = ['id', 'image', 'alt_text', 'image_srcset']
 
-class DiscountedItemSerializer(serializers.ModelSerializer):
-    product = ProductSerializer()
+class CampaignProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """Produk versi ringkas untuk item kampanye: cukup untuk kartu produk."""
+    effective_price = EffectivePriceField()
+    thumbnail = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'category', 'label', 'price', 'effective_price', 'stock', 'available_stock', 'rating', 'thumbnail']
+
+    def get_thumbnail(self, obj):
+        # images sudah di-prefetch; ambil dari cache prefetch, bukan query baru
+        images = obj.images.all()
+        if not images:
+            return None
+        return ProductImageSerializer(images[0], context=self.context).data
+
+class DiscountedItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    product = CampaignProductSerializer()
+    discounted_price = serializers.SerializerMethodField()
 
     class Meta:
         model = DiscountedItem
-        fields = ['product', 'discount_type', 'discount_value']
+        fields = ['product', 'discount_type', 'discount_value', 'discounted_price']
+
+    def get_discounted_price(self, obj):
+        # harga produk dengan diskon item ini saja (harga efektif ada di product)
+        return str(apply_discount(obj.product.price, obj.discount_type, obj.discount_value))
 
-class DiscountCampaignSerializer(serializers.ModelSerializer):
+class DiscountCampaignSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     items = DiscountedItemSerializer(many=True, read_only=True)
+    status = serializers.SerializerMethodField()
 
     class Meta:
         model = DiscountCampaign
-        fields = ['id', 'name', 'description', 'start_time', 'end_time', 'items']
+        fields = ['id', 'name', 'description', 'start_time', 'end_time', 'status', 'items']
+
+    def get_status(self, obj):
+        now = timezone.now()
+        if now < obj.start_time:
+            return 'upcoming'
+        return 'active' if now < obj.end_time else 'ended'
 
-class OrderItemCharmSerializer(serializers.ModelSerializer):
+class OrderItemCharmSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     charm_name = serializers.CharField(source='charm.name', read_only=True)
 
     class Meta:
         model = OrderItemCharm
         fields = ['id', 'charm', 'charm_name']
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     product_name = serializers.CharField(source='product.name', read_only=True)
     gift_set_name = serializers.CharField(source='gift_set.name', read_only=True)
     charms = OrderItemCharmSerializer(many=True, read_only=True)
@@ -229,7 +340,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         model = OrderItem
         fields = ['id', 'product', 'product_name', 'gift_set', 'gift_set_name', 'quantity', 'charms', 'message']
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     user_email = serializers.CharField(source='user.email', read_only=True)
 
@@ -273,7 +384,7 @@ def humanize_timesince(dt):
 
         return ' '.join(strings) + " ago"
 
-class OrderTableSerializer(serializers.ModelSerializer):
+class OrderTableSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     time_elapsed = serializers.SerializerMethodField()
     product_summary = OrderItemSerializer(many=True, read_only=True, source='items')
     message = serializers.SerializerMethodField()
@@ -293,10 +404,10 @@ class OrderTableSerializer(serializers.ModelSerializer):
     def get_message(self, obj):
         return obj.rejection_reason or "No message"
 
-class CartItemCharmSerializer(serializers.ModelSerializer):
+class CartItemCharmSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta: model = CartItemCharm; fields = ['charm_id']
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     quantity = serializers.IntegerField(required=False, default=1)
     product = serializers.PrimaryKeyRelatedField(queryset=Product.objects.all(), required=False)
     gift_set = serializers.PrimaryKeyRelatedField(queryset=GiftSetOrBundleMonthlySpecial.objects.all(), required=False)
@@ -306,10 +417,17 @@ class CartItemSerializer(serializers.ModelSerializer):
     )
     charms = serializers.SerializerMethodField(read_only=True)
     source_type = serializers.SerializerMethodField(read_only=True)
+    unit_price = serializers.SerializerMethodField(read_only=True)
+    charms_price = serializers.SerializerMethodField(read_only=True)
+    discount = serializers.SerializerMethodField(read_only=True)
+    line_total = serializers.SerializerMethodField(read_only=True)
 
     class Meta:
         model = CartItem
-        fields = ['id', 'product', 'gift_set', 'quantity', 'charms_input', 'charms', 'source_type', 'message']
+        fields = [
+            'id', 'product', 'gift_set', 'quantity', 'charms_input', 'charms', 'source_type',
+            'unit_price', 'charms_price', 'discount', 'line_total', 'message',
+        ]
 
     def get_source_type(self, obj):
         if obj.product:
@@ -318,17 +436,51 @@ class CartItemSerializer(serializers.ModelSerializer):
             return 'gift_set'
         return 'charms_only'
 
+    def get_unit_price(self, obj):
+        # harga efektif produk / gift set (tanpa charms)
+        base = obj.product or obj.gift_set
+        if base is None:
+            return None
+        return str(price_table_for(self.context).effective_price(base))
+
+    def _line(self, obj):
+        # snapshot harga diisi CartSerializer (api/services/cart_pricing_service.py)
+        pricing = self.context.get('cart_pricing')
+        return pricing['items'].get(obj.pk) if pricing else None
+
+    def get_charms_price(self, obj):
+        line = self._line(obj)
+        return str(line['charms_price']) if line else None
+
+    def get_discount(self, obj):
+        line = self._line(obj)
+        return str(line['discount']) if line else None
+
+    def get_line_total(self, obj):
+        line = self._line(obj)
+        return str(line['total']) if line else None
+
     def get_charms(self, obj):
-        charm_items = CartItemCharm.objects.filter(item=obj)
+        # baris charm di-prefetch oleh CartViewSet; cukup charm_id, tanpa load Charm
         result = []
-        for charm_item in charm_items:
-            result.extend([charm_item.charm.id] * charm_item.quantity)
+        for charm_item in obj.cartitemcharm_set.all():
+            result.extend([charm_item.charm_id] * charm_item.quantity)
         return result
 
     def validate(self, data):
         product = data.get('product') if 'product' in data else getattr(self.instance, 'product', None)
         gift_set = data.get('gift_set') if 'gift_set' in data else getattr(self.instance, 'gift_set', None)
-        charms = data.get('charms', [])
+        charms = data.get('charms_input') or []
+
+        charm_ids = set(charms)
+        if charm_ids:
+            # satu query untuk semua id; id yang tidak ada dilaporkan sekaligus
+            found = set(Charm.objects.filter(pk__in=charm_ids).values_list('pk', flat=True))
+            unknown = sorted(charm_ids - found)
+            if unknown:
+                raise serializers.ValidationError({
+                    'charms': [f"Charm tidak ditemukan: {', '.join(map(str, unknown))}."],
+                })
 
         if gift_set and (product or charms):
             raise serializers.ValidationError('Gift set tidak boleh dikombinasikan dengan produk atau charms.')
@@ -350,23 +502,48 @@ class CartItemSerializer(serializers.ModelSerializer):
         return data
 
     def create(self, validated_data):
-        validated_data.pop('charms_input', None)
-        return super().create(validated_data)
+        charms = validated_data.pop('charms_input', None)
+        item = super().create(validated_data)
+        if charms:
+            self.set_charms(item, charms)
+        return item
 
     def update(self, instance, validated_data):
-        validated_data.pop('charms_input', None)
-        return super().update(instance, validated_data)
+        charms = validated_data.pop('charms_input', None)
+        item = super().update(instance, validated_data)
+        if charms is not None:
+            self.set_charms(item, charms)
+        return item
+
+    @staticmethod
+    def set_charms(item, charm_ids):
+        """Ganti charms item; id sudah divalidasi di `validate`, ditulis dengan satu bulk_create."""
+        item.charms.clear()
+        CartItemCharm.objects.bulk_create(
+            CartItemCharm(item=item, charm_id=charm_id, quantity=qty)
+            for charm_id, qty in Counter(charm_ids).items()
+        )
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     items = CartItemSerializer(many=True)
-    class Meta: model = Cart; fields = ['id','items']
+    totals = serializers.SerializerMethodField()
+    class Meta: model = Cart; fields = ['id','items','totals']
+
+    def to_representation(self, instance):
+        # satu snapshot harga untuk semua item, dibaca oleh CartItemSerializer
+        cart_pricing_for(self.context, instance)
+        return super().to_representation(instance)
+
+    def get_totals(self, obj):
+        pricing = self.context['cart_pricing']
+        return {name: str(pricing[name]) for name in ('subtotal', 'discount', 'total')}
 
-class JNTLocationSerializer(serializers.ModelSerializer):
+class JNTLocationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = JNTLocation
         fields = '__all__'
 
-class JNTOrderSerializer(serializers.ModelSerializer):
+class JNTOrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = JNTOrder
         fields = ["orderid", "status", "awb_no", "desCode", "etd"]
\ No newline at end of file
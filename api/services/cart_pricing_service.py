@@ -0,0 +1,97 @@
+"""
+Total cart dihitung di server.
+
+Per item: harga efektif produk / gift set x quantity, ditambah harga efektif
+setiap charm x quantity baris charm (charm dihitung per item, tidak dikali
+quantity item, sama seperti checkout). `subtotal` memakai harga dasar,
+`discount` selisihnya dengan `total`. Semua Decimal.
+
+Harga diambil dari tabel harga (api/pricing.py) dan satu query `in_bulk`
+untuk semua charm di cart. Hasilnya disimpan sebagai snapshot di cache katalog
+dengan key isi cart (item, produk/gift set, quantity, charms) + versi
+namespace katalog dan tabel harga, jadi tampilan cart berikutnya dan checkout
+memakai snapshot yang sama selama isi cart dan harga tidak berubah.
+"""
+import hashlib
+from decimal import Decimal
+
+from django.db.models import Prefetch, prefetch_related_objects
+
+from ..cache import cache_validity, get_cache
+from ..models import CartItem, CartItemCharm, Charm
+from ..pricing import get_price_table
+
+PRICING_NAMESPACES = ('products', 'charms', 'gift-sets')
+ZERO = Decimal('0.00')
+
+
+def cart_prefetch():
+    """Lookup prefetch cart: items (+ produk, gift set) dan baris charm-nya."""
+    return (
+        Prefetch('items', queryset=CartItem.objects.select_related('product', 'gift_set').order_by('pk')),
+        Prefetch('items__cartitemcharm_set', queryset=CartItemCharm.objects.order_by('pk')),
+    )
+
+
+def cart_contents(items):
+    return tuple(
+        (item.pk, item.product_id, item.gift_set_id, item.quantity,
+         tuple((row.charm_id, row.quantity) for row in item.cartitemcharm_set.all()))
+        for item in items
+    )
+
+
+def price_items(items, prices):
+    charm_ids = {row.charm_id for item in items for row in item.cartitemcharm_set.all()}
+    charms = Charm.objects.only('id', 'price', 'discount').in_bulk(charm_ids) if charm_ids else {}
+
+    lines = {}
+    for item in items:
+        base = item.product or item.gift_set
+        unit_price = prices.effective_price(base) if base is not None else ZERO
+        subtotal = (base.price if base is not None else ZERO) * item.quantity
+        total = unit_price * item.quantity
+        charms_total = ZERO
+        for row in item.cartitemcharm_set.all():
+            charm = charms.get(row.charm_id)
+            if charm is None:
+                continue
+            charms_total += prices.effective_price(charm) * row.quantity
+            subtotal += charm.price * row.quantity
+        total += charms_total
+        lines[item.pk] = {
+            'unit_price': unit_price,
+            'charms_price': charms_total,
+            'subtotal': subtotal,
+            'discount': subtotal - total,
+            'total': total,
+        }
+    return {
+        'items': lines,
+        'subtotal': sum((line['subtotal'] for line in lines.values()), ZERO),
+        'discount': sum((line['discount'] for line in lines.values()), ZERO),
+        'total': sum((line['total'] for line in lines.values()), ZERO),
+    }
+
+
+def get_cart_pricing(cart):
+    """Snapshot harga cart; relasi yang belum di-prefetch dimuat di sini."""
+    prefetch_related_objects([cart], *cart_prefetch())
+    items = list(cart.items.all())
+    token, _, timeout = cache_validity(PRICING_NAMESPACES, pricing_dependent=True)
+    digest = hashlib.md5(repr(cart_contents(items)).encode('utf-8')).hexdigest()
+    key = f'cart:pricing:{token}:{digest}'
+
+    cache = get_cache()
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = price_items(items, get_price_table())
+        cache.set(key, snapshot, timeout=timeout)
+    return snapshot
+
+
+def cart_pricing_for(context, cart):
+    """Satu snapshot per serialisasi: disimpan di context serializer root."""
+    if 'cart_pricing' not in context:
+        context['cart_pricing'] = get_cart_pricing(cart)
+    return context['cart_pricing']
@@ -0,0 +1,330 @@
+"""
+Import/export katalog (Product, Charm, gambar produk, link jewel set) dalam
+format CSV atau JSONL, satu baris per item.
+
+Kolom: lihat `COLUMNS`. `type` wajib (`product`/`charm`). Baris dengan `id`
+meng-update item itu, tanpa `id` membuat item baru. `ref` adalah nama bebas
+supaya `jewel_set_products` bisa menunjuk produk baru di file yang sama;
+isinya daftar id atau ref (CSV: dipisah `|`). `images` adalah daftar path
+file di storage (CSV: dipisah `|`) dan, kalau diisi, mengganti semua gambar
+produk itu. Di CSV sel kosong berarti "tidak diubah"; di JSONL key yang tidak
+ada.
+
+Seluruh file divalidasi dulu (full model validation, id dan ref harus ada);
+kalau ada satu saja error tidak ada yang ditulis. Penulisan memakai
+bulk_create/bulk_update per batch dalam satu transaksi, jadi signal per-objek
+tidak jalan: invalidasi cache, index pencarian, komposisi set dan turunan
+gambar diurus di sini. Export menghasilkan format yang sama (dengan `id`)
+sehingga file hasil export bisa diedit lalu di-import kembali.
+"""
+import csv
+import io
+import json
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import Prefetch
+
+from ..cache import CACHE_DEPENDENCIES, bump_version
+from ..models import Charm, Product, ProductImage
+from ..search import index_objects
+from ..tasks import enqueue, generate_image_variants
+from .composition_service import rebuild_compositions, refresh_for_components
+from .image_variant_service import needs_variants
+
+BATCH_SIZE = 500
+LIST_SEPARATOR = '|'
+FORMATS = ('csv', 'jsonl')
+
+PRODUCT_FIELDS = (
+    'name', 'category', 'label', 'price', 'discount', 'stock', 'description', 'details',
+    'charms', 'is_charm_spreadable', 'is_charm_max3', 'is_charm_max5',
+)
+CHARM_FIELDS = ('name', 'category', 'label', 'price', 'discount', 'stock', 'description', 'image')
+MODELS = {
+    'product': (Product, PRODUCT_FIELDS),
+    'charm': (Charm, CHARM_FIELDS),
+}
+COLUMNS = (
+    'type', 'id', 'ref', 'name', 'category', 'label', 'price', 'discount', 'stock',
+    'description', 'details', 'image', 'images', 'jewel_set_products',
+    'charms', 'is_charm_spreadable', 'is_charm_max3', 'is_charm_max5',
+)
+LIST_COLUMNS = ('images', 'jewel_set_products')
+_TRUE = {'1', 'true', 't', 'yes', 'y'}
+_FALSE = {'0', 'false', 'f', 'no', 'n'}
+
+
+class CatalogImportError(Exception):
+    def __init__(self, errors):
+        # errors: [(nomor baris, pesan)]
+        self.errors = errors
+        super().__init__(f"{len(errors)} error di file katalog")
+
+
+def detect_format(filename):
+    return 'jsonl' if filename.lower().endswith(('.jsonl', '.ndjson', '.json')) else 'csv'
+
+
+def read_records(stream, fmt):
+    """(nomor baris, dict) dari file teks; sel/key kosong dibuang."""
+    if fmt == 'jsonl':
+        for line_no, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError as exc:
+                yield line_no, exc
+                continue
+            yield line_no, record if isinstance(record, dict) else ValueError("Baris harus berupa object JSON")
+    else:
+        reader = csv.DictReader(stream)
+        for record in reader:
+            record = {key: value for key, value in record.items() if key and value not in (None, '')}
+            for column in LIST_COLUMNS:
+                if column in record:
+                    record[column] = [part.strip() for part in record[column].split(LIST_SEPARATOR) if part.strip()]
+            yield reader.line_num, record
+
+
+def _to_python(field, value):
+    if isinstance(field, models.BooleanField) and isinstance(value, str):
+        lowered = value.strip().lower()
+        if lowered in _TRUE:
+            return True
+        if lowered in _FALSE:
+            return False
+        raise ValidationError(f"'{value}' bukan nilai boolean")
+    return field.to_python(value)
+
+
+def _messages(exc):
+    if not hasattr(exc, 'error_dict'):
+        return exc.messages
+    return [
+        ' '.join(messages) if name == '__all__' else f"{name}: {' '.join(messages)}"
+        for name, messages in exc.message_dict.items()
+    ]
+
+
+class _Row:
+    def __init__(self, line_no, kind, instance, fields, images=None, links=None):
+        self.line_no = line_no
+        self.kind = kind
+        self.instance = instance
+        self.fields = fields
+        self.images = images
+        self.links = links
+
+
+def _build_rows(records):
+    """Parse + validasi semua baris. Mengembalikan (rows, {ref: row}, errors)."""
+    rows, errors = [], []
+    parsed = []
+    wanted = defaultdict(set)
+    for line_no, record in records:
+        if isinstance(record, Exception):
+            errors.append((line_no, str(record)))
+            continue
+        kind = str(record.get('type', '')).strip().lower()
+        if kind not in MODELS:
+            errors.append((line_no, f"type harus salah satu dari: {', '.join(MODELS)}"))
+            continue
+        pk = record.get('id')
+        if pk is not None:
+            try:
+                pk = int(pk)
+            except (TypeError, ValueError):
+                errors.append((line_no, f"id '{pk}' tidak valid"))
+                continue
+            wanted[kind].add(pk)
+        parsed.append((line_no, kind, pk, record))
+
+    existing = {kind: MODELS[kind][0].objects.in_bulk(ids) for kind, ids in wanted.items()}
+    refs = {}
+    for line_no, kind, pk, record in parsed:
+        model, allowed = MODELS[kind]
+        unknown = set(record) - set(allowed) - {'type', 'id', 'ref'} - (set(LIST_COLUMNS) if kind == 'product' else set())
+        if unknown:
+            errors.append((line_no, f"kolom tidak dikenal untuk {kind}: {', '.join(sorted(unknown))}"))
+            continue
+        if pk is not None:
+            instance = existing[kind].get(pk)
+            if instance is None:
+                errors.append((line_no, f"{kind} id {pk} tidak ditemukan"))
+                continue
+        else:
+            instance = model()
+
+        fields, row_errors = [], []
+        for name in allowed:
+            if name not in record:
+                continue
+            field = model._meta.get_field(name)
+            try:
+                setattr(instance, field.attname, _to_python(field, record[name]))
+            except ValidationError as exc:
+                row_errors.append(f"{name}: {' '.join(exc.messages)}")
+                continue
+            fields.append(name)
+        for column in LIST_COLUMNS:
+            if column in record and not isinstance(record[column], list):
+                row_errors.append(f"{column} harus berupa list")
+        ref = record.get('ref')
+        if ref is not None:
+            ref = str(ref)
+            if kind != 'product':
+                row_errors.append("ref hanya untuk product")
+            elif ref in refs or ref.isdigit():
+                row_errors.append(f"ref '{ref}' duplikat atau berupa angka")
+        if not row_errors:
+            try:
+                instance.clean_fields(exclude=['image_variants'])
+                instance.clean()
+            except ValidationError as exc:
+                row_errors.extend(_messages(exc))
+        if row_errors:
+            errors.append((line_no, '; '.join(row_errors)))
+            continue
+
+        row = _Row(line_no, kind, instance, fields, record.get('images'), record.get('jewel_set_products'))
+        if ref is not None:
+            refs[ref] = row
+        rows.append(row)
+
+    # jewel_set_products: id produk yang sudah ada atau ref di file ini
+    link_ids = {int(token) for row in rows for token in (row.links or ()) if str(token).isdigit()}
+    known_ids = set(Product.objects.filter(pk__in=link_ids).values_list('pk', flat=True)) if link_ids else set()
+    for row in rows:
+        missing = [
+            str(token) for token in (row.links or ())
+            if not (int(token) in known_ids if str(token).isdigit() else str(token) in refs)
+        ]
+        if missing:
+            errors.append((row.line_no, f"jewel_set_products tidak ditemukan: {', '.join(missing)}"))
+    return rows, refs, errors
+
+
+def import_catalog(stream, fmt='csv', dry_run=False):
+    """
+    Import file katalog. Melempar CatalogImportError (tanpa menulis apa pun)
+    kalau ada baris yang tidak valid; selain itu mengembalikan ringkasan
+    {'created': {...}, 'updated': {...}} per type.
+    """
+    rows, refs, errors = _build_rows(read_records(stream, fmt))
+    if errors:
+        raise CatalogImportError(sorted(errors))
+
+    summary = {'created': dict.fromkeys(MODELS, 0), 'updated': dict.fromkeys(MODELS, 0)}
+    with transaction.atomic():
+        for kind, (model, _) in MODELS.items():
+            kind_rows = [row for row in rows if row.kind == kind]
+            new = [row.instance for row in kind_rows if row.instance.pk is None]
+            changed = [row for row in kind_rows if row.instance.pk is not None]
+            model.objects.bulk_create(new, batch_size=BATCH_SIZE)
+            update_fields = sorted({name for row in changed for name in row.fields})
+            if update_fields:
+                model.objects.bulk_update([row.instance for row in changed], update_fields, batch_size=BATCH_SIZE)
+            summary['created'][kind], summary['updated'][kind] = len(new), len(changed)
+
+        product_rows = [row for row in rows if row.kind == 'product']
+        image_rows = [row for row in product_rows if row.images is not None]
+        ProductImage.objects.filter(product_id__in=[row.instance.pk for row in image_rows]).delete()
+        images = ProductImage.objects.bulk_create(
+            [
+                ProductImage(product=row.instance, image=path, alt_text=row.instance.name[:255])
+                for row in image_rows for path in row.images
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+        through = Product.jewel_set_products.through
+        link_rows = [row for row in product_rows if row.links is not None]
+        through.objects.filter(from_product_id__in=[row.instance.pk for row in link_rows]).delete()
+        through.objects.bulk_create(
+            [
+                through(
+                    from_product_id=row.instance.pk,
+                    to_product_id=int(token) if str(token).isdigit() else refs[str(token)].instance.pk,
+                )
+                for row in link_rows for token in dict.fromkeys(row.links)
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+        if link_rows:
+            rebuild_compositions()
+        elif any('stock' in row.fields for row in product_rows):
+            refresh_for_components([row.instance.pk for row in product_rows if 'stock' in row.fields])
+        index_objects(row.instance for row in rows)
+        if dry_run:
+            transaction.set_rollback(True)
+            return summary
+
+        namespaces = {
+            namespace
+            for label in ('api.Product', 'api.Charm', 'api.ProductImage', 'api.Product_jewel_set_products')
+            for namespace in CACHE_DEPENDENCIES[label]
+        }
+        variant_jobs = [('api.ProductImage', image.pk) for image in images if needs_variants(image)] + [
+            ('api.Charm', row.instance.pk) for row in rows if row.kind == 'charm' and needs_variants(row.instance)
+        ]
+
+        def after_commit():
+            bump_version(*namespaces)
+            for label, pk in variant_jobs:
+                enqueue(generate_image_variants, label, pk)
+
+        transaction.on_commit(after_commit)
+    return summary
+
+
+def _export_records(kinds):
+    if 'product' in kinds:
+        products = Product.objects.order_by('pk').prefetch_related(
+            'images', Prefetch('jewel_set_products', queryset=Product.objects.only('pk')),
+        )
+        for product in products.iterator(chunk_size=BATCH_SIZE):
+            record = {'type': 'product', 'id': product.pk}
+            record.update((name, getattr(product, name)) for name in PRODUCT_FIELDS)
+            record['images'] = [image.image.name for image in product.images.all()]
+            record['jewel_set_products'] = [linked.pk for linked in product.jewel_set_products.all()]
+            yield record
+    if 'charm' in kinds:
+        for charm in Charm.objects.order_by('pk').iterator(chunk_size=BATCH_SIZE):
+            record = {'type': 'charm', 'id': charm.pk}
+            record.update((name, getattr(charm, name)) for name in CHARM_FIELDS)
+            record['image'] = charm.image.name
+            yield record
+
+
+def _plain(value):
+    return value if isinstance(value, (bool, int, str, list)) or value is None else str(value)
+
+
+def export_catalog(fmt='csv', kinds=tuple(MODELS)):
+    """Generator baris teks (str) untuk StreamingHttpResponse atau file."""
+    if fmt == 'jsonl':
+        for record in _export_records(kinds):
+            yield json.dumps({key: _plain(value) for key, value in record.items()}, ensure_ascii=False) + '\n'
+        return
+
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS, extrasaction='ignore')
+
+    def flush():
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    writer.writeheader()
+    yield flush()
+    for record in _export_records(kinds):
+        for column in LIST_COLUMNS:
+            if column in record:
+                record[column] = LIST_SEPARATOR.join(str(value) for value in record[column])
+        writer.writerow({key: '' if value is None else value for key, value in record.items()})
+        yield flush()
@@ -0,0 +1,127 @@
+"""
+Komposisi set dan ketersediaan turunannya.
+
+Jewel set (`Product.jewel_set_products`, boleh bersarang) dan gift set
+(`GiftSetOrBundleMonthlySpecial.products`) diratakan sekali ke produk daun
+dan disimpan di SetComponent. `available_stock` set = stok terkecil dari
+produk daunnya, disimpan di kolom sendiri supaya halaman list tidak perlu
+menelusuri graf per item. Produk yang bukan set punya `available_stock`
+None; stoknya tetap `stock`.
+
+* Keanggotaan berubah (m2m, hapus produk/gift set): `rebuild_compositions`.
+* Stok produk berubah: `refresh_for_components` mencari set yang memuat
+  produk itu lewat index SetComponent.product (satu query) lalu hanya
+  memperbarui set tersebut.
+"""
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Min, OuterRef, Subquery
+
+from ..cache import CACHE_DEPENDENCIES, bump_version
+from ..models import GiftSetOrBundleMonthlySpecial, Product, SetComponent
+
+# (model set, FK di SetComponent)
+SET_MODELS = (
+    (Product, 'jewel_set'),
+    (GiftSetOrBundleMonthlySpecial, 'gift_set'),
+)
+
+
+def _m2m_pairs(model, name):
+    field = model._meta.get_field(name)
+    return field.remote_field.through.objects.values_list(
+        f'{field.m2m_field_name()}_id', f'{field.m2m_reverse_field_name()}_id',
+    )
+
+
+def _edges():
+    jewel_sets, gift_sets = defaultdict(set), defaultdict(set)
+    for set_id, product_id in _m2m_pairs(Product, 'jewel_set_products'):
+        jewel_sets[set_id].add(product_id)
+    for set_id, product_id in _m2m_pairs(GiftSetOrBundleMonthlySpecial, 'products'):
+        gift_sets[set_id].add(product_id)
+    return jewel_sets, gift_sets
+
+
+def flatten(jewel_sets):
+    """({jewel set: produk daun}, fungsi leaves); siklus (A berisi B berisi A) diputus."""
+    resolved = {}
+
+    def walk(product_id, path):
+        """(produk daun, set yang diputus di bawahnya selain dirinya sendiri)."""
+        if product_id in resolved:
+            return resolved[product_id], set()
+        children = jewel_sets.get(product_id)
+        if not children:
+            return {product_id}, set()
+        result, pruned = set(), set()
+        for child in children:
+            if child in path:
+                pruned.add(child)
+                continue
+            child_leaves, child_pruned = walk(child, path | {child})
+            result |= child_leaves
+            pruned |= child_pruned
+        pruned.discard(product_id)
+        # hasil yang memutus leluhur di path belum lengkap; hanya valid untuk path ini
+        if not pruned:
+            resolved[product_id] = result
+        return result, pruned
+
+    def leaves(product_id, path):
+        return walk(product_id, path)[0]
+
+    return {set_id: leaves(set_id, {set_id}) for set_id in jewel_sets}, leaves
+
+
+def _minimum_stock(field):
+    return Subquery(
+        SetComponent.objects.filter(**{field: OuterRef('pk')}).values(field).annotate(
+            minimum=Min('product__stock'),
+        ).values('minimum')[:1]
+    )
+
+
+def _changed():
+    namespaces = {ns for model, _ in SET_MODELS for ns in CACHE_DEPENDENCIES[model._meta.label]}
+    transaction.on_commit(lambda: bump_version(*namespaces))
+
+
+@transaction.atomic
+def rebuild_compositions():
+    """Ratakan ulang semua set lalu hitung ulang ketersediaan. Mengembalikan jumlah baris komponen."""
+    jewel_sets, gift_sets = _edges()
+    flattened, leaves = flatten(jewel_sets)
+    rows = [
+        SetComponent(jewel_set_id=set_id, product_id=product_id)
+        for set_id, products in flattened.items() for product_id in products
+    ]
+    for set_id, members in gift_sets.items():
+        products = set().union(*(leaves(member, {member}) for member in members))
+        rows.extend(SetComponent(gift_set_id=set_id, product_id=product_id) for product_id in products)
+
+    with connection.cursor() as cursor:
+        # tanpa ORM delete: ada receiver post_delete global yang memaksa load per baris
+        cursor.execute(f"DELETE FROM {connection.ops.quote_name(SetComponent._meta.db_table)}")
+    SetComponent.objects.bulk_create(rows, batch_size=1000)
+    for model, field in SET_MODELS:
+        # produk yang bukan set mendapat NULL dari subquery
+        model.objects.update(available_stock=_minimum_stock(field))
+    _changed()
+    return len(rows)
+
+
+def refresh_for_components(product_ids):
+    """Hitung ulang `available_stock` untuk set yang memuat salah satu produk ini."""
+    memberships = SetComponent.objects.filter(product_id__in=product_ids).values_list('jewel_set_id', 'gift_set_id')
+    set_ids = {field: set() for _, field in SET_MODELS}
+    for jewel_set_id, gift_set_id in memberships:
+        set_ids['jewel_set' if jewel_set_id else 'gift_set'].add(jewel_set_id or gift_set_id)
+    updated = 0
+    for model, field in SET_MODELS:
+        if set_ids[field]:
+            updated += model.objects.filter(pk__in=set_ids[field]).update(available_stock=_minimum_stock(field))
+    if updated:
+        _changed()
+    return updated
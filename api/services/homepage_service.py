@@ -0,0 +1,150 @@
+"""
+Payload homepage dalam satu response: banner, new arrivals, monthly special,
+video, galeri foto dan review terbaru, masing-masing hanya potongan yang
+dipakai halaman (`SLICES`).
+
+Query plan tetap (lihat `build_payload`), tidak bergantung jumlah data.
+Seluruh payload di-cache per base URL (URL gambar absolut) dengan token
+gabungan `HOMEPAGE_NAMESPACES` + tabel harga. Saat salah satu model input
+berubah, signal menjadwalkan rebuild di Celery; selama rebuild berjalan
+request masih menerima payload lama paling lama `HOMEPAGE_STALE_GRACE` detik
+setelah perubahan, sesudah itu payload dibangun langsung di request.
+"""
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.db.models import Prefetch
+from django.http import HttpRequest
+from rest_framework.request import Request
+
+from ..cache import cache_validity, get_cache
+from ..models import Charm, GiftSetOrBundleMonthlySpecial, PageBanner, PhotoGallery, Product, Review, VideoContent
+from ..pricing import get_price_table
+from ..serializers import (
+    CampaignProductSerializer, GiftSetOrBundleMonthlySpecialProductSerializer, PageBannerSerializer,
+    PhotoGalerySerializer, ReviewSerializer, VideoContentSerializer,
+)
+
+HOMEPAGE_NAMESPACES = ('page-banners', 'products', 'gift-sets', 'videos', 'photo-gallery', 'reviews')
+SLICES = {
+    'new_arrivals': 8,
+    'monthly_specials': 4,
+    'videos': 3,
+    'photo_gallery': 12,
+    'reviews': 6,
+}
+REVIEW_MIN_RATING = 4
+# base URL yang pernah dilayani, untuk rebuild proaktif dari signal
+MAX_BASE_URLS = 5
+REBUILD_LOCK_TIMEOUT = 120
+
+
+def _entry_key(base_url):
+    return f'homepage:payload:{base_url}'
+
+
+def _lock_key(base_url):
+    return f'homepage:rebuild:{base_url}'
+
+
+class _BaseUrlRequest(HttpRequest):
+    """Request GET sintetis untuk serialisasi di luar siklus request (Celery)."""
+    def __init__(self, base_url):
+        super().__init__()
+        parts = urlsplit(base_url)
+        self.method = 'GET'
+        self.path = '/'
+        self._scheme = parts.scheme
+        self.META['HTTP_HOST'] = parts.netloc
+
+    def _get_scheme(self):
+        return self._scheme
+
+
+def build_payload(request):
+    """
+    Query: banner 1, produk 2, gift set 2, video 1, galeri 1, review 4,
+    ditambah tabel harga (biasanya dari cache).
+    """
+    context = {'request': request, 'price_table': get_price_table()}
+    new_arrivals = Product.objects.prefetch_related('images').order_by('-created_at', '-id')
+    monthly_specials = GiftSetOrBundleMonthlySpecial.objects.filter(is_monthly_special=True).select_related(
+        'rating_summary',
+    ).prefetch_related('products').order_by('-created_at', '-id')
+    reviews = Review.objects.filter(rating__gte=REVIEW_MIN_RATING).prefetch_related(
+        Prefetch('products', queryset=Product.objects.only('id', 'name')),
+        Prefetch('charms', queryset=Charm.objects.only('id', 'name')),
+        Prefetch('gift_sets', queryset=GiftSetOrBundleMonthlySpecial.objects.only('id', 'name')),
+    ).order_by('-uploaded_at', '-id')
+
+    payload = {
+        'banners': PageBannerSerializer(
+            PageBanner.objects.filter(page='homepage').order_by('-uploaded_at'), many=True, context=context,
+        ).data,
+        'new_arrivals': CampaignProductSerializer(new_arrivals[:SLICES['new_arrivals']], many=True, context=context).data,
+        'monthly_specials': GiftSetOrBundleMonthlySpecialProductSerializer(
+            monthly_specials[:SLICES['monthly_specials']], many=True, context=context,
+        ).data,
+        'videos': VideoContentSerializer(
+            VideoContent.objects.order_by('-uploaded_at', '-id')[:SLICES['videos']], many=True, context=context,
+        ).data,
+        'photo_gallery': PhotoGalerySerializer(
+            PhotoGallery.objects.order_by('-uploaded_at', '-id')[:SLICES['photo_gallery']], many=True, context=context,
+        ).data,
+        'reviews': ReviewSerializer(reviews[:SLICES['reviews']], many=True, context=context).data,
+    }
+    for review in payload['reviews']:
+        # email reviewer tidak perlu tampil di halaman publik
+        review.pop('user_email', None)
+    return payload
+
+
+def _store(base_url):
+    # selalu request sintetis: query string request asli (?fields=, ?expand=)
+    # tidak boleh ikut membentuk payload yang di-cache
+    request = Request(_BaseUrlRequest(base_url))
+    token, last_modified, timeout = cache_validity(HOMEPAGE_NAMESPACES, pricing_dependent=True)
+    entry = {'token': token, 'last_modified': last_modified, 'data': build_payload(request)}
+    get_cache().set(_entry_key(base_url), entry, timeout=timeout)
+    return entry
+
+
+def _remember_base_url(base_url):
+    cache = get_cache()
+    base_urls = cache.get('homepage:base-urls') or []
+    if base_url not in base_urls:
+        cache.set('homepage:base-urls', ([base_url] + base_urls)[:MAX_BASE_URLS], timeout=None)
+
+
+def rebuild(base_url):
+    try:
+        _store(base_url)
+    finally:
+        get_cache().delete(_lock_key(base_url))
+
+
+def schedule_rebuild(base_urls=None):
+    from ..tasks import enqueue, rebuild_homepage
+
+    cache = get_cache()
+    for base_url in base_urls or cache.get('homepage:base-urls') or ():
+        # satu rebuild per base URL sekaligus; perubahan beruntun cukup sekali
+        if cache.add(_lock_key(base_url), 1, timeout=REBUILD_LOCK_TIMEOUT):
+            enqueue(rebuild_homepage, base_url)
+
+
+def get_homepage(request):
+    """(payload, token, last_modified) untuk request ini."""
+    base_url = request.build_absolute_uri('/')
+    token, last_modified, _ = cache_validity(HOMEPAGE_NAMESPACES, pricing_dependent=True)
+    entry = get_cache().get(_entry_key(base_url))
+    if entry is not None and entry['token'] != token:
+        if time.time() - last_modified < settings.HOMEPAGE_STALE_GRACE:
+            schedule_rebuild([base_url])
+        else:
+            entry = None
+    if entry is None:
+        entry = _store(base_url)
+        _remember_base_url(base_url)
+    return entry['data'], entry['token'], entry['last_modified']
@@ -0,0 +1,144 @@
+import logging
+import posixpath
+from io import BytesIO
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+VARIANT_WIDTHS = (320, 640, 960, 1280)
+VARIANT_PREFIX = 'derivatives'
+
+# model yang gambarnya dibuatkan turunan; semuanya pakai field `image`
+IMAGE_MODELS = (
+    'api.ProductImage',
+    'api.Charm',
+    'api.PageBanner',
+    'api.PhotoGallery',
+    'api.GiftSetOrBundleMonthlySpecial',
+)
+
+_FORMATS = {
+    'avif': {'format': 'AVIF', 'quality': 60},
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 6},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def available_formats():
+    formats = ['webp', 'jpeg']
+    if features.check('avif'):
+        formats.insert(0, 'avif')
+    return formats
+
+
+def variant_name(source_name, width, fmt):
+    base, _ = posixpath.splitext(source_name)
+    return f'{VARIANT_PREFIX}/{base}/{width}.{fmt}'
+
+
+def needs_variants(instance):
+    image = instance.image
+    return bool(image) and (instance.image_variants or {}).get('source') != image.name
+
+
+def target_widths(original_width):
+    widths = [w for w in VARIANT_WIDTHS if w < original_width]
+    # gambar kecil tetap dapat satu turunan (re-encode ke format modern)
+    return widths or [original_width]
+
+
+def _encode(image, fmt):
+    options = dict(_FORMATS[fmt])
+    if fmt == 'jpeg' and image.mode not in ('RGB', 'L'):
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        rgba = image.convert('RGBA')
+        background.paste(rgba, mask=rgba.split()[-1])
+        image = background
+    elif image.mode not in ('RGB', 'RGBA', 'L'):
+        image = image.convert('RGBA')
+    buffer = BytesIO()
+    image.save(buffer, **options)
+    return buffer.getvalue()
+
+
+def _delete_variants(storage, manifest):
+    for widths in (manifest or {}).get('variants', {}).values():
+        for name in widths.values():
+            if storage.exists(name):
+                storage.delete(name)
+
+
+def generate_variants(instance, force=False):
+    """
+    Buat turunan gambar `instance.image` untuk semua lebar/format lalu simpan
+    manifest-nya di `instance.image_variants`. Idempoten: dilewati kalau
+    manifest sudah sesuai dengan file sumber, kecuali `force=True`.
+    """
+    if not instance.image or (not force and not needs_variants(instance)):
+        return instance.image_variants
+
+    storage = instance.image.storage
+    source_name = instance.image.name
+    with storage.open(source_name, 'rb') as source:
+        original = Image.open(source)
+        original = ImageOps.exif_transpose(original)
+        original.load()
+
+    old_manifest = instance.image_variants
+    if (old_manifest or {}).get('source') not in (None, source_name):
+        _delete_variants(storage, old_manifest)
+
+    variants = {}
+    for fmt in available_formats():
+        variants[fmt] = {}
+        for width in target_widths(original.width):
+            resized = original.copy()
+            resized.thumbnail((width, original.height), Image.LANCZOS)
+            name = variant_name(source_name, width, fmt)
+            if storage.exists(name):
+                storage.delete(name)
+            variants[fmt][str(width)] = storage.save(name, ContentFile(_encode(resized, fmt)))
+
+    manifest = {
+        'source': source_name,
+        'width': original.width,
+        'height': original.height,
+        'variants': variants,
+    }
+    instance.image_variants = manifest
+    # save() biasa supaya signal invalidasi cache katalog ikut jalan;
+    # needs_variants() mencegah task dijadwalkan ulang
+    instance.save(update_fields=['image_variants'])
+    return manifest
+
+
+def generate_variants_for(model_label, pk, force=False):
+    model = apps.get_model(model_label)
+    instance = model.objects.filter(pk=pk).first()
+    if instance is None:
+        return None
+    try:
+        return generate_variants(instance, force=force)
+    except (OSError, ValueError) as exc:
+        logger.warning("Gagal membuat turunan gambar %s #%s: %s", model_label, pk, exc)
+        return None
+
+
+def build_srcset(request, manifest):
+    """{'webp': 'https://.../320.webp 320w, ...', 'jpeg': ...} dari manifest."""
+    if not manifest:
+        return None
+    srcset = {}
+    for fmt, widths in manifest.get('variants', {}).items():
+        entries = []
+        for width, name in sorted(widths.items(), key=lambda item: int(item[0])):
+            url = default_storage.url(name)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            entries.append(f'{url} {width}w')
+        srcset[fmt] = ', '.join(entries)
+    return srcset
@@ -0,0 +1,142 @@
+"""
+Bulk adjust stok dan harga untuk sinkronisasi gudang.
+
+Setiap baris berisi nilai absolut (`stock`, `price`) atau delta (`stock_delta`,
+`price_delta`). Per model hanya ada dua query: SELECT ... FOR UPDATE untuk
+memeriksa baris (ada, hasil tidak negatif) lalu satu UPDATE dengan CASE per
+kolom; perubahan stok produk ditambah penyegaran ketersediaan set yang
+memuatnya (api/services/composition_service.py). Baris yang gagal dilewati
+dan dilaporkan; baris lain tetap diterapkan.
+Karena `.update()` tidak memicu signal, versi cache katalog diganti sekali
+setelah commit; batch yang hanya mengubah stok cukup mengganti namespace di
+INVENTORY_DEPENDENCIES.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from rest_framework import serializers
+
+from ..cache import CACHE_DEPENDENCIES, INVENTORY_DEPENDENCIES, bump_version
+from ..models import Charm, GiftSetOrBundleMonthlySpecial, Product
+from .composition_service import refresh_for_components
+
+MAX_ROWS = 1000
+MODELS = {
+    'product': Product,
+    'charm': Charm,
+    'gift_set': GiftSetOrBundleMonthlySpecial,
+}
+MAX_PRICE = Decimal('99999999.99')
+
+
+class InventoryAdjustmentSerializer(serializers.Serializer):
+    """Satu baris bulk adjust stok/harga."""
+    type = serializers.ChoiceField(choices=tuple(MODELS))
+    id = serializers.IntegerField(min_value=1)
+    stock = serializers.IntegerField(min_value=0, required=False)
+    stock_delta = serializers.IntegerField(required=False)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal('0'), required=False)
+    price_delta = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+
+    def validate(self, data):
+        for field in ('stock', 'price'):
+            if field in data and f'{field}_delta' in data:
+                raise serializers.ValidationError(f"Pilih salah satu: {field} atau {field}_delta.")
+        if not {'stock', 'stock_delta', 'price', 'price_delta'} & set(data):
+            raise serializers.ValidationError("Isi minimal salah satu dari stock, stock_delta, price atau price_delta.")
+        return data
+
+
+def _error(index, entry, errors):
+    row = {'index': index, 'status': 'error', 'errors': errors}
+    if isinstance(entry, dict):
+        row.update({key: entry[key] for key in ('type', 'id') if key in entry})
+    return row
+
+
+def _new_value(data, field, current):
+    if field in data:
+        return data[field]
+    return current + data.get(f'{field}_delta', 0)
+
+
+def _case(field, whens, model):
+    return Case(*whens, default=F(field), output_field=model._meta.get_field(field))
+
+
+def bulk_adjust(entries):
+    """
+    entries: list dict mentah dari request. Mengembalikan list hasil dengan
+    urutan yang sama: status `updated` (beserta nilai baru) atau `error`.
+    """
+    results = [None] * len(entries)
+    pending = defaultdict(dict)
+    for index, entry in enumerate(entries):
+        serializer = InventoryAdjustmentSerializer(data=entry)
+        if not serializer.is_valid():
+            results[index] = _error(index, entry, serializer.errors)
+            continue
+        data = serializer.validated_data
+        if data['id'] in pending[data['type']]:
+            results[index] = _error(index, entry, ["Item yang sama muncul lebih dari sekali di batch ini."])
+            continue
+        pending[data['type']][data['id']] = (index, data)
+
+    touched = set()
+    with transaction.atomic():
+        for kind, rows in pending.items():
+            model = MODELS[kind]
+            current = {
+                pk: (stock, price)
+                for pk, stock, price in model.objects.select_for_update()
+                .filter(pk__in=list(rows)).values_list('pk', 'stock', 'price')
+            }
+            stock_whens, price_whens = [], []
+            for pk, (index, data) in rows.items():
+                if pk not in current:
+                    results[index] = _error(index, data, [f"{kind} id {pk} tidak ditemukan."])
+                    continue
+                stock, price = _new_value(data, 'stock', current[pk][0]), _new_value(data, 'price', current[pk][1])
+                errors = []
+                if stock < 0:
+                    errors.append(f"Stok tidak boleh negatif (hasil {stock}).")
+                if not Decimal(0) <= price <= MAX_PRICE:
+                    errors.append(f"Harga di luar batas (hasil {price}).")
+                if errors:
+                    results[index] = _error(index, data, errors)
+                    continue
+
+                # delta tetap ditulis sebagai F() + n supaya aman terhadap writer lain
+                if 'stock' in data:
+                    stock_whens.append(When(pk=pk, then=Value(stock)))
+                elif 'stock_delta' in data:
+                    stock_whens.append(When(pk=pk, then=F('stock') + data['stock_delta']))
+                if 'price' in data:
+                    price_whens.append(When(pk=pk, then=Value(price)))
+                elif 'price_delta' in data:
+                    price_whens.append(When(pk=pk, then=F('price') + data['price_delta']))
+                results[index] = {
+                    'index': index, 'type': kind, 'id': pk, 'status': 'updated',
+                    'stock': stock, 'price': str(price),
+                }
+
+            updates = {}
+            if stock_whens:
+                updates['stock'] = _case('stock', stock_whens, model)
+            if price_whens:
+                updates['price'] = _case('price', price_whens, model)
+            if updates:
+                ids = [pk for pk, (index, _) in rows.items() if results[index]['status'] == 'updated']
+                model.objects.filter(pk__in=ids).update(**updates)
+                # stok saja: hanya namespace yang menampilkan stok (lihat api/cache.py)
+                dependencies = CACHE_DEPENDENCIES if price_whens else INVENTORY_DEPENDENCIES
+                touched.update(dependencies[model._meta.label])
+                if model is Product and stock_whens:
+                    # ketersediaan jewel set / gift set yang memuat produk ini
+                    refresh_for_components(ids)
+
+        if touched:
+            transaction.on_commit(lambda: bump_version(*touched))
+    return results
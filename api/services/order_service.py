@@ -1,7 +1,9 @@
 from django.db import transaction
 from django.conf import settings
 from collections import Counter
+from decimal import Decimal
 from ..models import Order, OrderItem, OrderItemCharm, CartItem, ReviewToken
+from ..pricing import get_price_table
 # from midtrans_services import create_midtrans_token
 from django.core.mail import EmailMessage
 from django.template.loader import render_to_string
@@ -76,7 +78,8 @@ def create_order(user, shipping_address, cart_items):
         shipping_address=shipping_address
     )
 
-    total = 0
+    total = Decimal('0.00')
+    prices = get_price_table()
     for item in cart_items:
         order_item = OrderItem.objects.create(
             order=order,
@@ -89,18 +92,18 @@ def create_order(user, shipping_address, cart_items):
         # Kurangi stok
         if item.product:
             item.product.stock -= item.quantity
-            item.product.save()
-            total += float(item.product.price) * item.quantity
+            item.product.save(update_fields=['stock'])
+            total += prices.effective_price(item.product) * item.quantity
 
         elif item.gift_set:
             item.gift_set.stock -= item.quantity
-            item.gift_set.save()
-            total += float(item.gift_set.price) * item.quantity
+            item.gift_set.save(update_fields=['stock'])
+            total += prices.effective_price(item.gift_set) * item.quantity
 
         # Tambah charms
         for cc in item.charms.all():
             OrderItemCharm.objects.create(order_item=order_item, charm=cc)
-            total += float(cc.price)
+            total += prices.effective_price(cc)
 
         # Hapus cart item
         item.delete()
@@ -0,0 +1,76 @@
+"""
+Ranking best seller dan trending untuk Product, Charm dan gift set.
+
+Counter per item dihitung ulang dari order `paid` oleh task Celery terjadwal
+(lihat sparklore/celery.py) atau `python manage.py recompute_rankings`:
+
+* `sold_stok`: unit terjual sepanjang waktu -> `?ordering=best_selling`
+* `sales_7d` / `sales_30d`: unit terjual 7 / 30 hari terakhir (tanggal order)
+* `trending_score`: `sales_7d * 30 - sales_30d * 7`, yaitu seberapa jauh
+  penjualan minggu ini di atas rata-rata mingguan 30 hari (diskalakan supaya
+  tetap integer) -> `?ordering=trending`
+
+Satu GROUP BY per model per jalan, lalu hanya baris yang berubah yang ditulis
+(bulk_update). Request katalog cukup ORDER BY kolom yang sudah diindex.
+Charms dihitung satu unit per OrderItemCharm, sama seperti total order.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from ..cache import CACHE_DEPENDENCIES, bump_version
+from ..models import Charm, GiftSetOrBundleMonthlySpecial, Order, OrderItem, OrderItemCharm, Product
+
+COUNTER_FIELDS = ('sold_stok', 'sales_7d', 'sales_30d', 'trending_score')
+BATCH_SIZE = 500
+
+# (model item, model baris penjualan, FK ke item, path ke Order, agregat unit)
+SOURCES = (
+    (Product, OrderItem, 'product', 'order', lambda q: Sum('quantity', filter=q)),
+    (GiftSetOrBundleMonthlySpecial, OrderItem, 'gift_set', 'order', lambda q: Sum('quantity', filter=q)),
+    (Charm, OrderItemCharm, 'charm', 'order_item__order', lambda q: Count('id', filter=q)),
+)
+
+
+def trending_score(sales_7d, sales_30d):
+    return sales_7d * 30 - sales_30d * 7
+
+
+def sales_counters(line_model, item_field, order_path, units, now):
+    """{item_id: (all-time, 7 hari, 30 hari)} dari order yang sudah dibayar."""
+    created = f'{order_path}__created_at__gte'
+    rows = line_model.objects.filter(**{
+        f'{order_path}__payment_status': Order.PaymentStatus.PAID,
+        f'{item_field}__isnull': False,
+    }).values(item_field).annotate(
+        total=Coalesce(units(None), 0),
+        last_7d=Coalesce(units(Q(**{created: now - timedelta(days=7)})), 0),
+        last_30d=Coalesce(units(Q(**{created: now - timedelta(days=30)})), 0),
+    ).order_by()
+    return {row[item_field]: (row['total'], row['last_7d'], row['last_30d']) for row in rows}
+
+
+def recompute_rankings(now=None):
+    """Mengembalikan {label model: jumlah baris yang berubah}."""
+    now = now or timezone.now()
+    changed_counts = {}
+    namespaces = set()
+    with transaction.atomic():
+        for model, line_model, item_field, order_path, units in SOURCES:
+            counters = sales_counters(line_model, item_field, order_path, units, now)
+            changed = []
+            for pk, *current in model.objects.values_list('pk', *COUNTER_FIELDS).iterator(chunk_size=2000):
+                total, last_7d, last_30d = counters.get(pk, (0, 0, 0))
+                values = (total, last_7d, last_30d, trending_score(last_7d, last_30d))
+                if tuple(current) != values:
+                    changed.append(model(pk=pk, **dict(zip(COUNTER_FIELDS, values))))
+            model.objects.bulk_update(changed, COUNTER_FIELDS, batch_size=BATCH_SIZE)
+            changed_counts[model._meta.label] = len(changed)
+            if changed:
+                namespaces.update(CACHE_DEPENDENCIES[model._meta.label])
+        if namespaces:
+            transaction.on_commit(lambda: bump_version(*namespaces))
+    return changed_counts
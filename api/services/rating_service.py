@@ -0,0 +1,142 @@
+"""
+Agregat rating (RatingAggregate) untuk produk, charms dan gift set.
+
+Setiap perubahan relasi Review <-> item hanya menggeser counter dengan UPDATE
+`F() + n` (lihat handler di api/signals.py), tanpa AVG() ulang atas semua
+review. `Product.rating` / `Charm.rating` ikut diisi rata-ratanya supaya
+ordering `?ordering=rating` tetap jalan. Kalau counter melenceng (data lama,
+edit langsung di database) jalankan `python manage.py rebuild_ratings`.
+"""
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Count, DecimalField, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Round
+
+from ..cache import CACHE_DEPENDENCIES, bump_version
+from ..models import Charm, GiftSetOrBundleMonthlySpecial, Product, RatingAggregate, Review
+
+# (relasi M2M di Review, FK di RatingAggregate, model item)
+REVIEW_TARGETS = (
+    ('products', 'product', Product),
+    ('charms', 'charm', Charm),
+    ('gift_sets', 'gift_set', GiftSetOrBundleMonthlySpecial),
+)
+# model yang punya kolom `rating` (rata-rata) sendiri
+DENORMALIZED_MODELS = {'product': Product, 'charm': Charm}
+STARS = range(1, 6)
+
+
+def target_for_through(through):
+    """(relasi, field) untuk tabel through M2M Review, None kalau bukan."""
+    for relation, field, _ in REVIEW_TARGETS:
+        if getattr(Review, relation).through is through:
+            return relation, field
+    return None
+
+
+def review_links(review):
+    """{field: [id item]} untuk semua item yang terhubung ke review."""
+    return {
+        field: list(getattr(review, relation).values_list('pk', flat=True))
+        for relation, field, _ in REVIEW_TARGETS
+    }
+
+
+def apply_deltas(field, deltas, sign):
+    """
+    deltas: Counter {(item_id, bintang): jumlah review}; sign +1 saat review
+    ditautkan, -1 saat dilepas.
+    """
+    deltas = {key: n for key, n in deltas.items() if n}
+    if not deltas:
+        return
+    item_ids = {item_id for item_id, _ in deltas}
+    RatingAggregate.objects.bulk_create(
+        [RatingAggregate(**{f'{field}_id': item_id}) for item_id in item_ids],
+        ignore_conflicts=True,
+    )
+
+    groups = defaultdict(list)
+    for (item_id, star), n in deltas.items():
+        groups[(star, sign * n)].append(item_id)
+    for (star, step), ids in groups.items():
+        rows = RatingAggregate.objects.filter(**{f'{field}_id__in': ids})
+        if step < 0:
+            # review lama yang belum pernah dihitung: lewati seluruh baris, bukan
+            # clamp per kolom, supaya count, total dan histogram tetap sejalan
+            rows = rows.filter(
+                review_count__gte=-step, rating_total__gte=-step * star, **{f'stars_{star}__gte': -step},
+            )
+        rows.update(
+            review_count=F('review_count') + step,
+            rating_total=F('rating_total') + step * star,
+            **{f'stars_{star}': F(f'stars_{star}') + step},
+        )
+
+    _sync_average(field, item_ids)
+    transaction.on_commit(lambda: bump_version(*CACHE_DEPENDENCIES['api.RatingAggregate']))
+
+
+def _sync_average(field, item_ids):
+    model = DENORMALIZED_MODELS.get(field)
+    if model is None:
+        return
+    average = RatingAggregate.objects.filter(
+        **{field: OuterRef('pk')}, review_count__gt=0,
+    ).values_list(Round(F('rating_total') * 1.0 / F('review_count'), 2))[:1]
+    model.objects.filter(pk__in=item_ids).update(
+        rating=Coalesce(Subquery(average), Value(0), output_field=DecimalField(max_digits=3, decimal_places=2)),
+    )
+
+
+def link_review(review, field, item_ids, sign):
+    apply_deltas(field, Counter((item_id, review.rating) for item_id in item_ids), sign)
+
+
+def link_item(field, item_id, review_ids, sign):
+    """Sisi balik M2M: satu item ditautkan ke beberapa review sekaligus."""
+    stars = Review.objects.filter(pk__in=review_ids).values_list('rating', flat=True)
+    apply_deltas(field, Counter((item_id, star) for star in stars), sign)
+
+
+def add_review(review, links=None):
+    for field, item_ids in (links or review_links(review)).items():
+        link_review(review, field, item_ids, +1)
+
+
+def remove_review(review, links=None):
+    for field, item_ids in (links or review_links(review)).items():
+        link_review(review, field, item_ids, -1)
+
+
+def change_review_rating(review, old_rating):
+    links = review_links(review)
+    for field, item_ids in links.items():
+        apply_deltas(field, Counter((item_id, old_rating) for item_id in item_ids), -1)
+        apply_deltas(field, Counter((item_id, review.rating) for item_id in item_ids), +1)
+
+
+@transaction.atomic
+def rebuild_aggregates():
+    """Hitung ulang semua agregat dari tabel review. Mengembalikan jumlah baris."""
+    RatingAggregate.objects.all().delete()
+    created = 0
+    for relation, field, model in REVIEW_TARGETS:
+        # nama query balik dari item ke Review (M2M tanpa related_name)
+        reverse = getattr(Review, relation).field.related_query_name()
+        rows = model.objects.annotate(
+            review_count=Count(reverse),
+            rating_total=Coalesce(Sum(f'{reverse}__rating'), 0),
+            **{f'stars_{star}': Count(reverse, filter=Q(**{f'{reverse}__rating': star})) for star in STARS},
+        ).filter(review_count__gt=0).values('pk', 'review_count', 'rating_total', *[f'stars_{star}' for star in STARS])
+        aggregates = [RatingAggregate(**{f'{field}_id': row.pop('pk')}, **row) for row in rows]
+        RatingAggregate.objects.bulk_create(aggregates, batch_size=500)
+        created += len(aggregates)
+
+        if field in DENORMALIZED_MODELS:
+            # item tanpa review kembali ke 0
+            DENORMALIZED_MODELS[field].objects.exclude(rating=0).update(rating=0)
+            _sync_average(field, [getattr(aggregate, f'{field}_id') for aggregate in aggregates])
+    transaction.on_commit(lambda: bump_version(*CACHE_DEPENDENCIES['api.RatingAggregate']))
+    return created
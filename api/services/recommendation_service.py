@@ -0,0 +1,97 @@
+"""
+Rekomendasi "sering dibeli bersama" untuk product, charm dan gift set.
+
+Job malam (`rebuild_recommendations`, lihat sparklore/celery.py) membangun
+matriks co-occurrence dari order `paid` sepenuhnya di database: setiap order
+dijadikan keranjang (order, jenis item, id item) yang unik, keranjang
+di-self-join per order lalu GROUP BY pasangan item, dan `ROW_NUMBER()`
+memotong top-k per item. Hasilnya langsung di-INSERT ... SELECT ke
+ItemRecommendation, jadi tidak ada loop Python per order maupun per pasangan.
+Matriksnya jarang (hanya pasangan yang pernah muncul bersama) dan tabel
+hasilnya hanya menyimpan `TOP_K` baris per item.
+
+Endpoint cukup satu lookup di index (source_type, source_id, rank).
+"""
+from django.db import connection, transaction
+
+from ..models import ItemRecommendation, Order, OrderItem, OrderItemCharm
+
+TOP_K = 12
+# pasangan yang baru sekali muncul bersama tetap dihitung; naikkan kalau data sudah banyak
+MIN_SUPPORT = 1
+
+ITEM_TYPES = {
+    'product': ItemRecommendation.ItemType.PRODUCT,
+    'charm': ItemRecommendation.ItemType.CHARM,
+    'gift_set': ItemRecommendation.ItemType.GIFT_SET,
+}
+TYPE_NAMES = {code: name for name, code in ITEM_TYPES.items()}
+
+
+def _table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def _rebuild_sql():
+    order, item, item_charm = _table(Order), _table(OrderItem), _table(OrderItemCharm)
+    recommendation = _table(ItemRecommendation)
+    return f"""
+        WITH basket AS (
+            SELECT oi.order_id AS order_id, {ITEM_TYPES['product']:d} AS item_type, oi.product_id AS item_id
+              FROM {item} oi JOIN {order} o ON o.id = oi.order_id
+             WHERE o.payment_status = %(paid)s AND oi.product_id IS NOT NULL
+            UNION
+            SELECT oi.order_id, {ITEM_TYPES['gift_set']:d}, oi.gift_set_id
+              FROM {item} oi JOIN {order} o ON o.id = oi.order_id
+             WHERE o.payment_status = %(paid)s AND oi.gift_set_id IS NOT NULL
+            UNION
+            SELECT oi.order_id, {ITEM_TYPES['charm']:d}, c.charm_id
+              FROM {item_charm} c
+              JOIN {item} oi ON oi.id = c.order_item_id
+              JOIN {order} o ON o.id = oi.order_id
+             WHERE o.payment_status = %(paid)s AND c.charm_id IS NOT NULL
+        ),
+        pairs AS (
+            SELECT a.item_type AS source_type, a.item_id AS source_id,
+                   b.item_type AS target_type, b.item_id AS target_id, COUNT(*) AS score
+              FROM basket a
+              JOIN basket b ON b.order_id = a.order_id
+                           AND (b.item_type <> a.item_type OR b.item_id <> a.item_id)
+             GROUP BY a.item_type, a.item_id, b.item_type, b.item_id
+            HAVING COUNT(*) >= %(min_support)s
+        ),
+        ranked AS (
+            SELECT source_type, source_id, target_type, target_id, score,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY source_type, source_id
+                       ORDER BY score DESC, target_type, target_id
+                   ) AS item_rank
+              FROM pairs
+        )
+        INSERT INTO {recommendation} (source_type, source_id, target_type, target_id, score, {connection.ops.quote_name('rank')})
+        SELECT source_type, source_id, target_type, target_id, score, item_rank
+          FROM ranked
+         WHERE item_rank <= %(top_k)s
+    """
+
+
+@transaction.atomic
+def rebuild_recommendations(top_k=TOP_K, min_support=MIN_SUPPORT):
+    """Ganti seluruh tabel rekomendasi. Mengembalikan jumlah baris."""
+    with connection.cursor() as cursor:
+        # DELETE langsung: lewat ORM setiap baris dimuat dulu karena ada receiver post_delete global
+        cursor.execute(f"DELETE FROM {_table(ItemRecommendation)}")
+        cursor.execute(_rebuild_sql(), {
+            'paid': Order.PaymentStatus.PAID,
+            'min_support': min_support,
+            'top_k': top_k,
+        })
+    return ItemRecommendation.objects.count()
+
+
+def recommendations_for(item_type, item_id, limit=TOP_K):
+    """[{type, id, score}] urut rank; satu query di index."""
+    rows = ItemRecommendation.objects.filter(
+        source_type=ITEM_TYPES[item_type], source_id=item_id,
+    ).order_by('rank').values_list('target_type', 'target_id', 'score')[:limit]
+    return [{'type': TYPE_NAMES[code], 'id': pk, 'score': score} for code, pk, score in rows]
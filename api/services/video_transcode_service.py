@@ -0,0 +1,249 @@
+import json
+import logging
+import os
+import posixpath
+import shutil
+import subprocess
+import tempfile
+from datetime import timedelta
+from fractions import Fraction
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import VideoContent
+
+logger = logging.getLogger(__name__)
+
+HLS_PREFIX = 'videos/hls'
+SEGMENT_SECONDS = 6
+# keyframe tiap 2 detik, sejajar antar rendition supaya player bisa pindah bitrate
+KEYFRAME_SECONDS = 2
+DEFAULT_FPS = 24
+
+# (nama, tinggi, bitrate video, bitrate audio)
+RENDITIONS = (
+    ('360p', 360, 800, 96),
+    ('540p', 540, 1600, 128),
+    ('720p', 720, 2800, 128),
+    ('1080p', 1080, 5000, 160),
+)
+
+
+class TranscodeError(Exception):
+    pass
+
+
+def _stale_before():
+    return timezone.now() - timedelta(seconds=settings.VIDEO_TRANSCODE_TIMEOUT)
+
+
+def is_stale(video):
+    started = video.transcode_started_at
+    return started is None or started < _stale_before()
+
+
+def needs_transcode(video):
+    if not video.video_file:
+        return False
+    source = video.video_file.name
+    if video.transcode_status == VideoContent.TranscodeStatus.PROCESSING:
+        # job yang berjalan dibiarkan, kecuali file-nya diganti atau worker-nya macet
+        return video.processing_source != source or is_stale(video)
+    return video.transcoded_source != source
+
+
+def stale_transcodes():
+    """Video yang tertahan di PROCESSING melewati VIDEO_TRANSCODE_TIMEOUT."""
+    return VideoContent.objects.filter(
+        transcode_status=VideoContent.TranscodeStatus.PROCESSING,
+    ).exclude(transcode_started_at__gte=_stale_before())
+
+
+def _run(args):
+    try:
+        result = subprocess.run(args, capture_output=True, text=True, check=False)
+    except FileNotFoundError:
+        raise TranscodeError(f"{args[0]} tidak ditemukan; set FFMPEG_BINARY/FFPROBE_BINARY")
+    if result.returncode != 0:
+        raise TranscodeError(result.stderr[-2000:])
+    return result.stdout
+
+
+def probe(path):
+    output = _run([
+        settings.FFPROBE_BINARY, '-v', 'error', '-print_format', 'json',
+        '-show_streams', '-show_format', path,
+    ])
+    info = json.loads(output)
+    video = next((s for s in info['streams'] if s['codec_type'] == 'video'), None)
+    if video is None:
+        raise TranscodeError("File tidak punya stream video")
+    has_audio = any(s['codec_type'] == 'audio' for s in info['streams'])
+    duration = float(info.get('format', {}).get('duration') or 0)
+    return int(video['width']), int(video['height']), has_audio, duration, frame_rate(video)
+
+
+def frame_rate(stream):
+    """fps dari `avg_frame_rate` / `r_frame_rate` ffprobe ("30000/1001"); None kalau tidak diketahui."""
+    for key in ('avg_frame_rate', 'r_frame_rate'):
+        try:
+            fps = Fraction(stream.get(key) or '')
+        except (ValueError, ZeroDivisionError):
+            continue
+        if fps > 0:
+            return float(fps)
+    return None
+
+
+def keyframe_interval(fps):
+    return max(1, round((fps or DEFAULT_FPS) * KEYFRAME_SECONDS))
+
+
+def target_renditions(source_height):
+    renditions = [r for r in RENDITIONS if r[1] <= source_height]
+    # video kecil tetap dapat satu rendition di resolusi aslinya
+    return renditions or [(f'{source_height}p', source_height, RENDITIONS[0][2], RENDITIONS[0][3])]
+
+
+def _transcode_rendition(source, workdir, name, height, video_kbps, audio_kbps, has_audio, gop):
+    args = [
+        settings.FFMPEG_BINARY, '-y', '-i', source,
+        '-vf', f'scale=-2:{height}',
+        '-c:v', 'libx264', '-preset', 'veryfast', '-profile:v', 'main',
+        '-b:v', f'{video_kbps}k', '-maxrate', f'{int(video_kbps * 1.07)}k', '-bufsize', f'{video_kbps * 2}k',
+        '-g', str(gop), '-keyint_min', str(gop), '-sc_threshold', '0',
+    ]
+    if has_audio:
+        args += ['-c:a', 'aac', '-b:a', f'{audio_kbps}k', '-ac', '2']
+    else:
+        args += ['-an']
+    args += [
+        '-f', 'hls', '-hls_time', str(SEGMENT_SECONDS), '-hls_playlist_type', 'vod',
+        '-hls_segment_filename', os.path.join(workdir, f'{name}_%04d.ts'),
+        os.path.join(workdir, f'{name}.m3u8'),
+    ]
+    _run(args)
+
+
+def _extract_poster(source, workdir, duration):
+    poster = os.path.join(workdir, 'poster.jpg')
+    offset = min(1.0, duration / 2) if duration else 0
+    _run([
+        settings.FFMPEG_BINARY, '-y', '-ss', f'{offset:.2f}', '-i', source,
+        '-frames:v', '1', '-q:v', '3', poster,
+    ])
+    return poster
+
+
+def _master_playlist(variants):
+    lines = ['#EXTM3U', '#EXT-X-VERSION:3']
+    for name, width, height, video_kbps, audio_kbps in variants:
+        bandwidth = (video_kbps + audio_kbps) * 1000
+        lines.append(f'#EXT-X-STREAM-INF:BANDWIDTH={bandwidth},RESOLUTION={width}x{height}')
+        lines.append(f'{name}.m3u8')
+    return '\n'.join(lines) + '\n'
+
+
+def _clear_prefix(storage, prefix):
+    # segmen dari upload sebelumnya bisa lebih banyak dari yang baru
+    try:
+        _, files = storage.listdir(prefix)
+    except (FileNotFoundError, NotImplementedError):
+        return
+    for filename in files:
+        storage.delete(f'{prefix}/{filename}')
+
+
+class Superseded(Exception):
+    """File video diganti (atau job lain mengambil alih) selagi transcode berjalan."""
+
+
+def _claim(video, source_name):
+    """Kunci baris dan pastikan job ini masih pemilik `source_name`."""
+    current = VideoContent.objects.select_for_update().filter(pk=video.pk).first()
+    if current is None or current.video_file.name != source_name or current.processing_source != source_name:
+        raise Superseded
+    return current
+
+
+def transcode_video(video):
+    """
+    Ubah `video.video_file` jadi HLS multi-bitrate + poster, upload ke storage
+    (`videos/hls/<id>/`), lalu simpan path master playlist di `video.hls_manifest`.
+
+    `processing_source` mencatat file yang sedang diproses. Kalau file diganti
+    di tengah jalan, job lama berhenti tanpa menulis apa pun; job untuk file
+    baru sudah dijadwalkan oleh signal.
+    """
+    storage = video.video_file.storage
+    source_name = video.video_file.name
+    video.processing_source = source_name
+    video.transcode_started_at = timezone.now()
+    video.transcode_status = VideoContent.TranscodeStatus.PROCESSING
+    video.save(update_fields=['processing_source', 'transcode_started_at', 'transcode_status'])
+
+    workdir = tempfile.mkdtemp(prefix='hls-')
+    old_poster = None
+    try:
+        source = os.path.join(workdir, 'source' + posixpath.splitext(source_name)[1])
+        with storage.open(source_name, 'rb') as src, open(source, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+
+        width, height, has_audio, duration, fps = probe(source)
+        gop = keyframe_interval(fps)
+        variants = []
+        for name, target_height, video_kbps, audio_kbps in target_renditions(height):
+            _transcode_rendition(source, workdir, name, target_height, video_kbps, audio_kbps, has_audio, gop)
+            target_width = round(width * target_height / height / 2) * 2
+            variants.append((name, target_width, target_height, video_kbps, audio_kbps if has_audio else 0))
+
+        with open(os.path.join(workdir, 'master.m3u8'), 'w') as master:
+            master.write(_master_playlist(variants))
+        poster = _extract_poster(source, workdir, duration)
+
+        with transaction.atomic():
+            video = _claim(video, source_name)
+            prefix = f'{HLS_PREFIX}/{video.pk}'
+            _clear_prefix(storage, prefix)
+            for filename in sorted(os.listdir(workdir)):
+                if not filename.endswith(('.m3u8', '.ts')):
+                    continue
+                with open(os.path.join(workdir, filename), 'rb') as fh:
+                    storage.save(f'{prefix}/{filename}', File(fh))
+
+            old_poster = video.poster.name or None
+            with open(poster, 'rb') as fh:
+                video.poster.save(f'{video.pk}.jpg', File(fh), save=False)
+            video.hls_manifest = f'{prefix}/master.m3u8'
+            video.transcoded_source = source_name
+            video.transcode_status = VideoContent.TranscodeStatus.READY
+            video.save(update_fields=['poster', 'hls_manifest', 'transcoded_source', 'transcode_status'])
+        if old_poster and old_poster != video.poster.name:
+            # nama poster baru diberi suffix oleh storage, jadi yang lama harus dihapus sendiri
+            video.poster.storage.delete(old_poster)
+    except Superseded:
+        logger.info("Transcode video #%s dibatalkan: file %s sudah diganti", video.pk, source_name)
+    except (TranscodeError, OSError) as exc:
+        logger.error("Transcode video #%s gagal: %s", video.pk, exc)
+        try:
+            with transaction.atomic():
+                video = _claim(video, source_name)
+                # transcoded_source diisi supaya upload yang sama tidak dijadwalkan ulang terus
+                video.transcoded_source = source_name
+                video.transcode_status = VideoContent.TranscodeStatus.FAILED
+                video.save(update_fields=['transcoded_source', 'transcode_status'])
+        except Superseded:
+            pass
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return video
+
+
+def transcode_video_by_id(pk):
+    video = VideoContent.objects.filter(pk=pk).first()
+    if video is None or not video.video_file:
+        return None
+    return transcode_video(video)
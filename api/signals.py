@@ -0,0 +1,158 @@
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .cache import CACHE_DEPENDENCIES, INVENTORY_DEPENDENCIES, INVENTORY_FIELDS, bump_version
+from .models import Charm, GiftSetOrBundleMonthlySpecial, Product, Review, VideoContent
+from .services import composition_service, homepage_service, rating_service
+from .search import ensure_search_table, index_object, remove_object
+from .services.image_variant_service import IMAGE_MODELS, needs_variants
+from .services.video_transcode_service import needs_transcode
+from .tasks import enqueue, generate_image_variants, transcode_video_to_hls
+
+
+def _namespaces_for(model):
+    return CACHE_DEPENDENCIES.get(model._meta.label, ())
+
+
+def _on_namespaces_changed(namespaces):
+    transaction.on_commit(lambda: bump_version(*namespaces))
+    if set(namespaces) & set(homepage_service.HOMEPAGE_NAMESPACES):
+        # setelah bump_version (on_commit dijalankan berurutan)
+        transaction.on_commit(homepage_service.schedule_rebuild)
+
+
+def _inventory_only(instance):
+    """True kalau save ini hanya mengubah kolom stok (lihat INVENTORY_FIELDS)."""
+    changed = instance.__dict__.get('_changed_fields')
+    return changed is not None and changed <= INVENTORY_FIELDS
+
+
+@receiver(pre_save, sender=Product)
+@receiver(pre_save, sender=Charm)
+@receiver(pre_save, sender=GiftSetOrBundleMonthlySpecial)
+def remember_changed_fields(sender, instance, update_fields=None, **kwargs):
+    instance._changed_fields = instance.changed_fields(update_fields)
+    instance.remember_loaded_values()
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_catalog_cache(sender, signal, instance=None, **kwargs):
+    if signal is post_save and _inventory_only(instance):
+        # stok saja: tanpa autocomplete / homepage rebuild; tidak ada perubahan -> tidak ada bump
+        namespaces = INVENTORY_DEPENDENCIES.get(sender._meta.label, ()) if instance._changed_fields else ()
+        if namespaces:
+            transaction.on_commit(lambda: bump_version(*namespaces))
+        return
+    namespaces = _namespaces_for(sender)
+    if namespaces:
+        _on_namespaces_changed(namespaces)
+
+
+@receiver(m2m_changed)
+def invalidate_catalog_cache_m2m(sender, action, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    namespaces = _namespaces_for(sender)
+    if namespaces:
+        _on_namespaces_changed(namespaces)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Charm)
+def update_search_index(sender, instance, **kwargs):
+    if not _inventory_only(instance):
+        index_object(instance)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Charm)
+def remove_from_search_index(sender, instance, **kwargs):
+    remove_object(sender, instance.pk)
+
+
+@receiver(post_save)
+def schedule_image_variants(sender, instance, **kwargs):
+    if sender._meta.label not in IMAGE_MODELS or not needs_variants(instance):
+        return
+    label, pk = sender._meta.label, instance.pk
+    transaction.on_commit(lambda: enqueue(generate_image_variants, label, pk))
+
+
+@receiver(post_save, sender=VideoContent)
+def schedule_video_transcode(sender, instance, **kwargs):
+    if not needs_transcode(instance):
+        return
+    pk = instance.pk
+    transaction.on_commit(lambda: enqueue(transcode_video_to_hls, pk))
+
+
+@receiver(m2m_changed)
+def update_rating_aggregates_m2m(sender, instance, action, reverse, pk_set, **kwargs):
+    target = rating_service.target_for_through(sender)
+    if target is None:
+        return
+    relation, field = target
+    if action == 'pre_clear':
+        # setelah clear() id yang dilepas sudah tidak bisa dibaca
+        if reverse:
+            instance._cleared_review_ids = list(instance.review_set.values_list('pk', flat=True))
+        else:
+            instance._cleared_item_ids = list(getattr(instance, relation).values_list('pk', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    sign = 1 if action == 'post_add' else -1
+    if reverse:
+        review_ids = instance.__dict__.pop('_cleared_review_ids', []) if action == 'post_clear' else pk_set
+        rating_service.link_item(field, instance.pk, review_ids, sign)
+    else:
+        item_ids = instance.__dict__.pop('_cleared_item_ids', []) if action == 'post_clear' else pk_set
+        rating_service.link_review(instance, field, item_ids, sign)
+
+
+@receiver(pre_delete, sender=Review)
+def remove_review_from_aggregates(sender, instance, **kwargs):
+    # baris M2M ikut terhapus cascade tanpa m2m_changed, jadi kurangi di sini
+    rating_service.remove_review(instance)
+
+
+@receiver(pre_save, sender=Review)
+def remember_review_rating(sender, instance, **kwargs):
+    if instance.pk is not None:
+        instance._previous_rating = Review.objects.filter(pk=instance.pk).values_list('rating', flat=True).first()
+
+
+@receiver(post_save, sender=Review)
+def update_changed_review_rating(sender, instance, created, **kwargs):
+    previous = instance.__dict__.pop('_previous_rating', None)
+    if not created and previous is not None and previous != instance.rating:
+        rating_service.change_review_rating(instance, previous)
+
+
+def create_search_table(sender, **kwargs):
+    ensure_search_table()
+
+
+_SET_MEMBERSHIPS = (Product.jewel_set_products.through, GiftSetOrBundleMonthlySpecial.products.through)
+
+
+@receiver(m2m_changed)
+def rebuild_set_compositions_m2m(sender, action, **kwargs):
+    if sender in _SET_MEMBERSHIPS and action in ('post_add', 'post_remove', 'post_clear'):
+        transaction.on_commit(composition_service.rebuild_compositions)
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=GiftSetOrBundleMonthlySpecial)
+def rebuild_set_compositions_on_delete(sender, **kwargs):
+    # baris through dan SetComponent ikut terhapus cascade tanpa m2m_changed
+    transaction.on_commit(composition_service.rebuild_compositions)
+
+
+@receiver(post_save, sender=Product)
+def refresh_set_availability(sender, instance, created, **kwargs):
+    changed = instance.__dict__.get('_changed_fields')
+    if not created and (changed is None or 'stock' in changed):
+        composition_service.refresh_for_components([instance.pk])
@@ -0,0 +1,54 @@
+import logging
+
+from celery import shared_task
+from kombu.exceptions import OperationalError
+
+from .services import homepage_service, ranking_service, recommendation_service
+from .services.image_variant_service import generate_variants_for
+from .services.video_transcode_service import stale_transcodes, transcode_video_by_id
+
+logger = logging.getLogger("celery")
+
+
+def enqueue(task, *args, **kwargs):
+    """
+    Kirim task ke Celery tanpa retry koneksi. Kalau broker mati, cukup dicatat:
+    datanya sudah tersimpan dan bisa diproses ulang lewat management command.
+    """
+    try:
+        task.apply_async(args=args, kwargs=kwargs, retry=False)
+    except OperationalError as e:
+        logger.warning(f"Gagal mengirim task {task.name}: {e}")
+
+
+@shared_task(ignore_result=True)
+def generate_image_variants(model_label, pk, force=False):
+    generate_variants_for(model_label, pk, force=force)
+
+
+@shared_task(ignore_result=True)
+def transcode_video_to_hls(pk):
+    transcode_video_by_id(pk)
+
+
+@shared_task(ignore_result=True)
+def recover_stale_transcodes():
+    for pk in stale_transcodes().values_list('pk', flat=True):
+        enqueue(transcode_video_to_hls, pk)
+
+
+@shared_task(ignore_result=True)
+def rebuild_homepage(base_url):
+    homepage_service.rebuild(base_url)
+
+
+@shared_task(ignore_result=True)
+def recompute_sales_rankings():
+    changed = ranking_service.recompute_rankings()
+    logger.info(f"Ranking penjualan dihitung ulang: {changed}")
+
+
+@shared_task(ignore_result=True)
+def rebuild_recommendations():
+    total = recommendation_service.rebuild_recommendations()
+    logger.info(f"Rekomendasi dibangun ulang: {total} baris")
@@ -0,0 +1,41 @@
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    Mixin untuk TestCase: pastikan jumlah query sebuah endpoint tetap,
+    berapapun jumlah row-nya.
+
+        self.assertQueryBudget('/api/products/', 3, seed=self.make_products)
+
+    `seed(n)` dipanggil sebelum tiap pengukuran untuk menambah n row baru.
+    Test gagal kalau salah satu pengukuran melebihi `budget` atau kalau
+    jumlah query ikut naik bersama jumlah row (indikasi N+1). Semua cache
+    dikosongkan sebelum tiap pengukuran, jadi yang diukur selalu jalur dingin.
+    """
+    query_budget_sizes = (1, 10)
+
+    def assertQueryBudget(self, url, budget, seed, client=None, sizes=None):
+        client = client or self.client
+        counts = []
+        for size in sizes or self.query_budget_sizes:
+            seed(size)
+            for cache in caches.all():
+                cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.get(url)
+            self.assertEqual(response.status_code, 200, f"GET {url} -> {response.status_code}")
+            counts.append(len(ctx.captured_queries))
+            if len(ctx.captured_queries) > budget:
+                queries = '\n'.join(q['sql'] for q in ctx.captured_queries)
+                self.fail(
+                    f"GET {url} menjalankan {len(ctx.captured_queries)} query "
+                    f"(budget {budget}):\n{queries}"
+                )
+        self.assertEqual(
+            len(set(counts)), 1,
+            f"Jumlah query GET {url} bergantung pada jumlah row: {counts}",
+        )
+        return counts[-1]
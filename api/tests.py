@@ -1,3 +1,1172 @@
-from django.test import TestCase
+import json
+import os
+from base64 import urlsafe_b64encode
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from itertools import count
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+import msgpack
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from sparklore.media import serve as serve_media
+
+from .models import (
+    Cart, CartItem, CartItemCharm, Charm, DiscountCampaign, DiscountedItem,
+    GiftSetOrBundleMonthlySpecial, Order, OrderItem, OrderItemCharm, PageBanner, Product,
+    ProductImage, RatingAggregate, Review, SetComponent, VideoContent,
+)
+from .cache import get_cache, get_version_info
+from .pricing import get_price_table
+from .search import index_objects
+from .services import homepage_service, ranking_service, video_transcode_service
+from .services.catalog_io_service import CatalogImportError, export_catalog, import_catalog
+from .services.composition_service import flatten, rebuild_compositions
+from .services.image_variant_service import generate_variants_for
+from .services.recommendation_service import rebuild_recommendations
+from .services.video_transcode_service import transcode_video_by_id
+from .testing import QueryBudgetMixin
+
+User = get_user_model()
+_seq = count()
+
+
+def make_product(images=2, **kwargs):
+    n = next(_seq)
+    defaults = {'name': f'Produk {n}', 'category': 'bracelet', 'price': Decimal('100000'), 'label': 'gold', 'stock': 10}
+    defaults.update(kwargs)
+    product = Product.objects.create(**defaults)
+    for i in range(images):
+        ProductImage.objects.create(product=product, image=f'products/{product.id}/{i}.jpg')
+    return product
+
+
+def make_charm(**kwargs):
+    n = next(_seq)
+    defaults = {'name': f'Charm {n}', 'category': 'zodiac', 'price': Decimal('25000'), 'image': 'charms/c.png', 'stock': 10}
+    defaults.update(kwargs)
+    return Charm.objects.create(**defaults)
+
+
+def make_gift_set(**kwargs):
+    n = next(_seq)
+    defaults = {'name': f'Gift Set {n}', 'price': Decimal('300000'), 'image': 'gift_sets/g.png', 'stock': 5}
+    defaults.update(kwargs)
+    gift_set = GiftSetOrBundleMonthlySpecial.objects.create(**defaults)
+    gift_set.products.add(make_product(), make_product())
+    return gift_set
+
+
+class CatalogPaginationTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+
+    def walk(self, url):
+        ids, pages = [], 0
+        while url:
+            page = self.client.get(url).json()
+            ids.extend(row['id'] for row in page['results'])
+            url, pages = page['next'], pages + 1
+        return ids, pages
+
+    def cursor(self, position, reverse=False):
+        tokens = {'p': position, **({'r': 1} if reverse else {})}
+        return urlsafe_b64encode(json.dumps(tokens).encode()).decode().rstrip('=')
+
+    def test_next_link_walks_every_row_once(self):
+        products = [make_product(images=0, price=Decimal(100000 + i)) for i in range(5)]
+        ids, pages = self.walk('/api/products/?ordering=-price&page_size=2')
+        self.assertEqual(ids, [p.pk for p in reversed(products)])
+        self.assertEqual(pages, 3)
+
+    def test_ties_broken_by_id(self):
+        products = [make_product(images=0, price=Decimal('100000'), rating=Decimal('4.50')) for _ in range(5)]
+        for ordering in ('price', 'rating', '-rating,price'):
+            ids, _ = self.walk(f'/api/products/?ordering={ordering}&page_size=2')
+            self.assertEqual(sorted(ids), [p.pk for p in products], ordering)
+            self.assertEqual(len(set(ids)), 5, ordering)
+
+        second = self.client.get(self.client.get('/api/products/?ordering=price&page_size=2').json()['next']).json()
+        self.assertEqual([row['id'] for row in self.client.get(second['previous']).json()['results']],
+                         [products[0].pk, products[1].pk])
+
+    def test_null_position(self):
+        products = [make_product(images=0, rating=Decimal(rating)) for rating in ('1.00', '3.00')]
+        # NULL dianggap nilai terkecil: ascending semua baris ada di belakangnya, descending tidak ada
+        page = self.client.get(f'/api/products/?ordering=rating&cursor={self.cursor([None, None])}').json()
+        self.assertEqual([row['id'] for row in page['results']], [p.pk for p in products])
+        page = self.client.get(f'/api/products/?ordering=-rating&cursor={self.cursor([None, None])}').json()
+        self.assertEqual(page['results'], [])
+
+    def test_malformed_cursor(self):
+        make_product(images=0)
+        for cursor in ('!!!', 'bm90LWpzb24', self.cursor('x'), self.cursor([1, 2, 3])):
+            self.assertEqual(self.client.get(f'/api/products/?cursor={cursor}').status_code, 404, cursor)
+
+
+class CatalogQueryBudgetTests(QueryBudgetMixin, TestCase):
+    # setiap budget termasuk 1 query tabel harga kampanye (cache dikosongkan)
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_products(self):
+        def seed(n):
+            for _ in range(n):
+                product = make_product(category='jewel_set')
+                product.jewel_set_products.add(make_product())
+        self.assertQueryBudget('/api/products/', 4, seed)
+
+    def test_charms(self):
+        self.assertQueryBudget('/api/charms/', 2, lambda n: [make_charm() for _ in range(n)])
+
+    def test_gift_sets(self):
+        self.assertQueryBudget('/api/gift-sets/', 3, lambda n: [make_gift_set() for _ in range(n)])
+
+    def test_reviews(self):
+        def seed(n):
+            for _ in range(n):
+                review = Review.objects.create(user_name='a', rating=5)
+                review.products.add(make_product())
+                review.charms.add(make_charm())
+                review.gift_sets.add(make_gift_set())
+        self.assertQueryBudget('/api/reviews/', 4, seed)
+        # relasi penuh: + images, jewel set, produk gift set, tabel harga
+        self.assertQueryBudget('/api/reviews/?expand=all', 8, seed)
+
+    def test_discount_campaigns(self):
+        def seed(n):
+            campaign = DiscountCampaign.objects.create(
+                name='Promo', start_time=timezone.now(), end_time=timezone.now() + timedelta(days=1),
+            )
+            for _ in range(n):
+                DiscountedItem.objects.create(campaign=campaign, product=make_product(), discount_type='percent', discount_value=10)
+        self.assertQueryBudget('/api/discount-campaigns/', 4, seed)
+
+
+class OrderCartQueryBudgetTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='budget@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def make_order(self):
+        order = Order.objects.create(user=self.user, shipping_address='Jl. Test')
+        item = OrderItem.objects.create(order=order, product=make_product())
+        OrderItemCharm.objects.create(order_item=item, charm=make_charm())
+        OrderItem.objects.create(order=order, gift_set=make_gift_set())
+        return order
+
+    def test_orders(self):
+        self.assertQueryBudget('/api/orders/', 4, lambda n: [self.make_order() for _ in range(n)])
+
+    def test_admin_orders_table(self):
+        self.assertQueryBudget('/api/admin/orders-table/', 4, lambda n: [self.make_order() for _ in range(n)])
+
+    def test_cart(self):
+        cart = Cart.objects.create(user=self.user)
+
+        def seed(n):
+            for _ in range(n):
+                item = CartItem.objects.create(cart=cart, product=make_product(images=0))
+                CartItemCharm.objects.create(item=item, charm=make_charm(), quantity=2)
+                CartItem.objects.create(cart=cart, gift_set=make_gift_set())
+        # cart, items (+ product, gift set), baris charm, tabel harga, harga charm
+        self.assertQueryBudget('/api/cart/', 5, seed)
+
+
+class CatalogResponseCacheTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+
+    def test_cached_until_model_changes(self):
+        product = make_product(name='Lama')
+        self.assertEqual(self.client.get('/api/products/').json()[0]['name'], 'Lama')
+
+        with self.assertNumQueries(0):
+            self.client.get('/api/products/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.name = 'Baru'
+            product.save()
+        self.assertEqual(self.client.get('/api/products/').json()[0]['name'], 'Baru')
+
+    def test_related_model_invalidates_dependent_endpoints(self):
+        gift_set = make_gift_set()
+        self.client.get('/api/gift-sets/')
+        product = gift_set.products.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            product.name = 'Ganti Nama'
+            product.save()
+        names = [p['name'] for p in self.client.get('/api/gift-sets/').json()[0]['products']]
+        self.assertIn('Ganti Nama', names)
+
+    def test_query_string_is_part_of_key(self):
+        make_product(name='Cincin Emas', category='ring')
+        make_product(name='Gelang Perak')
+        self.assertEqual(len(self.client.get('/api/products/').json()), 2)
+        self.assertEqual(len(self.client.get('/api/products/?search=cincin').json()), 1)
+
+    def test_conditional_get(self):
+        product = make_product()
+        response = self.client.get('/api/products/')
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class FullTextSearchTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+
+    def test_search_uses_index_and_ranks_name_first(self):
+        in_description = make_product(name='Gelang Klasik', description='Cocok dengan charm zodiac')
+        in_name = make_product(name='Zodiac Necklace', category='necklace')
+        make_product(name='Cincin Polos', category='ring')
+
+        ids = [p['id'] for p in self.client.get('/api/products/?search=zodi').json()]
+        self.assertEqual(ids, [in_name.id, in_description.id])
+
+    def test_index_follows_updates_and_deletes(self):
+        charm = make_charm(name='Birthstone Januari', category='birthstone')
+        self.assertEqual(len(self.client.get('/api/charms/?search=januari').json()), 1)
+
+        charm.name = 'Birthstone Februari'
+        charm.save()
+        get_cache().clear()
+        self.assertEqual(len(self.client.get('/api/charms/?search=januari').json()), 0)
+
+        charm.delete()
+        get_cache().clear()
+        self.assertEqual(len(self.client.get('/api/charms/?search=februari').json()), 0)
+
+    def test_paginated_search_keeps_rank_order(self):
+        best = make_product(name='Emas Emas', label='gold')
+        other = make_product(name='Gelang', description='lapis emas')
+        response = self.client.get('/api/products/?search=emas&page_size=1').json()
+        self.assertEqual([p['id'] for p in response['results']], [best.id])
+        response = self.client.get(response['next']).json()
+        self.assertEqual([p['id'] for p in response['results']], [other.id])
+
+    def test_search_is_not_truncated(self):
+        products = Product.objects.bulk_create(
+            Product(name=f'Kalung Mutiara {i}', category='necklace', price=Decimal('100000'), label='gold', stock=1)
+            for i in range(205)
+        )
+        index_objects(products)
+        make_product(name='Cincin Polos', category='ring')
+
+        ids, url = [], '/api/products/?search=mutiara&page_size=100'
+        while url:
+            page = self.client.get(url).json()
+            ids.extend(p['id'] for p in page['results'])
+            url = page['next']
+        self.assertEqual(sorted(ids), sorted(p.pk for p in products))
+        facets = self.client.get('/api/products/facets/?search=mutiara').json()
+        self.assertEqual(facets['category']['necklace'], 205)
+
+
+class AutocompleteTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+
+    def test_typo_and_prefix(self):
+        zodiac = make_charm(name='Zodiac Leo')
+        birthstone = make_charm(name='Birthstone Garnet', category='birthstone')
+        gift_set = make_gift_set(name='Zodiac Couple Set')
+
+        results = self.client.get('/api/autocomplete/?q=zodiak').json()['results']
+        self.assertEqual({(r['type'], r['id']) for r in results}, {('charm', zodiac.id), ('gift_set', gift_set.id)})
+
+        results = self.client.get('/api/autocomplete/?q=birthston').json()['results']
+        self.assertEqual(results[0]['id'], birthstone.id)
+
+        results = self.client.get('/api/autocomplete/?q=zodiak&types=gift_set').json()['results']
+        self.assertEqual([r['id'] for r in results], [gift_set.id])
+
+    def test_no_queries_per_keystroke_and_refresh_on_change(self):
+        self.client.get('/api/autocomplete/?q=a')
+        with self.assertNumQueries(0):
+            self.client.get('/api/autocomplete/?q=gelan')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product = make_product(name='Gelang Rantai', images=0)
+        results = self.client.get('/api/autocomplete/?q=gelan').json()['results']
+        self.assertEqual([r['id'] for r in results], [product.id])
+
+
+class FacetTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        make_product(category='ring', label='gold', price=Decimal('90000'))
+        make_product(category='ring', label='silver', price=Decimal('300000'), stock=0)
+        make_product(category='necklace', label='gold', price=Decimal('600000'))
+
+    def test_filters(self):
+        self.assertEqual(len(self.client.get('/api/products/?label=gold').json()), 2)
+        self.assertEqual(len(self.client.get('/api/products/?category=ring&in_stock=true').json()), 1)
+        self.assertEqual(len(self.client.get('/api/products/?price_min=100000&price_max=700000').json()), 2)
+
+    def test_facet_counts_exclude_own_filter(self):
+        # 3 facet + 1 tabel harga (key cache produk ikut batas kampanye)
+        with self.assertNumQueries(5):
+            facets = self.client.get('/api/products/facets/?label=gold').json()
+        self.assertEqual(facets['label']['gold'], 2)
+        self.assertEqual(facets['label']['silver'], 1)
+        self.assertEqual(facets['category']['ring'], 1)
+        self.assertEqual(facets['category']['necklace'], 1)
+        self.assertEqual(facets['in_stock'], {'true': 2, 'false': 0})
+        self.assertEqual([b['count'] for b in facets['price']], [1, 0, 0, 1, 0])
+
+        with self.assertNumQueries(0):
+            self.client.get('/api/products/facets/?label=gold')
+
+
+class ImageVariantTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+    def upload(self, width, height, mode='RGB'):
+        buffer = BytesIO()
+        Image.new(mode, (width, height), 'red').save(buffer, format='PNG')
+        return SimpleUploadedFile('banner.png', buffer.getvalue(), content_type='image/png')
+
+    def test_variants_generated_and_exposed_as_srcset(self):
+        with override_settings(MEDIA_ROOT=self.media_root):
+            banner = PageBanner.objects.create(page='homepage', image=self.upload(1000, 500, 'RGBA'))
+            manifest = generate_variants_for('api.PageBanner', banner.pk)
+
+            self.assertEqual(sorted(manifest['variants']['webp']), ['320', '640', '960'])
+            self.assertEqual(manifest['source'], banner.image.name)
+            with Image.open(f"{self.media_root}/{manifest['variants']['jpeg']['640']}") as variant:
+                self.assertEqual(variant.size, (640, 320))
+
+            # manifest sudah sesuai sumber, jadi tidak diproses ulang
+            self.assertEqual(generate_variants_for('api.PageBanner', banner.pk), manifest)
+
+            srcset = APIClient().get('/api/page-banners/').json()[0]['image_srcset']
+            self.assertIn('320w', srcset['webp'])
+            self.assertIn('/media/derivatives/banners/', srcset['jpeg'])
+
+
+class VideoTranscodeTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+
+    def test_missing_ffmpeg_marks_failed_without_rescheduling(self):
+        with override_settings(MEDIA_ROOT=self.media_root, FFPROBE_BINARY='/nonexistent/ffprobe'):
+            video = VideoContent.objects.create(
+                title='Teaser', video_file=SimpleUploadedFile('teaser.mp4', b'not a video'),
+            )
+            video = transcode_video_by_id(video.pk)
+
+            self.assertEqual(video.transcode_status, VideoContent.TranscodeStatus.FAILED)
+            self.assertEqual(video.transcoded_source, video.video_file.name)
+            payload = APIClient().get(f'/api/videos/{video.pk}/').json()
+            self.assertEqual(payload['transcode_status'], 'failed')
+            self.assertIsNone(payload['hls_url'])
+
+    def fake_ffmpeg(self, on_rendition=None):
+        def rendition(source, workdir, name, *args):
+            if on_rendition:
+                on_rendition()
+            for suffix in ('.m3u8', '_0000.ts'):
+                open(os.path.join(workdir, name + suffix), 'w').close()
+
+        def poster(source, workdir, duration):
+            path = os.path.join(workdir, 'poster.jpg')
+            Image.new('RGB', (4, 4)).save(path)
+            return path
+
+        return [
+            mock.patch.object(video_transcode_service, 'probe', return_value=(640, 360, False, 10.0, 30.0)),
+            mock.patch.object(video_transcode_service, '_transcode_rendition', side_effect=rendition),
+            mock.patch.object(video_transcode_service, '_extract_poster', side_effect=poster),
+        ]
+
+    def run_transcode(self, video, on_rendition=None):
+        patches = self.fake_ffmpeg(on_rendition)
+        for patch in patches:
+            patch.start()
+        try:
+            return video_transcode_service.transcode_video(video)
+        finally:
+            for patch in patches:
+                patch.stop()
+
+    def test_retranscode_replaces_poster_and_skips_superseded_source(self):
+        with override_settings(MEDIA_ROOT=self.media_root), mock.patch('api.tasks.enqueue'):
+            video = VideoContent.objects.create(title='Teaser', video_file=SimpleUploadedFile('a.mp4', b'a'))
+            video = self.run_transcode(video)
+            self.assertEqual(video.transcode_status, VideoContent.TranscodeStatus.READY)
+            first_poster = video.poster.name
+
+            video.video_file = SimpleUploadedFile('b.mp4', b'b')
+            video.save()
+            video = self.run_transcode(video)
+            self.assertNotEqual(video.poster.name, first_poster)
+            self.assertFalse(video.poster.storage.exists(first_poster))
+            self.assertTrue(video.poster.storage.exists(video.poster.name))
+
+            # file diganti selagi transcode berjalan: hasil lama dibuang, job baru dijadwalkan
+            def replace():
+                VideoContent.objects.filter(pk=video.pk).update(video_file='videos/c.mp4')
+            video.video_file = SimpleUploadedFile('d.mp4', b'd')
+            video.save()
+            self.run_transcode(video, on_rendition=replace)
+            current = VideoContent.objects.get(pk=video.pk)
+            self.assertEqual(current.transcode_status, VideoContent.TranscodeStatus.PROCESSING)
+            self.assertTrue(video_transcode_service.needs_transcode(current))
+
+    def test_needs_transcode_recovers_stale_processing(self):
+        video = VideoContent(
+            video_file='videos/a.mp4', processing_source='videos/a.mp4',
+            transcode_status=VideoContent.TranscodeStatus.PROCESSING, transcode_started_at=timezone.now(),
+        )
+        self.assertFalse(video_transcode_service.needs_transcode(video))
+        video.video_file = 'videos/b.mp4'
+        self.assertTrue(video_transcode_service.needs_transcode(video))
+        video.video_file = 'videos/a.mp4'
+        video.transcode_started_at = timezone.now() - timedelta(days=1)
+        self.assertTrue(video_transcode_service.needs_transcode(video))
+
+    def test_keyframe_interval_follows_frame_rate(self):
+        fps = video_transcode_service.frame_rate
+        self.assertAlmostEqual(fps({'avg_frame_rate': '30000/1001'}), 29.97, places=2)
+        self.assertEqual(fps({'avg_frame_rate': '0/0', 'r_frame_rate': '25/1'}), 25)
+        self.assertIsNone(fps({}))
+        self.assertEqual(video_transcode_service.keyframe_interval(59.94), 120)
+        self.assertEqual(video_transcode_service.keyframe_interval(None), 48)
+
+
+class MediaServingTests(TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        with open(f'{self.root}/clip.mp4', 'wb') as fh:
+            fh.write(bytes(range(100)))
+        self.factory = RequestFactory()
+
+    def get(self, path='clip.mp4', **headers):
+        request = self.factory.get(f'/media/{path}', **headers)
+        return serve_media(request, path, document_root=self.root, root_name='media')
+
+    def test_range_requests(self):
+        response = self.get(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(b''.join(response.streaming_content), bytes(range(10, 20)))
+        self.assertEqual(response['Content-Range'], 'bytes 10-19/100')
+
+        response = self.get(HTTP_RANGE='bytes=-5')
+        self.assertEqual(response['Content-Range'], 'bytes 95-99/100')
+
+        self.assertEqual(self.get(HTTP_RANGE='bytes=200-').status_code, 416)
+
+        full = self.get()
+        self.assertEqual(full.status_code, 200)
+        self.assertEqual(full['Accept-Ranges'], 'bytes')
+        # If-Range dengan ETag lama -> kirim utuh
+        self.assertEqual(self.get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"stale"').status_code, 200)
+        full.close()
+
+    def test_conditional_and_cache_headers(self):
+        response = self.get()
+        response.close()
+        self.assertIn('max-age=3600', response['Cache-Control'])
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=response['Last-Modified']).status_code, 304)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+        self.assertEqual(self.get(HTTP_IF_MODIFIED_SINCE=http_date(0)).status_code, 200)
+
+        with open(f'{self.root}/app.0123456789ab.js', 'w') as fh:
+            fh.write('1')
+        response = self.get('app.0123456789ab.js')
+        response.close()
+        self.assertIn('immutable', response['Cache-Control'])
+
+        with self.assertRaises(Http404):
+            self.get('../etc/passwd')
+
+    @override_settings(MEDIA_SERVE_MODE='x-accel-redirect', MEDIA_ACCEL_REDIRECT_PREFIX='/_protected/')
+    def test_accel_redirect_offloads_bytes(self):
+        response = self.get(HTTP_RANGE='bytes=0-9')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Accel-Redirect'], '/_protected/media/clip.mp4')
+        self.assertEqual(response.content, b'')
+
+
+class PricingEngineTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+
+    def test_effective_price_follows_campaign_window(self):
+        now = timezone.now()
+        product = make_product(images=0, price=Decimal('200000'), discount=Decimal('5'))
+        other = make_product(images=0, price=Decimal('100000'))
+        campaign = DiscountCampaign.objects.create(
+            name='Payday', start_time=now + timedelta(hours=1), end_time=now + timedelta(hours=3),
+        )
+        DiscountedItem.objects.create(campaign=campaign, product=product, discount_type='percent', discount_value=20)
+        DiscountedItem.objects.create(campaign=campaign, product=other, discount_type='amount', discount_value=150000)
+
+        start, end = campaign.start_time.timestamp(), campaign.end_time.timestamp()
+        with self.assertNumQueries(1):
+            before = get_price_table(now.timestamp())
+            self.assertEqual(before.resolve([product, other]), {product.pk: Decimal('190000.00'), other.pk: Decimal('100000.00')})
+        self.assertEqual(before.next_boundary, start)
+        self.assertFalse(before.is_current(start))
+
+        during = get_price_table(start)
+        self.assertEqual(during.resolve([product, other]), {product.pk: Decimal('160000.00'), other.pk: Decimal('0.00')})
+        self.assertEqual(during.next_boundary, end)
+        # tabel dipakai ulang tanpa query sampai batas berikutnya
+        with self.assertNumQueries(0):
+            self.assertIs(get_price_table(end - 1), during)
+        self.assertEqual(get_price_table(end).effective_price(product), Decimal('190000.00'))
+
+    def test_product_payload_and_cache_follow_campaign_changes(self):
+        now = timezone.now()
+        product = make_product(images=0, price=Decimal('100000'))
+        client = APIClient()
+        first = client.get(f'/api/products/{product.pk}/')
+        self.assertEqual(first.json()['effective_price'], '100000.00')
+
+        campaign = DiscountCampaign.objects.create(
+            name='Flash', start_time=now - timedelta(minutes=1), end_time=now + timedelta(hours=1),
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            DiscountedItem.objects.create(campaign=campaign, product=product, discount_type='amount', discount_value=25000)
+        second = client.get(f'/api/products/{product.pk}/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.json()['effective_price'], '75000.00')
+
+    def test_gift_set_cache_follows_campaign_start(self):
+        now = timezone.now()
+        gift_set = make_gift_set()
+        product = gift_set.products.order_by('pk').first()
+        client = APIClient()
+        prices = lambda: {p['id']: p['effective_price'] for p in client.get('/api/gift-sets/').json()[0]['products']}
+        self.assertEqual(prices()[product.pk], '100000.00')
+
+        # kampanye terjadwal: cache gift set harus berganti tepat saat kampanye mulai
+        start = now + timedelta(minutes=10)
+        with self.captureOnCommitCallbacks(execute=True):
+            campaign = DiscountCampaign.objects.create(name='Payday', start_time=start, end_time=start + timedelta(hours=1))
+            DiscountedItem.objects.create(campaign=campaign, product=product, discount_type='percent', discount_value=50)
+        self.assertEqual(prices()[product.pk], '100000.00')
+        with mock.patch('time.time', return_value=start.timestamp() + 1):
+            self.assertEqual(prices()[product.pk], '50000.00')
+            self.assertEqual(client.get(f'/api/products/{product.pk}/').json()['effective_price'], '50000.00')
+
+
+class CampaignEndpointTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+
+    def test_status_modes_and_slim_items(self):
+        now = timezone.now()
+        ended = DiscountCampaign.objects.create(name='Lalu', start_time=now - timedelta(days=2), end_time=now - timedelta(days=1))
+        active = DiscountCampaign.objects.create(name='Sekarang', start_time=now - timedelta(hours=1), end_time=now + timedelta(hours=1))
+        upcoming = DiscountCampaign.objects.create(name='Nanti', start_time=now + timedelta(days=1), end_time=now + timedelta(days=2))
+        DiscountedItem.objects.create(campaign=active, product=make_product(images=1, price=Decimal('50000')), discount_type='percent', discount_value=10)
+
+        client = APIClient()
+
+        def ids(query=''):
+            return [c['id'] for c in client.get(f'/api/discount-campaigns/{query}').json()]
+
+        # tanpa ?status= tetap list penuh semua kampanye (perilaku lama)
+        self.assertEqual(ids(), [ended.id, active.id, upcoming.id])
+        self.assertEqual(ids('?status=current'), [active.id, upcoming.id])
+        self.assertEqual(ids('?status=active'), [active.id])
+        self.assertEqual(ids('?status=upcoming'), [upcoming.id])
+        self.assertEqual(client.get('/api/discount-campaigns/?status=bogus').status_code, 400)
+
+        # ended / all selalu dipaginasi
+        page = client.get('/api/discount-campaigns/?status=all&page_size=2').json()
+        self.assertEqual([c['id'] for c in page['results']], [ended.id, active.id])
+        self.assertEqual([c['id'] for c in client.get(page['next']).json()['results']], [upcoming.id])
+        page = client.get('/api/discount-campaigns/?status=ended').json()
+        self.assertEqual(([c['id'] for c in page['results']], page['next']), ([ended.id], None))
+
+        item = client.get('/api/discount-campaigns/?status=active').json()[0]['items'][0]
+        self.assertEqual(item['discounted_price'], '45000.00')
+        self.assertEqual(item['product']['effective_price'], '45000.00')
+        self.assertNotIn('description', item['product'])
+        self.assertIn('image_url', item['product']['thumbnail'])
+
+    def test_campaign_without_items_sets_cache_boundary(self):
+        now = timezone.now()
+        DiscountCampaign.objects.create(name='Nanti', start_time=now + timedelta(hours=1), end_time=now + timedelta(hours=2))
+        table = get_price_table(now.timestamp())
+        self.assertEqual(table.next_boundary, (now + timedelta(hours=1)).timestamp())
+        self.assertEqual(table.seconds_valid(now.timestamp()), 3600)
+
+
+class RatingAggregateTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.product = make_product(images=0)
+        self.charm = make_charm()
+
+    def review(self, rating, *products):
+        review = Review.objects.create(user_name='a', rating=rating)
+        review.products.add(*products)
+        return review
+
+    def summary(self, **item):
+        return RatingAggregate.objects.get(**item)
+
+    def test_counts_follow_review_changes(self):
+        five = self.review(5, self.product)
+        self.review(2, self.product)
+        five.charms.add(self.charm)
+
+        summary = self.summary(product=self.product)
+        self.assertEqual((summary.review_count, summary.average), (2, Decimal('3.50')))
+        self.assertEqual(summary.histogram, {'1': 0, '2': 1, '3': 0, '4': 0, '5': 1})
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating, Decimal('3.50'))
+        self.assertEqual(self.summary(charm=self.charm).stars_5, 1)
+
+        five.rating = 4
+        five.save()
+        self.assertEqual(self.summary(product=self.product).histogram['4'], 1)
+
+        five.delete()
+        summary = self.summary(product=self.product)
+        self.assertEqual((summary.review_count, summary.rating_total, summary.stars_4), (1, 2, 0))
+        self.assertEqual(self.summary(charm=self.charm).review_count, 0)
+
+        # sisi balik M2M + clear()
+        other = Review.objects.create(user_name='b', rating=1)
+        self.product.review_set.add(other)
+        self.assertEqual(self.summary(product=self.product).review_count, 2)
+        self.product.review_set.clear()
+        self.assertEqual(self.summary(product=self.product).review_count, 0)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.rating, Decimal('0'))
+
+    def test_uncounted_review_leaves_counters_consistent(self):
+        counted = self.review(5, self.product)
+        uncounted = self.review(2, self.product)
+        # data lama: review bintang 2 belum pernah masuk agregat
+        RatingAggregate.objects.filter(product=self.product).update(review_count=1, rating_total=5, stars_2=0)
+
+        uncounted.delete()
+        summary = self.summary(product=self.product)
+        self.assertEqual((summary.review_count, summary.rating_total, summary.stars_2, summary.stars_5), (1, 5, 0, 1))
+
+        counted.delete()
+        summary = self.summary(product=self.product)
+        self.assertEqual((summary.review_count, summary.rating_total, summary.stars_5), (0, 0, 0))
+
+    def test_rebuild_repairs_drift_and_api_exposes_summary(self):
+        self.review(4, self.product)
+        self.review(5, self.product)
+        RatingAggregate.objects.update(review_count=99, stars_4=0)
+
+        call_command('rebuild_ratings', stdout=StringIO())
+        summary = self.summary(product=self.product)
+        self.assertEqual((summary.review_count, summary.stars_4, summary.stars_5), (2, 1, 1))
+
+        payload = APIClient().get(f'/api/products/{self.product.pk}/').json()
+        self.assertEqual(payload['rating_summary']['count'], 2)
+        self.assertEqual(payload['rating_summary']['average'], '4.50')
+        self.assertEqual(payload['rating'], '4.50')
+
+
+class ReviewSerializationTests(TestCase):
+    def test_compact_by_default_and_expandable(self):
+        product = make_product(images=1)
+        review = Review.objects.create(user_name='a', rating=5)
+        review.products.add(product)
+        client = APIClient()
+
+        compact = client.get('/api/reviews/').json()[0]
+        self.assertEqual(compact['products'], [{'id': product.id, 'name': product.name}])
+
+        expanded = client.get('/api/reviews/?expand=products,unknown').json()[0]
+        self.assertEqual(len(expanded['products'][0]['images']), 1)
+        self.assertEqual(expanded['products'][0]['effective_price'], '100000.00')
+        self.assertEqual(expanded['charms'], [])
+
+
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+
+    def test_fields_and_omit_prune_payload_and_prefetches(self):
+        product = make_product(images=2, category='jewel_set')
+        product.jewel_set_products.add(make_product(images=0))
+
+        get_cache().clear()
+        # tabel harga (key cache) + produk + images; jewel_set_products tidak di-prefetch
+        with self.assertNumQueries(3):
+            payload = self.client.get(f'/api/products/{product.pk}/?fields=id,name,images.image_url').json()
+        self.assertEqual(set(payload), {'id', 'name', 'images'})
+        self.assertEqual([set(image) for image in payload['images']], [{'image_url'}, {'image_url'}])
+
+        payload = self.client.get(f'/api/products/{product.pk}/?omit=description,images,rating_summary').json()
+        self.assertNotIn('images', payload)
+        self.assertIn('jewel_set_products', payload)
+
+    def test_users_and_nested_orders(self):
+        admin = User.objects.create_superuser(email='admin@example.com', password='x')
+        self.client.force_authenticate(admin)
+        payload = self.client.get('/auth/users/?fields=id,email').json()
+        self.assertEqual(payload, [{'id': admin.id, 'email': admin.email}])
+
+        order = Order.objects.create(user=admin, shipping_address='Jl. Mawar')
+        OrderItem.objects.create(order=order, product=make_product(images=0))
+        with self.assertNumQueries(1):
+            orders = self.client.get('/api/orders/?fields=id,total_price').json()
+        self.assertEqual(orders, [{'id': order.id, 'total_price': '0.00'}])
+
+    def test_charms(self):
+        charm = make_charm()
+        payload = self.client.get(f'/api/charms/{charm.pk}/?fields=id,price').json()
+        self.assertEqual(set(payload), {'id', 'price'})
+
+
+class RendererTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        make_product(images=1, description='baris baru')
+
+    def test_orjson_matches_stdlib_json(self):
+        response = self.client.get('/api/products/')
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertNotIn(b'\xe2\x80\xa8', response.content)
+        self.assertEqual(json.loads(response.content), json.loads(JSONRenderer().render(response.data)))
+
+    def test_msgpack_round_trip(self):
+        expected = self.client.get('/api/products/').json()
+        response = self.client.get('/api/products/', HTTP_ACCEPT='application/msgpack')
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(response.content), expected)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_renderers', seed=3, repeat=2, stdout=out)
+        self.assertIn('msgpack', out.getvalue())
+        self.assertFalse(Product.objects.filter(name__startswith='Benchmark').exists())
+
+
+CATALOG_CSV = """type,id,ref,name,category,label,price,stock,images,jewel_set_products,image,charms
+product,,kalung,Kalung Bintang,necklace,gold,150000,5,products/new/a.jpg|products/new/b.jpg,,,true
+product,,set,Set Bintang,jewel_set,gold,400000,2,,kalung,,false
+charm,,,Charm A,alphabet,silver,20000,50,,,charms/a.png,
+"""
+
+
+class CatalogImportExportTests(TestCase):
+    def test_import_creates_rows_images_and_links(self):
+        summary = import_catalog(StringIO(CATALOG_CSV), 'csv')
+        self.assertEqual(summary['created'], {'product': 2, 'charm': 1})
+        necklace = Product.objects.get(name='Kalung Bintang')
+        self.assertTrue(necklace.charms)
+        self.assertEqual(sorted(necklace.images.values_list('image', flat=True)), ['products/new/a.jpg', 'products/new/b.jpg'])
+        jewel_set = Product.objects.get(name='Set Bintang')
+        self.assertEqual(list(jewel_set.jewel_set_products.all()), [necklace])
+        self.assertTrue(Charm.objects.filter(name='Charm A', image='charms/a.png').exists())
+
+    def test_invalid_file_writes_nothing(self):
+        bad = CATALOG_CSV + "product,,,Tanpa Harga,necklace,gold,,1,,,,\nproduct,999,,X,ring,gold,1,1,,nope,,\n"
+        with self.assertRaises(CatalogImportError) as ctx:
+            import_catalog(StringIO(bad), 'csv')
+        self.assertEqual([line for line, _ in ctx.exception.errors], [5, 6])
+        self.assertFalse(Product.objects.exists())
+        self.assertFalse(Charm.objects.exists())
+
+    def test_export_round_trip_updates_in_place(self):
+        product = make_product(images=1)
+        product.jewel_set_products.add(make_product(images=0))
+        for fmt in ('csv', 'jsonl'):
+            product.refresh_from_db()
+            exported = ''.join(export_catalog(fmt)).replace(product.name, f'{product.name} ({fmt})')
+            summary = import_catalog(StringIO(exported), fmt)
+            self.assertEqual(summary['created'], {'product': 0, 'charm': 0})
+            self.assertEqual(summary['updated']['product'], 2)
+        product.refresh_from_db()
+        self.assertTrue(product.name.endswith(' (csv) (jsonl)'))
+        self.assertEqual(product.images.count(), 1)
+        self.assertEqual(product.jewel_set_products.count(), 1)
+
+    def test_admin_upload(self):
+        admin = User.objects.create_superuser(email='admin@example.com', password='x')
+        self.client.force_login(admin)
+        self.assertContains(self.client.get('/admin/api/product/'), 'import-catalog/')
+        upload = SimpleUploadedFile('drop.csv', CATALOG_CSV.encode(), content_type='text/csv')
+        response = self.client.post('/admin/api/product/import-catalog/', {'file': upload})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Product.objects.count(), 2)
+        response = self.client.get('/admin/api/product/export-catalog/?format=jsonl')
+        self.assertEqual(len(b''.join(response.streaming_content).splitlines()), 2)
+
+
+class InventoryBulkAdjustTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_superuser(email='admin@example.com', password='x'))
+
+    def test_applies_rows_with_constant_queries_and_reports_errors(self):
+        products = [make_product(images=0, stock=10) for _ in range(3)]
+        charm = make_charm(stock=4)
+        gift_set = make_gift_set()
+        items = [
+            {'type': 'product', 'id': products[0].pk, 'stock': 25},
+            {'type': 'product', 'id': products[1].pk, 'stock_delta': -4, 'price_delta': '-1000'},
+            {'type': 'product', 'id': products[2].pk, 'stock_delta': -11},
+            {'type': 'charm', 'id': charm.pk, 'price': '30000'},
+            {'type': 'gift_set', 'id': gift_set.pk, 'stock_delta': 3},
+            {'type': 'gift_set', 'id': 999999, 'stock': 1},
+            {'type': 'product', 'id': products[0].pk, 'stock': 1},
+            {'type': 'charm', 'id': charm.pk},
+        ]
+        products_version = get_cache().get('catalog:version:products')
+        # savepoint + (SELECT FOR UPDATE + UPDATE) x 3 model + cek set yang memuat produk + release
+        with self.assertNumQueries(9), self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/admin/inventory/bulk-adjust/', {'items': items}, format='json')
+        payload = response.json()
+        self.assertEqual((payload['updated'], payload['failed']), (4, 4))
+        self.assertEqual([row['status'] for row in payload['results']],
+                         ['updated', 'updated', 'error', 'updated', 'updated', 'error', 'error', 'error'])
+        self.assertEqual(payload['results'][1]['price'], '99000.00')
+
+        stocks = dict(Product.objects.filter(pk__in=[p.pk for p in products]).values_list('pk', 'stock'))
+        self.assertEqual([stocks[p.pk] for p in products], [25, 6, 10])
+        charm.refresh_from_db()
+        gift_set.refresh_from_db()
+        self.assertEqual((charm.price, charm.stock), (Decimal('30000'), 4))
+        self.assertEqual(gift_set.stock, 8)
+        self.assertNotEqual(get_cache().get('catalog:version:products'), products_version)
+
+    def test_admin_only(self):
+        self.client.force_authenticate(User.objects.create_user(email='u@example.com', password='x'))
+        response = self.client.post('/api/admin/inventory/bulk-adjust/', {'items': []}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class HomepageTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.client = APIClient()
+        for _ in range(10):
+            make_product(images=2)
+        make_gift_set()
+        PageBanner.objects.create(page='homepage', image='banners/home.jpg')
+        review = Review.objects.create(user_name='Ani', user_email='ani@example.com', rating=5)
+        review.products.add(Product.objects.first())
+
+    def test_slices_fixed_query_plan_and_cache(self):
+        get_cache().clear()
+        # tabel harga 1 + banner 1 + produk 2 + gift set 2 + video 1 + galeri 1 + review 4
+        with self.assertNumQueries(12):
+            response = self.client.get('/api/homepage/')
+        payload = response.json()
+        self.assertEqual(len(payload['new_arrivals']), 8)
+        self.assertEqual(len(payload['monthly_specials']), 1)
+        self.assertEqual(payload['banners'][0]['image_url'], 'http://testserver/media/banners/home.jpg')
+        self.assertNotIn('user_email', payload['reviews'][0])
+
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/homepage/')
+        self.assertEqual(cached.json(), payload)
+        self.assertEqual(self.client.get('/api/homepage/', HTTP_IF_NONE_MATCH=cached['ETag']).status_code, 304)
+
+    def test_change_serves_stale_until_background_rebuild(self):
+        self.client.get('/api/homepage/')
+        with mock.patch('api.tasks.enqueue') as enqueue, self.captureOnCommitCallbacks(execute=True):
+            newest = make_product(images=0, name='Paling Baru')
+        enqueue.assert_called_once()
+        self.assertNotEqual(self.client.get('/api/homepage/').json()['new_arrivals'][0]['name'], 'Paling Baru')
+
+        homepage_service.rebuild(*enqueue.call_args.args[1:])
+        self.assertEqual(self.client.get('/api/homepage/').json()['new_arrivals'][0]['id'], newest.pk)
+
+    @override_settings(HOMEPAGE_STALE_GRACE=0)
+    def test_rebuilds_inline_after_grace(self):
+        self.client.get('/api/homepage/')
+        with mock.patch('api.tasks.enqueue'), self.captureOnCommitCallbacks(execute=True):
+            make_product(images=0, name='Paling Baru')
+        self.assertEqual(self.client.get('/api/homepage/').json()['new_arrivals'][0]['name'], 'Paling Baru')
+
+    def test_stock_only_save_skips_search_and_homepage(self):
+        self.client.get('/api/homepage/')
+        product = Product.objects.first()
+        before = {ns: get_version_info(ns)['token'] for ns in ('products', 'autocomplete', 'gift-sets')}
+        with mock.patch('api.tasks.enqueue') as enqueue, mock.patch('api.signals.index_object') as index, \
+                self.captureOnCommitCallbacks(execute=True):
+            product.stock -= 1
+            product.save(update_fields=['stock'])
+            product = Product.objects.get(pk=product.pk)
+            product.stock -= 1
+            product.save()
+        enqueue.assert_not_called()
+        index.assert_not_called()
+        self.assertNotEqual(get_version_info('products')['token'], before['products'])
+        self.assertEqual(get_version_info('autocomplete')['token'], before['autocomplete'])
+        self.assertEqual(get_version_info('gift-sets')['token'], before['gift-sets'])
+
+        with mock.patch('api.tasks.enqueue') as enqueue, mock.patch('api.signals.index_object') as index, \
+                self.captureOnCommitCallbacks(execute=True):
+            product.name = 'Nama Baru'
+            product.save()
+        enqueue.assert_called_once()
+        index.assert_called_once_with(product)
+        self.assertNotEqual(get_version_info('autocomplete')['token'], before['autocomplete'])
+
+
+class SalesRankingTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user(email='buyer@example.com', password='x')
+
+    def order(self, days_ago, status='paid', **item):
+        order = Order.objects.create(user=self.user, shipping_address='Jl. Mawar', payment_status=status)
+        Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        charms = item.pop('charms', [])
+        order_item = OrderItem.objects.create(order=order, **item)
+        for charm in charms:
+            OrderItemCharm.objects.create(order_item=order_item, charm=charm)
+
+    def test_counters_and_ordering(self):
+        steady, rising, unsold = make_product(images=0), make_product(images=0), make_product(images=0)
+        charm = make_charm()
+        self.order(60, product=steady, quantity=10)
+        self.order(20, product=steady, quantity=4)
+        self.order(2, product=steady, quantity=1)
+        self.order(1, product=rising, quantity=3, charms=[charm, charm])
+        self.order(1, status='pending', product=unsold, quantity=50)
+
+        self.assertEqual(ranking_service.recompute_rankings()['api.Product'], 2)
+        steady.refresh_from_db()
+        self.assertEqual((steady.sold_stok, steady.sales_7d, steady.sales_30d), (15, 1, 5))
+        self.assertEqual(steady.trending_score, 1 * 30 - 5 * 7)
+        self.assertEqual(Charm.objects.get(pk=charm.pk).sales_7d, 2)
+        # tidak ada perubahan -> tidak ada yang ditulis
+        self.assertEqual(ranking_service.recompute_rankings()['api.Product'], 0)
+
+        ids = lambda ordering: [row['id'] for row in self.client.get(f'/api/products/?ordering={ordering}').json()]
+        self.assertEqual(ids('best_selling')[:2], [steady.pk, rising.pk])
+        self.assertEqual(ids('trending')[0], rising.pk)
+        self.assertEqual(ids('-best_selling')[-1], steady.pk)
+        page = self.client.get('/api/products/?ordering=best_selling&page_size=1').json()
+        self.assertEqual(page['results'][0]['id'], steady.pk)
+        self.assertEqual(self.client.get(page['next']).json()['results'][0]['id'], rising.pk)
+
+
+class RecommendationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='buyer@example.com', password='x')
+
+    def basket(self, *items, status='paid'):
+        order = Order.objects.create(user=self.user, shipping_address='Jl. Mawar', payment_status=status)
+        for item in items:
+            if isinstance(item, Charm):
+                OrderItemCharm.objects.create(order_item=OrderItem.objects.create(order=order), charm=item)
+            elif isinstance(item, Product):
+                OrderItem.objects.create(order=order, product=item)
+            else:
+                OrderItem.objects.create(order=order, gift_set=item)
+
+    def test_rebuild_and_lookup(self):
+        necklace, ring, anklet = (make_product(images=1) for _ in range(3))
+        charm, gift_set = make_charm(), make_gift_set()
+        self.basket(necklace, ring, charm)
+        self.basket(necklace, ring)
+        self.basket(necklace, charm, charm)
+        self.basket(necklace, gift_set)
+        self.basket(necklace, anklet, status='pending')
+
+        self.assertEqual(rebuild_recommendations(top_k=2), 7)
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/recommendations/product/{necklace.pk}/')
+        self.assertEqual(response.json()['results'], [
+            {'type': 'product', 'id': ring.pk, 'score': 2},
+            {'type': 'charm', 'id': charm.pk, 'score': 2},
+        ])
+        results = self.client.get(f'/api/recommendations/charm/{charm.pk}/?expand=items').json()['results']
+        self.assertEqual([(row['type'], row['item']['id']) for row in results], [('product', necklace.pk), ('product', ring.pk)])
+        results = self.client.get(f'/api/recommendations/charm/{charm.pk}/?expand=items&fields=id,name').json()['results']
+        self.assertEqual([set(row['item']) for row in results], [{'id', 'name'}, {'id', 'name'}])
+        self.assertEqual(self.client.get(f'/api/recommendations/gift_set/{gift_set.pk}/').json()['results'][0]['id'], necklace.pk)
+        self.assertEqual(self.client.get('/api/recommendations/order/1/').status_code, 404)
+        for limit in ('-1', '0', 'x'):
+            self.assertEqual(self.client.get(f'/api/recommendations/product/{necklace.pk}/?limit={limit}').status_code, 400)
+        self.assertEqual(len(self.client.get(f'/api/recommendations/product/{necklace.pk}/?limit=1').json()['results']), 1)
+
+
+class SetCompositionTests(TestCase):
+    def test_flatten_cycle_does_not_poison_memo(self):
+        # A berisi B dan 1, B berisi A dan 2: keduanya punya daun {1, 2}
+        flattened, leaves = flatten({'A': {'B', 1}, 'B': {'A', 2}})
+        self.assertEqual(flattened, {'A': {1, 2}, 'B': {1, 2}})
+        self.assertEqual(leaves('B', {'B'}), {1, 2})
+
+    def test_nested_sets_and_availability(self):
+        ring, chain, pendant = make_product(images=0, stock=7), make_product(images=0, stock=3), make_product(images=0, stock=9)
+        inner = make_product(images=0, category='jewel_set')
+        outer = make_product(images=0, category='jewel_set')
+        with self.captureOnCommitCallbacks(execute=True):
+            inner.jewel_set_products.add(chain, pendant)
+            outer.jewel_set_products.add(ring, inner)
+            gift_set = GiftSetOrBundleMonthlySpecial.objects.create(name='Hampers', price=Decimal('1'), image='g.png', stock=5)
+            gift_set.products.add(outer)
+
+        self.assertEqual(set(SetComponent.objects.filter(jewel_set=outer).values_list('product_id', flat=True)), {ring.pk, chain.pk, pendant.pk})
+        available = lambda obj: type(obj).objects.get(pk=obj.pk).available_stock
+        self.assertEqual((available(inner), available(outer), available(gift_set), available(ring)), (3, 3, 3, None))
+
+        # stok komponen berubah -> hanya set yang memuatnya dihitung ulang
+        chain.stock = 0
+        chain.save()
+        self.assertEqual((available(outer), available(gift_set)), (0, 0))
+        in_stock = self.client.get('/api/products/?in_stock=true').json()
+        self.assertNotIn(outer.pk, [row['id'] for row in in_stock])
+        self.assertIn(ring.pk, [row['id'] for row in in_stock])
+        self.assertEqual(self.client.get('/api/gift-sets/?in_stock=true').json(), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            inner.jewel_set_products.remove(chain)
+        self.assertEqual(available(outer), 7)
+        self.assertEqual(rebuild_compositions(), SetComponent.objects.count())
+
+
+class CartMutationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='cart@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.product = make_product(images=0)
+        self.charms = [make_charm() for _ in range(3)]
+
+    def test_charms_resolved_and_written_in_bulk(self):
+        ids = [self.charms[0].pk, self.charms[1].pk, self.charms[0].pk]
+        response = self.client.post('/api/cart/add/', {'product': self.product.pk, 'charms': ids}, format='json')
+        self.assertEqual(response.status_code, 201)
+        item = CartItem.objects.get(cart__user=self.user)
+        self.assertEqual(
+            sorted(CartItemCharm.objects.filter(item=item).values_list('charm_id', 'quantity')),
+            sorted([(self.charms[0].pk, 2), (self.charms[1].pk, 1)]),
+        )
+
+        with CaptureQueriesContext(connection) as captured:
+            self.client.patch(f'/api/cart/{item.pk}/update_item/', {'charms': [c.pk for c in self.charms] + [self.charms[0].pk] * 2}, format='json')
+        sql = [query['sql'] for query in captured]
+        # satu INSERT dan lookup charm untuk validasi + harga di respons, berapa pun jumlah charm
+        self.assertEqual(sum('INSERT INTO "api_cartitemcharm"' in q for q in sql), 1)
+        self.assertEqual(sum(q.startswith('SELECT') and 'FROM "api_charm" WHERE "api_charm"."id" IN' in q for q in sql), 2)
+        self.assertEqual(CartItemCharm.objects.get(item=item, charm=self.charms[0]).quantity, 3)
+
+    def test_unknown_charms_reported_together(self):
+        response = self.client.post(
+            '/api/cart/add/', {'product': self.product.pk, 'charms': [self.charms[0].pk, 999998, 999999]}, format='json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['charms'], ['Charm tidak ditemukan: 999998, 999999.'])
+        self.assertFalse(CartItem.objects.filter(cart__user=self.user).exists())
+
+    def test_malformed_charms_rejected(self):
+        item = CartItem.objects.create(cart=Cart.objects.create(user=self.user), product=self.product)
+        url = f'/api/cart/{item.pk}/update_item/'
+        for charms in (3, 'abc', {'id': 1}):
+            self.assertEqual(self.client.patch(url, {'charms': charms}, format='json').status_code, 400, charms)
+        self.assertEqual(self.client.post('/api/cart/add/', {'product': self.product.pk, 'charms': 3}, format='json').status_code, 400)
+        too_many = [self.charms[0].pk] * 6
+        response = self.client.patch(url, {'charms': too_many}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(CartItemCharm.objects.filter(item=item).exists())
+
+    def test_charm_rules_enforced(self):
+        add = lambda charms, **item: self.client.post('/api/cart/add/', {**item, 'charms': charms}, format='json')
+        ids = [charm.pk for charm in self.charms]
+
+        self.assertEqual(add(ids, product=make_product(images=0, category='necklace').pk).status_code, 201)
+        response = add(ids[:1], product=make_product(images=0, category='ring').pk)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('necklace atau bracelet', str(response.json()))
+
+        self.assertEqual(add(ids + ids[:2], product=self.product.pk).status_code, 201)
+        response = add(ids + ids, product=self.product.pk)
+        self.assertEqual((response.status_code, response.json()), (400, {'non_field_errors': ['Max 5 charms untuk produk ini.']}))
+        max3 = make_product(images=0, is_charm_max3=True, is_charm_max5=True)
+        self.assertEqual(add(ids + ids[:1], product=max3.pk).json(), {'non_field_errors': ['Max 3 charms untuk produk ini.']})
+
+        response = add(ids[:1], gift_set=make_gift_set().pk)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(CartItem.objects.filter(cart__user=self.user).count(), 2)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_cart', repeat=2, stdout=out)
+        self.assertIn('update_item', out.getvalue())
+
+
+class CartPricingTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+        self.user = User.objects.create_user(email='pricing@example.com', password='x')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_totals_snapshot_and_checkout(self):
+        product = make_product(images=0, price=Decimal('100000'), discount=Decimal('10'))
+        charm = make_charm(price=Decimal('25000.50'))
+        gift_set = make_gift_set(price=Decimal('300000'))
+        cart = Cart.objects.create(user=self.user)
+        item = CartItem.objects.create(cart=cart, product=product, quantity=2)
+        CartItemCharm.objects.create(item=item, charm=charm, quantity=2)
+        CartItem.objects.create(cart=cart, gift_set=gift_set)
+
+        data = self.client.get('/api/cart/').json()
+        line = data['items'][0]
+        self.assertEqual((line['unit_price'], line['charms_price'], line['discount'], line['line_total']),
+                         ('90000.00', '50001.00', '20000.00', '230001.00'))
+        self.assertEqual(data['totals'], {'subtotal': '550001.00', 'discount': '20000.00', 'total': '530001.00'})
+
+        # isi cart sama -> snapshot dipakai ulang, tanpa lookup harga charm
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get('/api/cart/')
+        self.assertFalse(any('FROM "api_charm"' in query['sql'] for query in captured))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/api/cart/{item.pk}/update_item/', {'quantity': 1}, format='json')
+        self.assertEqual(self.client.get('/api/cart/').json()['totals']['total'], '440001.00')
+
+        response = self.client.post('/api/checkout/', {'shipping_address': 'Jl. Kenanga', 'shipping_cost': '15000'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Order.objects.get(pk=response.json()['order_id']).total_price, Decimal('440001.00'))
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CharmViewSet, DiscountCampaignViewSet, GiftSetOrBundleMonthlySpecialViewSet, JNTLocationListView, JNTOrderDetailView, JNTOrderListCreateView, MidtransSnapTokenView, OrderViewSet, ProductViewSet, CartViewSet, ReviewViewSet, NewsletterSubscriberViewSet, VideoContentViewSet, PageBannerViewSet, PhotoGalleryViewSet, AdminOrderTableView, cancel_order, check_tariff, create_order, print_waybill, track_order, checkout, direct_checkout, selective_checkout, validate_review_token, submit_review_via_token
+from .views import AutocompleteView, CharmViewSet, DiscountCampaignViewSet, GiftSetOrBundleMonthlySpecialViewSet, JNTLocationListView, JNTOrderDetailView, JNTOrderListCreateView, MidtransSnapTokenView, OrderViewSet, ProductViewSet, RecommendationView, CartViewSet, HomepageView, ReviewViewSet, NewsletterSubscriberViewSet, VideoContentViewSet, PageBannerViewSet, PhotoGalleryViewSet, AdminOrderTableView, InventoryBulkAdjustView, cancel_order, check_tariff, create_order, print_waybill, track_order, checkout, direct_checkout, selective_checkout, validate_review_token, submit_review_via_token
 
 router = DefaultRouter()
 router.register(r'charms', CharmViewSet, basename='charm')
@@ -18,7 +18,11 @@ router.register(r'gift-sets', GiftSetOrBundleMonthlySpecialViewSet, basename='gi
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('autocomplete/', AutocompleteView.as_view(), name='autocomplete'),
+    path('homepage/', HomepageView.as_view(), name='homepage'),
+    path('recommendations/<str:item_type>/<int:pk>/', RecommendationView.as_view(), name='recommendations'),
     path('admin/orders-table/', AdminOrderTableView.as_view(), name='admin-orders-table'),
+    path('admin/inventory/bulk-adjust/', InventoryBulkAdjustView.as_view(), name='admin-inventory-bulk-adjust'),
     path('checkout/', checkout, name='checkout'),
     path('direct_checkout/', direct_checkout, name='direct_checkout'),
     path('selective_checkout/', selective_checkout, name='selective_checkout'),
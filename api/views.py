@@ -1,8 +1,15 @@
 from collections import Counter
+from decimal import Decimal
 from api.services.cancel_service import send_order_cancellation_email
 from .services.jet_service import JetService
+from .services.cart_pricing_service import cart_prefetch, get_cart_pricing
+from .services.homepage_service import get_homepage
+from .services.recommendation_service import ITEM_TYPES as RECOMMENDATION_TYPES, TOP_K, recommendations_for
+from .services.inventory_service import MAX_ROWS as INVENTORY_MAX_ROWS, bulk_adjust
 from rest_framework import viewsets, status, filters, generics
+from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework.generics import ListAPIView
@@ -11,17 +18,26 @@ from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
 from django.http import JsonResponse
 from django.core.mail import send_mail
-from .models import JNTLocation, CartItemCharm, Charm, DiscountCampaign, GiftSetOrBundleMonthlySpecial, JNTOrder, NewsletterSubscriber, OrderItem, OrderItemCharm, PhotoGallery, Review, Product, Cart, CartItem, Order, VideoContent, PageBanner, ReviewToken
+from .models import JNTLocation, CartItemCharm, Charm, DiscountCampaign, DiscountedItem, GiftSetOrBundleMonthlySpecial, JNTOrder, NewsletterSubscriber, OrderItem, OrderItemCharm, PhotoGallery, Review, Product, Cart, CartItem, Order, VideoContent, PageBanner, ReviewToken
 from .serializers import (
-    CharmSerializer, DiscountCampaignSerializer, GiftSetOrBundleMonthlySpecialProductSerializer, JNTOrderSerializer, ProductSerializer,
+    CampaignProductSerializer, CharmSerializer, DiscountCampaignSerializer, GiftSetOrBundleMonthlySpecialProductSerializer, JNTOrderSerializer, ProductSerializer,
     CartSerializer, CartItemSerializer,
     OrderSerializer, NewsletterSubscriberSerializer,
     ReviewSerializer, VideoContentSerializer,
     PageBannerSerializer, PhotoGalerySerializer,
-    OrderTableSerializer, JNTLocationSerializer
+    OrderTableSerializer, JNTLocationSerializer, requested_expansions,
 )
+from .autocomplete import get_index as get_autocomplete_index
+from .cache import CachedResponseMixin, response_etag
+from .filters import CatalogOrderingFilter, CharmFilterSet, FullTextSearchFilter, GiftSetFilterSet, ProductFilterSet, compute_facets
+from .pagination import CampaignCursorPagination, CatalogCursorPagination
+from .pricing import get_price_table
+from sparklore.fieldsets import SparseFieldsetViewMixin
 from django.db import transaction
+from django.db.models import Prefetch, Q
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
 import midtransclient
 import os
 from dotenv import load_dotenv
@@ -29,35 +45,71 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
-class CharmViewSet(viewsets.ModelViewSet):
-    queryset = Charm.objects.all()
+class FacetMixin:
+    """`GET <list>/facets/` -> jumlah item per nilai facet untuk filter yang sedang aktif."""
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        return self._cached(self._facets, request)
+
+    def _facets(self, request):
+        queryset = FullTextSearchFilter().filter_queryset(request, self.get_queryset(), self)
+        facets, errors = compute_facets(self.filterset_class, request.query_params, queryset, request)
+        if errors:
+            return Response(errors, status=400)
+        return Response(facets)
+
+class CharmViewSet(FacetMixin, CachedResponseMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
+    cache_namespace = 'charms'
+    queryset = Charm.objects.select_related('rating_summary')
     serializer_class = CharmSerializer
     permission_classes = [AllowAny]
-    filter_backends = [filters.SearchFilter]
-    search_fields = ['name', 'category']
-
-class ProductViewSet(viewsets.ModelViewSet):
-    queryset = Product.objects.all()
+    pagination_class = CatalogCursorPagination
+    filter_backends = [FullTextSearchFilter, DjangoFilterBackend, CatalogOrderingFilter]
+    filterset_class = CharmFilterSet
+    search_fields = ['name', 'category', 'label', 'description']
+    ordering_fields = ['price', 'rating', 'created_at', 'sold_stok', 'trending_score']
+
+class ProductViewSet(FacetMixin, CachedResponseMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
+    cache_namespace = 'products'
+    cache_pricing_dependent = True
+    queryset = Product.objects.select_related('rating_summary').prefetch_related('images', 'jewel_set_products')
     serializer_class = ProductSerializer
     permission_classes = [AllowAny]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['name', 'category', 'label']
-    ordering_fields = ['price', 'rating']
-
-class GiftSetOrBundleMonthlySpecialViewSet(viewsets.ModelViewSet):
-    queryset = GiftSetOrBundleMonthlySpecial.objects.all()
+    pagination_class = CatalogCursorPagination
+    filter_backends = [FullTextSearchFilter, DjangoFilterBackend, CatalogOrderingFilter]
+    filterset_class = ProductFilterSet
+    search_fields = ['name', 'category', 'label', 'description', 'details']
+    ordering_fields = ['price', 'rating', 'created_at', 'sold_stok', 'trending_score']
+
+class GiftSetOrBundleMonthlySpecialViewSet(FacetMixin, CachedResponseMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
+    cache_namespace = 'gift-sets'
+    # harga efektif gift set dan produk di dalamnya ikut kampanye
+    cache_pricing_dependent = True
+    queryset = GiftSetOrBundleMonthlySpecial.objects.select_related('rating_summary').prefetch_related('products')
     serializer_class = GiftSetOrBundleMonthlySpecialProductSerializer
     permission_classes = [AllowAny]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['name', 'category', 'label']
-    ordering_fields = ['price', 'rating']
+    pagination_class = CatalogCursorPagination
+    filter_backends = [filters.SearchFilter, DjangoFilterBackend, CatalogOrderingFilter]
+    filterset_class = GiftSetFilterSet
+    # gift set tidak punya kolom category/rating
+    search_fields = ['name', 'label']
+    ordering_fields = ['price', 'created_at', 'sold_stok', 'trending_score']
 
 class CartViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
 
+    def get_queryset(self):
+        # cart + items (product/gift set di-join) + baris charm: jumlah query
+        # tetap berapa pun isi cart; CartItemSerializer hanya membaca prefetch
+        return Cart.objects.prefetch_related(*cart_prefetch())
+
+    def render_cart(self, request, status_code=status.HTTP_200_OK):
+        cart, _ = self.get_queryset().get_or_create(user=request.user)
+        return Response(CartSerializer(cart, context={'request': request}).data, status=status_code)
+
     def list(self, request):
-        cart, _ = Cart.objects.get_or_create(user=request.user)
-        return Response(CartSerializer(cart, context={'request': request}).data)
+        return self.render_cart(request)
 
     @action(detail=False, methods=['post'])
     def add(self, request):
@@ -69,16 +121,11 @@ class CartViewSet(viewsets.ViewSet):
 
         serializer = CartItemSerializer(data=request_data)
         serializer.is_valid(raise_exception=True)
-        item = serializer.save(cart=cart)
-
-        if charms:
-            item.charms.clear()
-            charm_counts = Counter(charms)
-            for charm_id, qty in charm_counts.items():
-                charm = get_object_or_404(Charm, pk=charm_id)
-                CartItemCharm.objects.create(item=item, charm=charm, quantity=qty)
+        # item + charms (bulk_create) ditulis bersama, tidak ada item setengah jadi
+        with transaction.atomic():
+            serializer.save(cart=cart)
 
-        return Response(CartSerializer(cart, context={'request': request}).data, status=status.HTTP_201_CREATED)
+        return self.render_cart(request, status.HTTP_201_CREATED)
 
     @action(detail=True, methods=['patch'])
     def update_item(self, request, pk=None):
@@ -89,36 +136,47 @@ class CartViewSet(viewsets.ViewSet):
         if charms is not None:
             request_data['charms_input'] = charms
 
+        # validasi dulu (charms harus list of int), baru cek batas jumlah; belum ada yang ditulis
         serializer = CartItemSerializer(item, data=request_data, partial=True)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
-
-        if charms is not None:
-            if len(charms) > 5:
-                return Response({'error': 'Max 5 charms per item.'}, status=400)
-
-            item.charms.clear()
-            charm_counts = Counter(charms)
-            for charm_id, qty in charm_counts.items():
-                charm = get_object_or_404(Charm, pk=charm_id)
-                CartItemCharm.objects.create(item=item, charm=charm, quantity=qty)
+        if len(serializer.validated_data.get('charms_input') or []) > 5:
+            return Response({'error': 'Max 5 charms per item.'}, status=400)
+        with transaction.atomic():
+            serializer.save()
 
-        return Response(CartSerializer(item.cart, context={'request': request}).data)
+        return self.render_cart(request)
 
     @action(detail=True, methods=['delete'])
     def remove(self, request, pk=None):
         item = get_object_or_404(CartItem, pk=pk, cart__user=request.user)
         item.delete()
-        cart = Cart.objects.get(user=request.user)
-        return Response(CartSerializer(cart, context={'request': request}).data)
+        return self.render_cart(request)
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Review.objects.all()
     serializer_class = ReviewSerializer
     permission_classes = [AllowAny]
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ['user_name', 'products__name']
     ordering_fields = ['rating', 'uploaded_at']
+    # prefetch per relasi: ringkas (id, name) atau penuh kalau di-?expand=;
+    # jumlah query tetap berapa pun jumlah review
+    prefetch_plan = {
+        'products': (Product, ('products__images', 'products__jewel_set_products')),
+        'charms': (Charm, ()),
+        'gift_sets': (GiftSetOrBundleMonthlySpecial, ('gift_sets__products',)),
+    }
+
+    def get_queryset(self):
+        expand = requested_expansions(self.request, self.prefetch_plan)
+        lookups = []
+        for relation, (model, nested) in self.prefetch_plan.items():
+            if relation in expand:
+                lookups.append(Prefetch(relation, queryset=model.objects.select_related('rating_summary')))
+                lookups.extend(nested)
+            else:
+                lookups.append(Prefetch(relation, queryset=model.objects.only('id', 'name')))
+        return Review.objects.prefetch_related(*lookups)
 
 @api_view(['GET'])
 def validate_review_token(request):
@@ -184,10 +242,16 @@ class NewsletterSubscriberViewSet(viewsets.ModelViewSet):
     serializer_class = NewsletterSubscriberSerializer
     permission_classes = [AllowAny]
 
-class AdminOrderTableView(ListAPIView):
+def order_queryset():
+    return Order.objects.select_related('user').prefetch_related(
+        Prefetch('items', queryset=OrderItem.objects.select_related('product', 'gift_set')),
+        Prefetch('items__charms', queryset=OrderItemCharm.objects.select_related('charm')),
+    ).order_by('-created_at')
+
+class AdminOrderTableView(SparseFieldsetViewMixin, ListAPIView):
     serializer_class = OrderTableSerializer
     permission_classes = [AllowAny] #[IsAdminUser]
-    queryset = Order.objects.all().order_by('-created_at')
+    queryset = order_queryset()
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -196,16 +260,34 @@ class AdminOrderTableView(ListAPIView):
             qs = qs.filter(fulfillment_status=status_filter)
         return qs
 
-class OrderViewSet(viewsets.ModelViewSet):
+class InventoryBulkAdjustView(APIView):
+    """
+    POST {"items": [{"type": "product", "id": 1, "stock_delta": -2}, ...]}
+    Nilai absolut: stock/price, delta: stock_delta/price_delta.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request):
+        items = request.data.get('items') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response({'error': 'items harus berupa list yang tidak kosong'}, status=400)
+        if len(items) > INVENTORY_MAX_ROWS:
+            return Response({'error': f'Maksimal {INVENTORY_MAX_ROWS} item per request'}, status=400)
+        results = bulk_adjust(items)
+        updated = sum(1 for row in results if row['status'] == 'updated')
+        return Response({'updated': updated, 'failed': len(results) - updated, 'results': results})
+
+class OrderViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [AllowAny]  # [IsAuthenticated] 
 
     def get_queryset(self):
+        qs = order_queryset()
         user = self.request.user
         if user.is_authenticated and not user.is_staff:
-            return Order.objects.filter(user=user).order_by('-created_at')
-        return Order.objects.all().order_by('-created_at')
+            return qs.filter(user=user)
+        return qs
 
     @action(detail=True, methods=['patch'])
     def update_status(self, request, pk=None):
@@ -243,28 +325,121 @@ class OrderViewSet(viewsets.ModelViewSet):
                 updated.append(order.id)
         return Response({"updated_orders": updated})
 
-class VideoContentViewSet(viewsets.ModelViewSet):
+class VideoContentViewSet(CachedResponseMixin, viewsets.ModelViewSet):
+    cache_namespace = 'videos'
     queryset = VideoContent.objects.all()
     serializer_class = VideoContentSerializer
     permission_classes = [AllowAny]
 
-class PageBannerViewSet(viewsets.ReadOnlyModelViewSet):
+class PageBannerViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
+    cache_namespace = 'page-banners'
     queryset = PageBanner.objects.all()
     serializer_class = PageBannerSerializer
     permission_classes = [AllowAny]
 
-class PhotoGalleryViewSet(viewsets.ReadOnlyModelViewSet):
+class PhotoGalleryViewSet(CachedResponseMixin, viewsets.ReadOnlyModelViewSet):
+    cache_namespace = 'photo-gallery'
     queryset = PhotoGallery.objects.all()
     serializer_class = PhotoGalerySerializer
     permission_classes = [AllowAny]
 
-class DiscountCampaignViewSet(viewsets.ReadOnlyModelViewSet):
+class DiscountCampaignViewSet(CachedResponseMixin, SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
+    cache_namespace = 'discount-campaigns'
+    cache_pricing_dependent = True
     queryset = DiscountCampaign.objects.all()
     serializer_class = DiscountCampaignSerializer
     permission_classes = [AllowAny]
+    pagination_class = CampaignCursorPagination
+    # ?status=: current (aktif + akan datang), active, upcoming, ended, all.
+    # Tanpa ?status= tetap semua kampanye seperti sebelumnya.
+    default_status = 'all'
+    status_filters = {
+        'current': lambda now: Q(end_time__gt=now),
+        'active': lambda now: Q(start_time__lte=now, end_time__gt=now),
+        'upcoming': lambda now: Q(start_time__gt=now),
+        'ended': lambda now: Q(end_time__lte=now),
+        'all': lambda now: Q(),
+    }
 
     def get_queryset(self):
-        return DiscountCampaign.objects.all()
+        queryset = DiscountCampaign.objects.prefetch_related(
+            Prefetch('items', queryset=DiscountedItem.objects.select_related('product').order_by('id')),
+            'items__product__images',
+        ).order_by('start_time', 'id')
+        if self.action == 'list':
+            condition = self.status_filters.get(self.request.query_params.get('status', self.default_status))
+            if condition is None:
+                raise ValidationError({'status': f"Pilih salah satu: {', '.join(self.status_filters)}"})
+            queryset = queryset.filter(condition(timezone.now()))
+        return queryset
+
+class AutocompleteView(APIView):
+    permission_classes = [AllowAny]
+    max_limit = 20
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = min(int(request.query_params.get('limit', 8)), self.max_limit)
+        except ValueError:
+            return Response({'error': 'limit harus berupa angka'}, status=400)
+        types = [t for t in request.query_params.get('types', '').split(',') if t] or None
+        return Response({'query': query, 'results': get_autocomplete_index().suggest(query, limit=limit, types=types)})
+
+class HomepageView(APIView):
+    """Semua potongan data homepage dalam satu response (api/services/homepage_service.py)."""
+    permission_classes = [AllowAny]
+
+    def get(self, request):
+        data, token, last_modified = get_homepage(request)
+        etag = response_etag(request, token)
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+        response = Response(data)
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ['Accept'])
+        return response
+
+class RecommendationView(APIView):
+    """
+    GET recommendations/<product|charm|gift_set>/<id>/ -> "sering dibeli bersama".
+    Default hanya referensi {type, id, score} (satu query); `?expand=items`
+    menambahkan data kartu item, satu query per jenis item.
+    """
+    permission_classes = [AllowAny]
+    expand_plan = {
+        'product': (Product.objects.prefetch_related('images'), CampaignProductSerializer),
+        'charm': (Charm.objects.select_related('rating_summary'), CharmSerializer),
+        'gift_set': (GiftSetOrBundleMonthlySpecial.objects.select_related('rating_summary').prefetch_related('products'),
+                     GiftSetOrBundleMonthlySpecialProductSerializer),
+    }
+
+    def get(self, request, item_type, pk):
+        if item_type not in RECOMMENDATION_TYPES:
+            return Response({'error': 'Jenis item tidak dikenal'}, status=404)
+        try:
+            limit = min(int(request.query_params.get('limit', TOP_K)), TOP_K)
+        except ValueError:
+            return Response({'error': 'limit harus berupa angka'}, status=400)
+        if limit < 1:
+            return Response({'error': 'limit minimal 1'}, status=400)
+        results = recommendations_for(item_type, pk, limit=limit)
+        if 'items' in requested_expansions(request, ['items']):
+            results = self.expand(results)
+        return Response({'type': item_type, 'id': pk, 'results': results})
+
+    def expand(self, results):
+        context = {'request': self.request}
+        items = {}
+        for item_type, (queryset, serializer_class) in self.expand_plan.items():
+            ids = [row['id'] for row in results if row['type'] == item_type]
+            if ids:
+                objects = queryset.in_bulk(ids)
+                items.update({(item_type, pk): serializer_class(obj, context=context).data for pk, obj in objects.items()})
+        # item yang sudah dihapus sejak job terakhir dibuang
+        return [{**row, 'item': items[row['type'], row['id']]} for row in results if (row['type'], row['id']) in items]
 
 class MidtransSnapTokenView(APIView):
     def post(self, request):
@@ -336,8 +511,8 @@ class MidtransSnapTokenView(APIView):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def checkout(request):
-    cart = get_object_or_404(Cart, user=request.user)
-    if not cart.items.exists():
+    cart = get_object_or_404(Cart.objects.prefetch_related(*cart_prefetch()), user=request.user)
+    if not cart.items.all():
         return Response({"error": "Cart is empty"}, status=400)
 
     try:
@@ -351,7 +526,9 @@ def checkout(request):
                 shipping_cost=request.data.get("shipping_cost", ""),
             )
 
-            total = 0
+            # total dari snapshot harga cart yang sama dengan yang dilihat user
+            pricing = get_cart_pricing(cart)
+            total = pricing['total']
             for item in cart.items.all():
                 order_item = OrderItem.objects.create(
                     order=order,
@@ -363,23 +540,14 @@ def checkout(request):
 
                 if item.product:
                     item.product.stock -= item.quantity
-                    item.product.save()
-                    total += float(item.product.price) * item.quantity
+                    item.product.save(update_fields=['stock'])
 
                 elif item.gift_set:
                     item.gift_set.stock -= item.quantity
-                    item.gift_set.save()
-                    total += float(item.gift_set.price) * item.quantity
-
-                if item.charms.exists():
-                    for cc in CartItemCharm.objects.filter(item=item):
-                        OrderItemCharm.objects.create(order_item=order_item, charm=cc.charm)
-                        total += float(cc.charm.price) * cc.quantity
+                    item.gift_set.save(update_fields=['stock'])
 
-                elif item.product is None and item.gift_set is None:
-                    for cc in CartItemCharm.objects.filter(item=item):
-                        OrderItemCharm.objects.create(order_item=order_item, charm=cc.charm)
-                        total += float(cc.charm.price) * cc.quantity
+                for cc in item.cartitemcharm_set.all():
+                    OrderItemCharm.objects.create(order_item=order_item, charm_id=cc.charm_id)
 
                 item.delete()
 
@@ -418,21 +586,22 @@ def direct_checkout(request):
                 message=order_item.message
             )
 
-            total = 0
+            total = Decimal('0.00')
+            prices = get_price_table()
 
             if "product" in request.data:
                 product = get_object_or_404(Product, id=request.data["product"])
                 order_item.product = product
                 product.stock -= quantity
-                product.save()
-                total += float(product.price) * quantity
+                product.save(update_fields=['stock'])
+                total += prices.effective_price(product) * quantity
 
             elif "gift_set" in request.data:
                 gift_set = get_object_or_404(GiftSetOrBundleMonthlySpecial, id=request.data["gift_set"])
                 order_item.gift_set = gift_set
                 gift_set.stock -= quantity
-                gift_set.save()
-                total += float(gift_set.price) * quantity
+                gift_set.save(update_fields=['stock'])
+                total += prices.effective_price(gift_set) * quantity
 
             if charms:
                 charm_counts = Counter(charms)
@@ -440,7 +609,7 @@ def direct_checkout(request):
                     charm = get_object_or_404(Charm, id=charm_id)
                     for _ in range(qty):
                         OrderItemCharm.objects.create(order_item=order_item, charm=charm)
-                    total += float(charm.price) * qty
+                    total += prices.effective_price(charm) * qty
 
             order_item.save()
             order.total_price = total
@@ -471,7 +640,9 @@ def selective_checkout(request):
                 shipping_cost=request.data.get("shipping_cost", ""),
             )
 
-            total = 0
+            cart = get_object_or_404(Cart, user=request.user)
+            lines = get_cart_pricing(cart)['items']
+            total = Decimal('0.00')
             for cid in cart_item_ids:
                 item = get_object_or_404(CartItem, id=cid, cart__user=request.user)
 
@@ -485,18 +656,16 @@ def selective_checkout(request):
 
                 if item.product:
                     item.product.stock -= item.quantity
-                    item.product.save()
-                    total += float(item.product.price) * item.quantity
+                    item.product.save(update_fields=['stock'])
 
                 elif item.gift_set:
                     item.gift_set.stock -= item.quantity
-                    item.gift_set.save()
-                    total += float(item.gift_set.price) * item.quantity
+                    item.gift_set.save(update_fields=['stock'])
+                total += lines[item.pk]['total']
 
                 # charms
                 for cc in CartItemCharm.objects.filter(item=item):
                     OrderItemCharm.objects.create(order_item=oi, charm=cc.charm)
-                    total += float(cc.charm.price) * cc.quantity
 
                 item.delete()
 
@@ -1,15 +1,17 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from sparklore.fieldsets import SparseFieldsetMixin
+
 from .models import OTPCode
 
 User = get_user_model()
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ['id', 'email']
 
-class FullUserSerializer(serializers.ModelSerializer):
+class FullUserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = '__all__' 
@@ -102,5 +102,5 @@ class CurrentUserDetailView(APIView):
     permission_classes = [AllowAny]
 
     def get(self, request):
-        serializer = FullUserSerializer(request.user)
+        serializer = FullUserSerializer(request.user, context={'request': request})
         return Response(serializer.data)
\ No newline at end of file
@@ -13,4 +13,16 @@ app.conf.beat_schedule = {
         "task": "api.orders.tasks.update_order_status_from_tracking",
         "schedule": crontab(minute="*/10"),   
     },
+    "recompute-sales-rankings-hourly": {
+        "task": "api.tasks.recompute_sales_rankings",
+        "schedule": crontab(minute=15),
+    },
+    "recover-stale-video-transcodes": {
+        "task": "api.tasks.recover_stale_transcodes",
+        "schedule": crontab(minute="*/30"),
+    },
+    "rebuild-recommendations-nightly": {
+        "task": "api.tasks.rebuild_recommendations",
+        "schedule": crontab(hour=2, minute=30),
+    },
 }
@@ -0,0 +1,143 @@
+"""
+Sparse fieldset untuk semua serializer: `?fields=` dan `?omit=`.
+
+    ?fields=id,name,price,images.image_url
+    ?omit=description,images.image_srcset
+
+Path bertitik masuk ke serializer nested (juga `many=True`). Hanya berlaku
+untuk request baca (GET/HEAD/OPTIONS) supaya field yang ditulis tidak ikut
+terbuang. Field dibuang sebelum serialisasi, dan `SparseFieldsetViewMixin`
+membuang prefetch yang relasinya tidak diminta sehingga query-nya juga hilang.
+"""
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+# serializer teratas yang sedang dirender dengan context ini
+_RENDERING = '_sparse_fieldset_rendering'
+
+
+def parse_fieldset(value):
+    """'a,b.c,b.d' -> {'a': {}, 'b': {'c': {}, 'd': {}}}; {} = daun."""
+    tree = {}
+    for path in (value or '').split(','):
+        parts = [part.strip() for part in path.split('.') if part.strip()]
+        node = tree
+        for part in parts:
+            node = node.setdefault(part, {})
+    return tree
+
+
+def requested_fieldset(request):
+    """(only, omit) dari query string; None kalau tidak diminta."""
+    if request is None or request.method not in SAFE_METHODS:
+        return None
+    params = getattr(request, 'query_params', request.GET)
+    only = parse_fieldset(params.get('fields')) or None
+    omit = parse_fieldset(params.get('omit')) or None
+    if only is None and omit is None:
+        return None
+    return only, omit
+
+
+def _nested(field):
+    target = getattr(field, 'child', field)
+    return target if isinstance(target, serializers.BaseSerializer) else None
+
+
+def _subtree(tree, name):
+    # only: subtree kosong berarti "semua field"; omit: subtree kosong = buang field itu sendiri
+    return (tree.get(name) or None) if tree else None
+
+
+class SparseFieldsetMixin:
+    """
+    Pasang di serializer mana pun. Setiap serializer teratas (root, atau child
+    dari ListSerializer root) membaca `?fields=`/`?omit=` dan meneruskan
+    subtree-nya ke serializer nested, termasuk beberapa root berurutan dengan
+    context yang sama (mis. item `?expand=` di RecommendationView). Root yang
+    dibuat selama root lain sedang dirender (mis. di SerializerMethodField)
+    tidak ikut dipangkas.
+    """
+
+    def _is_top_level(self):
+        root = self.root
+        return root is self or getattr(root, 'child', None) is self
+
+    def _sparse_spec(self):
+        if '_sparse_fieldset' in self.__dict__:
+            return self._sparse_fieldset
+        spec = None
+        if self._is_top_level() and self.context.get(_RENDERING, self) is self:
+            spec = requested_fieldset(self.context.get('request'))
+        self._sparse_fieldset = spec
+        return spec
+
+    def to_representation(self, instance):
+        context = self.context
+        if not self._is_top_level() or context.get(_RENDERING) is not None:
+            return super().to_representation(instance)
+        context[_RENDERING] = self
+        try:
+            return super().to_representation(instance)
+        finally:
+            del context[_RENDERING]
+
+    @property
+    def _readable_fields(self):
+        spec = self._sparse_spec()
+        if spec is None:
+            yield from super()._readable_fields
+            return
+        only, omit = spec
+        for field in super()._readable_fields:
+            name = field.field_name
+            if (only is not None and name not in only) or (omit is not None and omit.get(name) == {}):
+                continue
+            nested = _nested(field)
+            if nested is not None and '_sparse_fieldset' not in nested.__dict__:
+                sub_only, sub_omit = _subtree(only, name), _subtree(omit, name)
+                nested._sparse_fieldset = (sub_only, sub_omit) if (sub_only or sub_omit) else None
+            yield field
+
+
+def _lookup_wanted(serializer, parts, only, omit):
+    fields = serializer.fields
+    names = [
+        name for name, field in fields.items()
+        if field.source != '*' and field.source.split('.')[0] == parts[0]
+    ]
+    if not names:
+        # relasi tidak terikat ke field tertentu (mis. dipakai SerializerMethodField)
+        return True
+    for name in names:
+        if (only is not None and name not in only) or (omit is not None and omit.get(name) == {}):
+            continue
+        nested = _nested(fields[name])
+        if len(parts) == 1 or nested is None:
+            return True
+        if _lookup_wanted(nested, parts[1:], _subtree(only, name), _subtree(omit, name)):
+            return True
+    return False
+
+
+def prune_prefetches(queryset, serializer_class, request):
+    """Buang prefetch_related yang relasinya tidak muncul di sparse fieldset."""
+    spec = requested_fieldset(request)
+    lookups = queryset._prefetch_related_lookups
+    if spec is None or not lookups:
+        return queryset
+    # instance tanpa context: field lengkap, tidak membaca request
+    serializer = serializer_class()
+    kept = [
+        lookup for lookup in lookups
+        if _lookup_wanted(serializer, getattr(lookup, 'prefetch_through', lookup).split('__'), *spec)
+    ]
+    if len(kept) == len(lookups):
+        return queryset
+    return queryset.prefetch_related(None).prefetch_related(*kept)
+
+
+class SparseFieldsetViewMixin:
+    """Untuk GenericAPIView: pangkas prefetch setelah filter, sebelum query jalan."""
+    def filter_queryset(self, queryset):
+        return prune_prefetches(super().filter_queryset(queryset), self.get_serializer_class(), self.request)
@@ -0,0 +1,187 @@
+"""
+Serving MEDIA_ROOT / STATIC_ROOT tanpa `django.views.static`.
+
+Mode diatur lewat `MEDIA_SERVE_MODE`:
+
+* ``python``: Django mengirim file sendiri, mendukung Range (seek video),
+  If-Modified-Since / If-None-Match, dan Cache-Control.
+* ``x-accel-redirect`` (nginx): Django hanya cek path lalu membalas header
+  `X-Accel-Redirect`, byte dikirim nginx. Contoh konfigurasi::
+
+      location /_protected/ {
+          internal;
+          alias /srv/sparklore/;   # BASE_DIR
+      }
+
+  dengan `MEDIA_ACCEL_REDIRECT_PREFIX = '/_protected/'`; path internalnya
+  `<prefix><root relatif BASE_DIR>/<path>` (mis. `/_protected/media/x.jpg`).
+* ``x-sendfile`` (Apache mod_xsendfile / lighttpd): header `X-Sendfile`
+  berisi path absolut.
+* ``off``: tidak ada URL media di Django, web server melayani langsung.
+
+Tanpa `MEDIA_SERVE_MODE` di env, default-nya ``python`` saat DEBUG dan ``off``
+di production.
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured, SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.urls import re_path
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+SERVE_MODES = ('python', 'x-accel-redirect', 'x-sendfile', 'off')
+CHUNK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def file_etag(stat):
+    return quote_etag(f'{int(stat.st_mtime):x}-{stat.st_size:x}')
+
+
+def is_immutable(path):
+    pattern = settings.MEDIA_IMMUTABLE_PATTERN
+    return bool(pattern) and re.search(pattern, path) is not None
+
+
+def parse_range(header, size):
+    """
+    (start, end) inklusif untuk satu range `bytes=`. None kalau header tidak
+    dipakai (kosong / multi-range / bukan bytes), ValueError kalau tidak bisa
+    dipenuhi (416).
+    """
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # suffix range: N byte terakhir
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, end
+
+
+def _range_applies(request, etag, mtime):
+    # If-Range: kalau file sudah berubah, kirim utuh (200) bukan potongan
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(mtime) <= since
+
+
+def _iter_file(path, start, length):
+    with open(path, 'rb') as fh:
+        fh.seek(start)
+        while length > 0:
+            chunk = fh.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def _offload_response(mode, fullpath, path, root_name):
+    response = HttpResponse()
+    if mode == 'x-accel-redirect':
+        location = f'{settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip("/")}/{root_name}/{path}'
+        response['X-Accel-Redirect'] = quote(location)
+    else:
+        response['X-Sendfile'] = fullpath
+    # biar Content-Type ditentukan web server
+    del response['Content-Type']
+    return response
+
+
+@require_safe
+def serve(request, path, document_root, root_name):
+    try:
+        fullpath = safe_join(document_root, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(fullpath):
+        raise Http404
+
+    stat = os.stat(fullpath)
+    etag = file_etag(stat)
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if not_modified is not None:
+        return not_modified
+
+    mode = settings.MEDIA_SERVE_MODE
+    if mode in ('x-accel-redirect', 'x-sendfile'):
+        response = _offload_response(mode, fullpath, path, root_name)
+    else:
+        response = _python_response(request, fullpath, stat, etag)
+
+    if response.status_code in (200, 206):
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        if is_immutable(path):
+            patch_cache_control(response, public=True, max_age=365 * 24 * 3600, immutable=True)
+        else:
+            patch_cache_control(response, public=True, max_age=settings.MEDIA_CACHE_MAX_AGE)
+    return response
+
+
+def _python_response(request, fullpath, stat, etag):
+    content_type, encoding = mimetypes.guess_type(fullpath)
+    content_type = content_type or 'application/octet-stream'
+    size = stat.st_size
+
+    byte_range = None
+    if _range_applies(request, etag, stat.st_mtime):
+        try:
+            byte_range = parse_range(request.META.get('HTTP_RANGE', ''), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+
+    if byte_range is None:
+        response = FileResponse(open(fullpath, 'rb'), content_type=content_type)
+    else:
+        start, end = byte_range
+        length = end - start + 1
+        response = StreamingHttpResponse(
+            _iter_file(fullpath, start, length), status=206, content_type=content_type,
+        )
+        response['Content-Length'] = str(length)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    if encoding:
+        response['Content-Encoding'] = encoding
+    response['Accept-Ranges'] = 'bytes'
+    return response
+
+
+def media_urlpatterns(prefix, document_root):
+    """Pengganti `django.conf.urls.static.static()` yang memakai `serve` di atas."""
+    if settings.MEDIA_SERVE_MODE not in SERVE_MODES:
+        raise ImproperlyConfigured(f"MEDIA_SERVE_MODE harus salah satu dari {SERVE_MODES}")
+    if settings.MEDIA_SERVE_MODE == 'off' or not prefix or '://' in prefix:
+        return []
+    root_name = os.path.relpath(document_root, settings.BASE_DIR).replace(os.sep, '/')
+    return [
+        re_path(
+            r'^%s(?P<path>.*)$' % re.escape(prefix.lstrip('/')),
+            serve,
+            kwargs={'document_root': document_root, 'root_name': root_name},
+        ),
+    ]
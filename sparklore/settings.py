@@ -63,6 +63,12 @@ CORS_ALLOW_HEADERS = [
     "origin",
     "x-csrftoken",
     "x-requested-with",
+    "if-none-match",
+    "if-modified-since",
+]
+CORS_EXPOSE_HEADERS = [
+    "etag",
+    "last-modified",
 ]
 
 
@@ -81,6 +87,7 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
 
     "rest_framework",
+    "django_filters",
     "rest_framework_simplejwt",
     "rest_framework.authtoken",
     "rest_framework_simplejwt.token_blacklist",
@@ -121,6 +128,18 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.AllowAny', 
     ),
+    # lihat api/renderers.py; benchmark: python manage.py benchmark_renderers
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.ORJSONRenderer',
+        'api.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.renderers.ORJSONParser',
+        'api.renderers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 AUTH_USER_MODEL = "authentification.CustomUser"
@@ -181,6 +200,30 @@ else:
         }
     }
 
+# Cache
+# Lokal/test pakai memori proses; production pakai Redis (sama dengan broker Celery).
+
+if ENV == 'production':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('CACHE_REDIS_URL', 'redis://127.0.0.1:6379/1'),
+            'KEY_PREFIX': 'sparklore',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'sparklore',
+        }
+    }
+
+CATALOG_CACHE_ALIAS = 'default'
+CATALOG_CACHE_TIMEOUT = env.int('CATALOG_CACHE_TIMEOUT', default=60 * 60)
+# berapa lama payload homepage lama masih dipakai selama rebuild di Celery
+HOMEPAGE_STALE_GRACE = env.int('HOMEPAGE_STALE_GRACE', default=60)
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -224,6 +267,14 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# cara melayani MEDIA_ROOT/STATIC_ROOT, lihat sparklore/media.py. Di production
+# default 'off' (web server melayani langsung); 'python' harus diset eksplisit.
+MEDIA_SERVE_MODE = env('MEDIA_SERVE_MODE', default='python' if DEBUG else 'off')
+MEDIA_ACCEL_REDIRECT_PREFIX = env('MEDIA_ACCEL_REDIRECT_PREFIX', default='/_protected/')
+MEDIA_CACHE_MAX_AGE = env.int('MEDIA_CACHE_MAX_AGE', default=3600)
+# nama file yang mengandung hash konten (ManifestStaticFilesStorage) -> immutable
+MEDIA_IMMUTABLE_PATTERN = r'\.[0-9a-f]{12}\.[A-Za-z0-9]+$'
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
@@ -234,6 +285,11 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "Asia/Jakarta"
 
+FFMPEG_BINARY = env('FFMPEG_BINARY', default='ffmpeg')
+FFPROBE_BINARY = env('FFPROBE_BINARY', default='ffprobe')
+# video yang PROCESSING lebih lama dari ini dianggap worker-nya mati dan dijadwalkan ulang
+VIDEO_TRANSCODE_TIMEOUT = env.int('VIDEO_TRANSCODE_TIMEOUT', default=2 * 60 * 60)
+
 
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 EMAIL_HOST = 'smtp.gmail.com'